@@ -1,28 +1,34 @@
-# app.py
-import streamlit as st
-from utils_data import load_df
-
-st.set_page_config(page_title="Indicadores BCRA – Dashboard", page_icon="📊", layout="wide")
-
-st.title("Indicadores BCRA – Dashboard")
-st.markdown(
-    """
-    Este tablero lee **todos los CSV** ubicados en `./data/` que tengan columnas:  
-    **Código de entidad · Descripción entidad · Fecha del dato (AAAAMM) · Código del dato · Descripción del dato · Valor**.
-
-    Usá el menú lateral **▶ Pages** para navegar: **Panel**, **Series**, **Comparador**, **Calculadora**.
-    """
-)
-
-df = load_df()
-
-if df.empty:
-    st.error("No encontré datos válidos en `./data/`.")
-else:
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Filas", f"{len(df):,}".replace(",", "."))
-    with col2:
-        st.metric("Entidades", df["Código de entidad"].nunique())
-    with col3:
-        st.metric("Variables", df["Var_label"].nunique())
+# app.py
+import streamlit as st
+from utils_data import load_meta, current_dataset
+
+st.set_page_config(page_title="Indicadores BCRA – Dashboard", page_icon="📊", layout="wide")
+
+st.title("Indicadores BCRA – Dashboard")
+st.markdown(
+    """
+    Este tablero lee **todos los CSV** ubicados en `./data/` que tengan columnas:  
+    **Código de entidad · Descripción entidad · Fecha del dato (AAAAMM) · Código del dato · Descripción del dato · Valor**.
+
+    Usá el menú lateral **▶ Pages** para navegar: **Panel**, **Series**, **Comparador**, **Calculadora**, **Ranking**, **Calidad**, **Exportar**, **Correlaciones**.
+    """
+)
+
+meta = load_meta()
+
+if not meta.entidades:
+    st.error("No encontré datos válidos en `./data/`.")
+else:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Filas", f"{meta.n_filas:,}".replace(",", "."))
+    with col2:
+        st.metric("Entidades", meta.n_codigos_entidad)
+    with col3:
+        st.metric("Variables", len(meta.label_to_code))
+
+ds = current_dataset()
+st.caption(
+    f"Versión del dataset: `{ds.version}` · construido el {ds.built_at:%d/%m/%Y %H:%M:%S} "
+    f"en {ds.build_secs:.1f} s · ./data se revisa cada pocos segundos y los cambios se publican solos."
+)
@@ -0,0 +1,145 @@
+# bench.py
+"""
+Benchmarks de la carga y de los caminos calientes de las páginas, sin
+Streamlit. Para cada tamaño genera un dataset sintético (ver synth_data.py)
+en una carpeta temporal y mide tiempo (mejor de N corridas) y pico de
+memoria (tracemalloc, en una corrida aparte).
+
+    python bench.py --rows 10000,100000,1000000 [--repeat 3] [--out bench.csv]
+
+Con --out se agregan filas a un CSV (fecha, commit, filas, benchmark,
+segundos, pico_mb) para seguir regresiones entre versiones.
+"""
+import argparse
+import csv
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from formula import compile_formula
+from parquet_store import ParquetStore
+from pipeline import load_dataset, _build_var_labels
+from synth_data import write_dataset
+from utils_data import SeriesIndex, SeriesCube, apply_transform, build_meta, label_to_code
+
+class Ctx:
+    """Lo que comparten los benchmarks de un tamaño (se arma una vez, fuera de la medición)."""
+
+    def __init__(self, data: Path, store: Path, workers: int):
+        self.data, self.store, self.workers = data, store, workers
+        self.df, _ = load_dataset(data, store, workers)
+        self.plain = self.df.drop(columns=["Var_label"]).astype({"Var_desc": object, "Var_code": object})
+        self.meta = build_meta(self.df)
+        self.cube = SeriesCube(SeriesIndex(self.df))
+        self.entity = self.meta.ent_default
+        self.codes = [self.meta.label_to_code[lab] for lab in self.meta.labels[:5]]
+        self.pq = ParquetStore(store)
+        self.ultimo = self.pq.meses()[-1]
+
+def _load_cold(c: Ctx):
+    shutil.rmtree(c.store, ignore_errors=True)
+    load_dataset(c.data, c.store, c.workers)
+
+def _load_warm(c: Ctx):
+    load_dataset(c.data, c.store, c.workers)
+
+def _var_labels(c: Ctx):
+    _build_var_labels(c.plain.copy())
+
+def _label_to_code_meta(c: Ctx):
+    for lab in c.meta.labels:
+        label_to_code(c.meta, lab)
+
+def _label_to_code_df(c: Ctx):
+    for lab in c.meta.labels[:10]:
+        label_to_code(c.df, lab)
+
+def _panel(c: Ctx):
+    # índice + cubo + MoM/YoY: lo que arma el Panel en frío
+    cube = SeriesCube(SeriesIndex(c.df))
+    cube.mom, cube.yoy
+
+def _comparador_yoy(c: Ctx):
+    apply_transform(c.cube.block(c.entity, c.codes), "yoy")
+
+def _calculadora(c: Ctx):
+    a, b = c.codes[0], c.codes[-1]
+    compile_formula("A / B * 100").evaluate({"A": c.cube.matrix(a), "B": c.cube.matrix(b)})
+
+def _parquet_ventana(c: Ctx):
+    # lo que pide una vista angosta al backend parquet: 1 entidad, 5 variables, 12 meses
+    c.pq.frame(c.entity, c.codes, c.ultimo - 11, c.ultimo)
+
+BENCHMARKS = {
+    "load_df en frío": _load_cold,
+    "load_df en caliente": _load_warm,
+    "_build_var_labels": _var_labels,
+    "label_to_code (meta, todas)": _label_to_code_meta,
+    "label_to_code (DataFrame, x10)": _label_to_code_df,
+    "Panel: cubo + MoM/YoY": _panel,
+    "Comparador: YoY de 5 variables": _comparador_yoy,
+    "Calculadora: A / B todas las entidades": _calculadora,
+    "parquet: 1 entidad, 5 variables, 12 meses": _parquet_ventana,
+}
+
+def measure(fn, ctx: Ctx, repeat: int):
+    """(mejor tiempo en segundos, pico de memoria en MB)."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(ctx)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).parent)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+def run(sizes, repeat=3, files=12, workers=1, only=None):
+    rows = []
+    for n in sizes:
+        with tempfile.TemporaryDirectory(prefix="bcra_bench_") as tmp:
+            data, store = Path(tmp) / "data", Path(tmp) / "store"
+            write_dataset(data, n, files)
+            ctx = Ctx(data, store, workers)
+            for name, fn in BENCHMARKS.items():
+                if only and only not in name:
+                    continue
+                secs, mb = measure(fn, ctx, repeat)
+                rows.append({"filas": len(ctx.df), "benchmark": name, "segundos": round(secs, 6), "pico_mb": round(mb, 1)})
+                print(f"{len(ctx.df):>10,}  {name:<40} {secs * 1000:>10.2f} ms {mb:>9.1f} MB", flush=True)
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="bench.py", description="Benchmarks de carga y páginas (sin Streamlit).")
+    ap.add_argument("--rows", default="10000,100000,1000000", help="tamaños separados por coma (hasta 10000000)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--files", type=int, default=12, help="archivos por dataset")
+    ap.add_argument("--workers", type=int, default=1, help="procesos para la carga en frío")
+    ap.add_argument("--only", default=None, help="sólo los benchmarks cuyo nombre contenga este texto")
+    ap.add_argument("--out", type=Path, default=None, help="CSV al que se agregan los resultados")
+    args = ap.parse_args(argv)
+
+    rows = run([int(x) for x in args.rows.split(",")], args.repeat, args.files, args.workers, args.only)
+    if args.out:
+        nuevo = not args.out.exists()
+        meta = {"fecha": datetime.now().isoformat(timespec="seconds"), "commit": _commit()}
+        with open(args.out, "a", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=["fecha", "commit", "filas", "benchmark", "segundos", "pico_mb"])
+            if nuevo:
+                w.writeheader()
+            w.writerows({**meta, **r} for r in rows)
+
+if __name__ == "__main__":
+    main()
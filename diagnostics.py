@@ -0,0 +1,134 @@
+# diagnostics.py
+"""
+Instrumentación liviana para la página Diagnóstico: tiempos por etapa en un
+buffer circular, llamadas/ejecuciones de las funciones cacheadas y el
+perfil (cProfile) de una sola ejecución de página. No depende de Streamlit.
+"""
+import cProfile
+import functools
+import io
+import marshal
+import os
+import pstats
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+RING_SIZE = int(os.environ.get("BCRA_DIAG_RING", 2000))
+
+_ring = deque(maxlen=RING_SIZE)   # {"hora", "pagina", "etapa", "segundos"}
+_cache_calls = Counter()
+_cache_runs = Counter()
+_profiles = deque(maxlen=5)       # {"hora", "pagina", "segundos", "stats"}
+
+# ---------- tiempos ----------
+def record(pagina: str, etapa: str, segundos: float):
+    _ring.append({"hora": datetime.now(), "pagina": pagina, "etapa": etapa, "segundos": segundos})
+
+class PageTimer:
+    """
+    Cronómetro por vueltas para una ejecución de página: `lap(etapa)` registra
+    lo transcurrido desde la vuelta anterior y `done()` cierra con el total.
+    Con `profiler` perfila la ejecución entera y la guarda al cerrar.
+    Usado como contexto (`with ... as t:`) se cierra también si la página
+    corta antes (st.stop() levanta una excepción) o falla.
+    """
+
+    def __init__(self, pagina: str, profiler: cProfile.Profile | None = None):
+        self.pagina = pagina
+        self._prof = profiler
+        self._t0 = self._t = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+
+    def lap(self, etapa: str):
+        now = time.perf_counter()
+        record(self.pagina, etapa, now - self._t)
+        self._t = now
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.done("render" if exc_type is None else "interrumpida")
+        return False
+
+    def done(self, etapa: str = "render"):
+        if self._t0 is None:  # ya cerrado
+            return
+        self.lap(etapa)
+        total = self._t - self._t0
+        record(self.pagina, "total", total)
+        self._t0 = None
+        if self._prof is not None:
+            self._prof.disable()
+            self._prof.create_stats()
+            _profiles.append({"hora": datetime.now(), "pagina": self.pagina, "segundos": total,
+                              "stats": self._prof.stats})
+            self._prof = None
+
+def timings() -> list:
+    return list(_ring)
+
+def clear_timings():
+    _ring.clear()
+
+# ---------- cachés ----------
+def tracked(cache_decorator):
+    """
+    Envuelve un decorador de caché (st.cache_data / st.cache_resource) y
+    cuenta llamadas y ejecuciones reales: aciertos = llamadas - ejecuciones.
+    """
+    def deco(fn):
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            _cache_runs[name] += 1
+            return fn(*args, **kwargs)
+
+        cached = cache_decorator(run)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            _cache_calls[name] += 1
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+    return deco
+
+def count(name: str, hit: bool):
+    """Cuenta una llamada a un caché propio (sin decorador de Streamlit)."""
+    _cache_calls[name] += 1
+    if not hit:
+        _cache_runs[name] += 1
+
+def cache_stats() -> list:
+    out = []
+    for name in sorted(_cache_calls):
+        calls, runs = _cache_calls[name], _cache_runs[name]
+        out.append({"función": name, "llamadas": calls, "aciertos": max(0, calls - runs),
+                    "fallos": runs, "% aciertos": round(100.0 * max(0, calls - runs) / calls, 1) if calls else None})
+    return out
+
+# ---------- perfiles ----------
+def profiles() -> list:
+    return list(_profiles)
+
+def pstats_dump(stats: dict) -> bytes:
+    """Los mismos bytes que escribe Profile.dump_stats (se abren con pstats.Stats(archivo))."""
+    return marshal.dumps(stats)
+
+class _Stats:
+    # pstats.Stats acepta cualquier objeto con `create_stats()` y `stats`
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+def pstats_text(stats: dict, sort: str = "cumulative", limit: int = 40) -> str:
+    buf = io.StringIO()
+    pstats.Stats(_Stats(stats), stream=buf).sort_stats(sort).print_stats(limit)
+    return buf.getvalue()
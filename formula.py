@@ -0,0 +1,163 @@
+# formula.py
+"""
+Motor de fórmulas de la Calculadora.
+
+Una fórmula es una expresión aritmética sobre variables (letras A, B, C...)
+y unas pocas funciones de series: `(A + B) / C * 100`, `lag(A, 12)`,
+`rolling_mean(A, 3)`. Se valida con el módulo `ast` contra una lista blanca
+(nunca se usa eval) y se compila a funciones sobre arrays de NumPy con los
+meses en el último eje, así la misma fórmula corre para una entidad (M,) o
+para todas a la vez (E, M).
+"""
+import ast
+import re
+from functools import lru_cache
+import numpy as np
+
+MAX_LEN = 500
+_VAR_RE = re.compile(r"^[A-Z]$")
+
+class FormulaError(ValueError):
+    """Fórmula inválida (sintaxis, nombres o argumentos no permitidos)."""
+
+# ---------- funciones de series ----------
+def _shift(x, n):
+    out = np.full(np.shape(x), np.nan)
+    if n == 0:
+        out[...] = x
+    elif 0 < n < out.shape[-1]:
+        out[..., n:] = x[..., :-n]
+    elif 0 < -n < out.shape[-1]:
+        out[..., :n] = x[..., -n:]
+    return out
+
+def _div(a, b):
+    b = np.where(b == 0, np.nan, b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return a / b
+
+def rolling_window(x, n, mean):
+    """Suma/promedio de ventana n; NaN si falta algún mes en la ventana."""
+    x = np.asarray(x, dtype=np.float64)
+    ok = ~np.isnan(x)
+    zero = np.zeros(x.shape[:-1] + (1,))
+    cs = np.concatenate([zero, np.cumsum(np.where(ok, x, 0.0), axis=-1)], axis=-1)
+    cn = np.concatenate([zero, np.cumsum(ok, axis=-1)], axis=-1)
+    out = np.full(x.shape, np.nan)
+    if n <= x.shape[-1]:
+        s = cs[..., n:] - cs[..., :-n]
+        c = cn[..., n:] - cn[..., :-n]
+        out[..., n - 1:] = np.where(c == n, s / n if mean else s, np.nan)
+    return out
+
+def _log(x):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x > 0, np.log(np.where(x > 0, x, 1.0)), np.nan)
+
+# nombre -> (función, cantidad de series, cantidad de enteros (mín, máx), descripción)
+FUNCS = {
+    "lag": (lambda x, n: _shift(x, n), 1, (1, 1), "lag(A, n): valor de n meses antes"),
+    "diff": (lambda x, n=1: x - _shift(x, n), 1, (0, 1), "diff(A, n=1): A menos A de n meses antes"),
+    "pct_change": (lambda x, n=1: _div(x, _shift(x, n)) - 1.0, 1, (0, 1), "pct_change(A, n=1): variación relativa contra n meses antes"),
+    "rolling_mean": (lambda x, n: rolling_window(x, n, True), 1, (1, 1), "rolling_mean(A, n): promedio móvil de n meses"),
+    "rolling_sum": (lambda x, n: rolling_window(x, n, False), 1, (1, 1), "rolling_sum(A, n): suma móvil de n meses"),
+    "abs": (np.abs, 1, (0, 0), "abs(A): valor absoluto"),
+    "log": (_log, 1, (0, 0), "log(A): logaritmo natural (NaN si A <= 0)"),
+    "min": (np.minimum, 2, (0, 0), "min(A, B): mínimo mes a mes"),
+    "max": (np.maximum, 2, (0, 0), "max(A, B): máximo mes a mes"),
+}
+
+_BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: _div,
+    ast.Pow: lambda a, b: np.power(np.asarray(a, dtype=np.float64), b),
+}
+
+# ---------- compilación ----------
+class Formula:
+    """Fórmula validada y compilada; `evaluate(env)` con env letra -> array."""
+
+    def __init__(self, text: str, fn, variables):
+        self.text = text
+        self._fn = fn
+        self.variables = tuple(sorted(variables))
+
+    def evaluate(self, env: dict) -> np.ndarray:
+        missing = [v for v in self.variables if v not in env]
+        if missing:
+            raise FormulaError(f"Variables sin asignar: {', '.join(missing)}")
+        with np.errstate(all="ignore"):
+            return np.asarray(self._fn(env), dtype=np.float64)
+
+def _int_arg(node, fname):
+    neg = isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub)
+    val = node.operand if neg else node
+    if not (isinstance(val, ast.Constant) and type(val.value) is int):
+        raise FormulaError(f"{fname}: el número de meses debe ser un entero")
+    n = -val.value if neg else val.value
+    if abs(n) > 1200:
+        raise FormulaError(f"{fname}: ventana demasiado grande ({n})")
+    if fname != "lag" and n < 1:
+        raise FormulaError(f"{fname}: la ventana debe ser >= 1")
+    return n
+
+def _compile(node, names: set):
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, names)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        v = float(node.value)
+        return lambda env: v
+    if isinstance(node, ast.Name):
+        if not _VAR_RE.match(node.id):
+            raise FormulaError(f"Nombre desconocido: {node.id!r} (las variables son letras A, B, C...)")
+        names.add(node.id)
+        name = node.id
+        return lambda env: env[name]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        f = _compile(node.operand, names)
+        if isinstance(node.op, ast.USub):
+            return lambda env: -f(env)
+        return f
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+        op = _BINOPS[type(node.op)]
+        left, right = _compile(node.left, names), _compile(node.right, names)
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCS:
+            raise FormulaError(f"Función no permitida: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise FormulaError(f"{node.func.id}: sólo se admiten argumentos posicionales")
+        fname = node.func.id
+        fn, n_series, (n_min, n_max), _ = FUNCS[fname]
+        if not (n_series + n_min <= len(node.args) <= n_series + n_max):
+            raise FormulaError(f"{fname}: cantidad de argumentos incorrecta")
+        series = []
+        for a in node.args[:n_series]:
+            used = set()
+            series.append(_compile(a, used))
+            # las que llevan meses (lag, diff, rolling...) recorren el eje de
+            # meses: una constante no lo tiene
+            if n_max and not used:
+                raise FormulaError(f"{fname}: la serie debe usar al menos una variable (A, B, C...)")
+            names |= used
+        ints = [_int_arg(a, fname) for a in node.args[n_series:]]
+        return lambda env: fn(*[s(env) for s in series], *ints)
+    raise FormulaError(f"Expresión no permitida: {ast.unparse(node)}")
+
+@lru_cache(maxsize=256)
+def compile_formula(text: str) -> Formula:
+    """Valida y compila `text`; las fórmulas ya vistas salen del caché."""
+    text = (text or "").strip()
+    if not text:
+        raise FormulaError("La fórmula está vacía")
+    if len(text) > MAX_LEN:
+        raise FormulaError(f"La fórmula supera {MAX_LEN} caracteres")
+    try:
+        tree = ast.parse(text.replace("×", "*").replace("÷", "/"), mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"Error de sintaxis: {e.msg}") from None
+    names = set()
+    fn = _compile(tree, names)
+    return Formula(text, fn, names)
@@ -1,61 +1,75 @@
-# pages/1_Series.py
-import streamlit as st
-import altair as alt
-from utils_data import load_df, get_defaults, month_options, variable_catalog, label_to_code
-
-st.set_page_config(page_title="Series", page_icon="📈", layout="wide")
-st.title("📈 Series por variable")
-
-df = load_df()
-if df.empty:
-    st.error("No hay datos.")
-    st.stop()
-
-st.sidebar.header("Filtros")
-ent_default, var_default_label = get_defaults(df)
-
-entidades = sorted(df["Entidad"].unique())
-ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=(entidades.index(ent_default) if ent_default in entidades else 0))
-
-cat = variable_catalog(df)
-var_label = st.sidebar.selectbox("Variable (código – descripción)", options=cat["Var_label"].tolist(),
-                                 index=(cat["Var_label"].tolist().index(var_default_label) if var_default_label in cat["Var_label"].tolist() else 0))
-var_code = label_to_code(df, var_label)
-
-months = month_options(df)
-rango = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
-m_min, m_max = rango
-
-mask = (
-    (df["Entidad"] == ent_sel) &
-    (df["Var_code"] == var_code) &
-    (df["Mes"] >= m_min) & (df["Mes"] <= m_max)
-)
-dfv = df.loc[mask, ["Fecha_dt", "Mes", "Entidad", "Var_label", "Valor_num"]].copy()
-
-if dfv.empty:
-    st.warning("No hay datos para ese filtro.")
-    st.stop()
-
-chart = (
-    alt.Chart(dfv, height=420)
-    .mark_line(point=True)
-    .encode(
-        x=alt.X("Fecha_dt:T", title="Mes"),
-        y=alt.Y("Valor_num:Q", title="Valor"),
-        color=alt.Color("Entidad:N", title="Entidad"),
-        tooltip=[
-            alt.Tooltip("Mes:N"),
-            alt.Tooltip("Entidad:N"),
-            alt.Tooltip("Var_label:N", title="Variable"),
-            alt.Tooltip("Valor_num:Q", title="Valor", format=",.2f"),
-        ],
-    )
-)
-st.altair_chart(chart, use_container_width=True)
-
-st.caption("Tabla de datos")
-st.dataframe(
-    dfv.sort_values(["Entidad", "Fecha_dt"]).rename(columns={"Valor_num": "Valor"}),
-    use_container_width=True,
-)
+# pages/1_Series.py
+import streamlit as st
+import altair as alt
+from utils_data import load_meta, label_to_code, transformed_frame, TRANSFORMS, chart_data, paginated_dataframe, group_note, page_timer
+
+st.set_page_config(page_title="Series", page_icon="📈", layout="wide")
+st.title("📈 Series por variable")
+with page_timer("Series") as t:
+    meta = load_meta()
+    t.lap("metadatos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    st.sidebar.header("Filtros")
+    ent_default, var_default_label = meta.ent_default, meta.var_default_label
+
+    entidades = meta.entidades
+    ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=(entidades.index(ent_default) if ent_default in entidades else 0))
+    group_note(ent_sel)
+
+    cat = meta.catalogo
+    var_label = st.sidebar.selectbox("Variable (código – descripción)", options=cat["Var_label"].tolist(),
+                                     index=(cat["Var_label"].tolist().index(var_default_label) if var_default_label in cat["Var_label"].tolist() else 0))
+    var_code = label_to_code(meta, var_label)
+
+    months = meta.meses
+    rango = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
+    m_min, m_max = rango
+
+    kind = st.sidebar.radio("Transformación", options=list(TRANSFORMS), format_func=TRANSFORMS.get, index=0)
+    base_mes, window = None, 3
+    if kind in ("base100", "cagr"):
+        base_mes = st.sidebar.select_slider("Mes base", options=months[months.index(m_min):months.index(m_max) + 1], value=m_min)
+    elif kind == "media_movil":
+        window = st.sidebar.number_input("Meses de la ventana", min_value=2, max_value=36, value=3, step=1)
+    y_axis_title = TRANSFORMS[kind]
+
+    t.lap("filtros")
+
+    dfv = transformed_frame(ent_sel, [var_code], kind, m_min, m_max, base_mes, window)
+    # el frame memoizado es compartido: la columna se agrega en uno nuevo
+    cols = list(dfv.columns)
+    dfv = dfv.assign(Entidad=ent_sel)[cols[:2] + ["Entidad"] + cols[2:]]
+
+    if dfv.empty:
+        st.warning("No hay datos para ese filtro.")
+        st.stop()
+
+    t.lap("cálculo")
+
+    # entidad y variable son constantes: van en el título, no en cada punto
+    plot = chart_data(dfv, "Fecha_dt", "Valor_calc", name="series")
+    chart = (
+        alt.Chart(plot, height=420, title=f"{ent_sel} – {var_label}")
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("Fecha_dt:T", title="Mes"),
+            y=alt.Y("Valor_calc:Q", title=y_axis_title),
+            tooltip=[
+                alt.Tooltip("yearmonth(Fecha_dt):T", title="Mes"),
+                alt.Tooltip("Valor_calc:Q", title=y_axis_title, format=",.2f"),
+            ],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+    t.lap("gráfico")
+
+    st.caption("Tabla de datos")
+    tabla = dfv if kind != "nivel" else dfv.drop(columns=["Valor_calc"])
+    paginated_dataframe(
+        tabla.sort_values(["Entidad", "Fecha_dt"]).rename(columns={"Valor_num": "Valor", "Valor_calc": y_axis_title}),
+        key="series_tabla", use_container_width=True,
+    )
+    t.done("tabla")
@@ -1,72 +1,76 @@
-# pages/2_Comparador.py
-import streamlit as st
-import altair as alt
-import numpy as np
-from utils_data import load_df, get_defaults, month_options, variable_catalog, label_to_code
-
-st.set_page_config(page_title="Comparador", page_icon="🧭", layout="wide")
-st.title("🧭 Comparador de variables")
-
-df = load_df()
-if df.empty:
-    st.error("No hay datos.")
-    st.stop()
-
-st.sidebar.header("Filtros")
-ent_default, var_default_label = get_defaults(df)
-entidades = sorted(df["Entidad"].unique())
-ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=(entidades.index(ent_default) if ent_default in entidades else 0))
-
-cat = variable_catalog(df)
-labs_all = cat["Var_label"].tolist()
-preselect = [var_default_label] if var_default_label in labs_all else labs_all[:3]
-vars_sel_labels = st.sidebar.multiselect("Variables (código – descripción)", options=labs_all, default=preselect)
-vars_sel_codes = [label_to_code(df, lab) for lab in vars_sel_labels]
-
-months = month_options(df)
-rango = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
-m_min, m_max = rango
-
-normalizar = st.sidebar.checkbox("Base 100 (primer mes del rango)", value=False)
-yoy = st.sidebar.checkbox("Variación YoY (%)", value=False)
-
-mask = (df["Entidad"] == ent_sel) & (df["Var_code"].isin(vars_sel_codes)) & (df["Mes"] >= m_min) & (df["Mes"] <= m_max)
-dfv = df.loc[mask, ["Fecha_dt", "Mes", "Var_label", "Valor_num"]].copy()
-
-if dfv.empty:
-    st.warning("No hay datos para ese filtro.")
-    st.stop()
-
-if normalizar:
-    base = dfv.groupby("Var_label")["Valor_num"].transform("first")
-    dfv["Valor_calc"] = (dfv["Valor_num"] / base) * 100.0
-    y_axis_title = "Índice (Base=100)"
-elif yoy:
-    dfv = dfv.sort_values("Fecha_dt").copy()
-    dfv["Valor_calc"] = dfv.groupby("Var_label")["Valor_num"].transform(lambda s: s.pct_change(12) * 100.0)
-    y_axis_title = "YoY (%)"
-else:
-    dfv["Valor_calc"] = dfv["Valor_num"]
-    y_axis_title = "Valor"
-
-chart = (
-    alt.Chart(dfv.dropna(subset=["Valor_calc"]), height=420)
-    .mark_line(point=True)
-    .encode(
-        x=alt.X("Fecha_dt:T", title="Mes"),
-        y=alt.Y("Valor_calc:Q", title=y_axis_title),
-        color=alt.Color("Var_label:N", title="Variable"),
-        tooltip=[
-            alt.Tooltip("Mes:N"),
-            alt.Tooltip("Var_label:N", title="Variable"),
-            alt.Tooltip("Valor_calc:Q", title=y_axis_title, format=",.2f"),
-        ],
-    )
-)
-st.altair_chart(chart, use_container_width=True)
-
-st.caption("Tabla de datos")
-st.dataframe(
-    dfv.sort_values(["Var_label", "Fecha_dt"]).rename(columns={"Valor_calc": y_axis_title}),
-    use_container_width=True,
-)
+# pages/2_Comparador.py
+import streamlit as st
+import altair as alt
+import numpy as np
+from utils_data import load_meta, label_to_code, transformed_frame, TRANSFORMS, chart_data, paginated_dataframe, group_note, page_timer
+
+st.set_page_config(page_title="Comparador", page_icon="🧭", layout="wide")
+st.title("🧭 Comparador de variables")
+with page_timer("Comparador") as t:
+    meta = load_meta()
+    t.lap("metadatos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    st.sidebar.header("Filtros")
+    ent_default, var_default_label = meta.ent_default, meta.var_default_label
+    entidades = meta.entidades
+    ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=(entidades.index(ent_default) if ent_default in entidades else 0))
+    group_note(ent_sel)
+
+    cat = meta.catalogo
+    labs_all = cat["Var_label"].tolist()
+    preselect = [var_default_label] if var_default_label in labs_all else labs_all[:3]
+    vars_sel_labels = st.sidebar.multiselect("Variables (código – descripción)", options=labs_all, default=preselect)
+    vars_sel_codes = [label_to_code(meta, lab) for lab in vars_sel_labels]
+
+    months = meta.meses
+    rango = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
+    m_min, m_max = rango
+
+    kind = st.sidebar.radio(
+        "Transformación", options=list(TRANSFORMS), format_func=TRANSFORMS.get, index=0,
+    )
+    base_mes, window = None, 3
+    if kind in ("base100", "cagr"):
+        rango_meses = months[months.index(m_min):months.index(m_max) + 1]
+        base_mes = st.sidebar.select_slider("Mes base", options=rango_meses, value=m_min)
+    elif kind == "media_movil":
+        window = st.sidebar.number_input("Meses de la ventana", min_value=2, max_value=36, value=3, step=1)
+
+    t.lap("filtros")
+
+    dfv = transformed_frame(ent_sel, vars_sel_codes, kind, m_min, m_max, base_mes, window)
+    y_axis_title = TRANSFORMS[kind]
+
+    if dfv.empty:
+        st.warning("No hay datos para ese filtro.")
+        st.stop()
+
+    t.lap("cálculo")
+
+    plot = chart_data(dfv, "Fecha_dt", "Valor_calc", "Var_label", name="comparador")
+    chart = (
+        alt.Chart(plot, height=420)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("Fecha_dt:T", title="Mes"),
+            y=alt.Y("Valor_calc:Q", title=y_axis_title),
+            color=alt.Color("Var_label:N", title="Variable"),
+            tooltip=[
+                alt.Tooltip("yearmonth(Fecha_dt):T", title="Mes"),
+                alt.Tooltip("Var_label:N", title="Variable"),
+                alt.Tooltip("Valor_calc:Q", title=y_axis_title, format=",.2f"),
+            ],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+    t.lap("gráfico")
+
+    st.caption("Tabla de datos")
+    paginated_dataframe(
+        dfv.sort_values(["Var_label", "Fecha_dt"]).rename(columns={"Valor_calc": y_axis_title}),
+        key="comparador_tabla", use_container_width=True,
+    )
+    t.done("tabla")
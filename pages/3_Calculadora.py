@@ -1,71 +1,86 @@
-# pages/3_Calculadora.py
-import streamlit as st
-import altair as alt
-import numpy as np
-from utils_data import load_df, get_defaults, month_options, variable_catalog, label_to_code
-
-st.set_page_config(page_title="Calculadora", page_icon="🧮", layout="wide")
-st.title("🧮 Calculadora entre variables")
-
-df = load_df()
-if df.empty:
-    st.error("No hay datos.")
-    st.stop()
-
-st.sidebar.header("Filtros")
-ent_default, var_default_label = get_defaults(df)
-entidades = sorted(df["Entidad"].unique())
-ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=(entidades.index(ent_default) if ent_default in entidades else 0))
-
-cat = variable_catalog(df)
-labs_all = cat["Var_label"].tolist()
-idx_def = labs_all.index(var_default_label) if var_default_label in labs_all else 0
-var_a_label = st.sidebar.selectbox("Variable A (código – descripción)", options=labs_all, index=idx_def)
-var_b_label = st.sidebar.selectbox("Variable B (código – descripción)", options=labs_all, index=idx_def)
-
-var_a = label_to_code(df, var_a_label)
-var_b = label_to_code(df, var_b_label)
-
-op = st.sidebar.selectbox("Operación", options=["A + B", "A - B", "A × B", "A ÷ B"], index=3)
-
-months = month_options(df)
-rango = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
-m_min, m_max = rango
-
-def get_series(code):
-    m = (df["Entidad"] == ent_sel) & (df["Var_code"] == code) & (df["Mes"] >= m_min) & (df["Mes"] <= m_max)
-    s = df.loc[m, ["Fecha_dt", "Mes", "Valor_num"]].copy()
-    return s.set_index("Fecha_dt").sort_index()
-
-sa = get_series(var_a)
-sb = get_series(var_b)
-base = sa.join(sb, how="outer", lsuffix="_A", rsuffix="_B")
-
-if op == "A + B":
-    base["Resultado"] = base["Valor_num_A"] + base["Valor_num_B"]
-elif op == "A - B":
-    base["Resultado"] = base["Valor_num_A"] - base["Valor_num_B"]
-elif op == "A × B":
-    base["Resultado"] = base["Valor_num_A"] * base["Valor_num_B"]
-else:
-    denom = base["Valor_num_B"].replace(0, np.nan)
-    base["Resultado"] = base["Valor_num_A"] / denom
-
-plot = base.reset_index().rename(columns={"index": "Fecha_dt"})
-plot["Mes"] = plot["Fecha_dt"].dt.strftime("%Y-%m")
-chart = (
-    alt.Chart(plot.dropna(subset=["Resultado"]), height=420)
-    .mark_line(point=True)
-    .encode(
-        x=alt.X("Fecha_dt:T", title="Mes"),
-        y=alt.Y("Resultado:Q", title=f"Resultado ({op})"),
-        tooltip=[alt.Tooltip("Mes:N"), alt.Tooltip("Resultado:Q", format=",.4f")],
-    )
-)
-st.altair_chart(chart, use_container_width=True)
-
-st.caption("Tabla de datos")
-out = plot[["Mes", "Valor_num_A", "Valor_num_B", "Resultado"]].rename(
-    columns={"Valor_num_A": var_a_label, "Valor_num_B": var_b_label}
-)
-st.dataframe(out, use_container_width=True)
+# pages/3_Calculadora.py
+import streamlit as st
+import altair as alt
+from formula import FUNCS, FormulaError
+from utils_data import load_meta, label_to_code, formula_view, formula_table, iter_chunks, csv_tempfile, chart_data, paginated_dataframe, group_note, page_timer
+
+st.set_page_config(page_title="Calculadora", page_icon="🧮", layout="wide")
+st.title("🧮 Calculadora entre variables")
+with page_timer("Calculadora") as t:
+    meta = load_meta()
+    t.lap("metadatos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    st.sidebar.header("Filtros")
+    ent_default, var_default_label = meta.ent_default, meta.var_default_label
+    entidades = meta.entidades
+    ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=(entidades.index(ent_default) if ent_default in entidades else 0))
+    group_note(ent_sel)
+
+    cat = meta.catalogo
+    labs_all = cat["Var_label"].tolist()
+    idx_def = labs_all.index(var_default_label) if var_default_label in labs_all else 0
+
+    LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    n_vars = st.sidebar.number_input("Cantidad de variables", min_value=1, max_value=len(LETRAS), value=2, step=1)
+    asignadas = {}
+    for letra in LETRAS[:n_vars]:
+        lab = st.sidebar.selectbox(f"Variable {letra} (código – descripción)", options=labs_all, index=idx_def, key=f"var_{letra}")
+        asignadas[letra] = lab
+
+    formula = st.sidebar.text_input("Fórmula", value="A / B" if n_vars >= 2 else "A")
+    with st.sidebar.expander("Funciones disponibles"):
+        st.markdown("Operadores: `+ - * / **` y paréntesis. División por cero = vacío.")
+        for _, _, _, ayuda in FUNCS.values():
+            st.markdown(f"- `{ayuda.split(':')[0]}`: {ayuda.split(':', 1)[1].strip()}")
+
+    months = meta.meses
+    rango = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
+    m_min, m_max = rango
+    todas = st.sidebar.checkbox("Calcular para todas las entidades", value=False)
+
+    t.lap("filtros")
+
+    bindings = tuple((letra, label_to_code(meta, lab)) for letra, lab in asignadas.items())
+    # resultados memoizados por (fórmula, variables, entidad, rango)
+    try:
+        if todas:
+            tabla, largo = formula_table(formula, bindings, m_min, m_max)
+        else:
+            view = formula_view(formula, bindings, ent_sel, m_min, m_max)
+    except FormulaError as e:
+        st.error(f"Fórmula inválida: {e}")
+        st.stop()
+    t.lap("cálculo")
+
+    if not todas:
+        plot = view[["Fecha_dt", "Mes", "Resultado"]]
+        chart = (
+            alt.Chart(chart_data(plot, "Fecha_dt", "Resultado", name="calculadora"), height=420)
+            .mark_line(point=True)
+            .encode(
+                x=alt.X("Fecha_dt:T", title="Mes"),
+                y=alt.Y("Resultado:Q", title=f"Resultado ({formula})"),
+                tooltip=[alt.Tooltip("yearmonth(Fecha_dt):T", title="Mes"), alt.Tooltip("Resultado:Q", format=",.4f")],
+            )
+        )
+        st.altair_chart(chart, use_container_width=True)
+        t.lap("gráfico")
+
+        st.caption("Tabla de datos")
+        out = view.drop(columns="Fecha_dt")
+        out = out.rename(columns={c: f"{c}: {asignadas[c]}" for c in out.columns if c in asignadas})
+        st.dataframe(out, use_container_width=True)
+    else:
+        st.caption(f"Resultado de `{formula}` para todas las entidades")
+        paginated_dataframe(tabla, key="calculadora_tabla", use_container_width=True)
+
+        st.download_button(
+            label="⬇️ Descargar resultado (CSV)",
+            data=csv_tempfile(iter_chunks(largo)),
+            file_name=f"calculadora_{m_min}_{m_max}.csv",
+            mime="text/csv",
+        )
+    t.done("tabla")
@@ -0,0 +1,82 @@
+# pages/4_Ranking.py
+import streamlit as st
+import pandas as pd
+import altair as alt
+from utils_data import load_meta, label_to_code, ranking, fmt_num, iter_chunks, csv_tempfile, paginated_dataframe, page_timer
+
+st.set_page_config(page_title="Ranking", page_icon="🏆", layout="wide")
+st.title("🏆 Ranking – todas las entidades")
+with page_timer("Ranking") as t:
+    meta = load_meta()
+    t.lap("metadatos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    st.sidebar.header("Filtros")
+    labs_all = meta.labels
+    idx_def = labs_all.index(meta.var_default_label) if meta.var_default_label in labs_all else 0
+    var_label = st.sidebar.selectbox("Variable (código – descripción)", options=labs_all, index=idx_def)
+    var_code = label_to_code(meta, var_label)
+
+    months = meta.meses
+    mes_sel = st.sidebar.select_slider("Mes", options=months, value=months[-1])
+    top_n = st.sidebar.slider("Entidades en el gráfico", min_value=5, max_value=50, value=20, step=5)
+
+    t.lap("filtros")
+
+    res = ranking(var_code, mes_sel)
+    t.lap("cálculo")
+    if res.empty:
+        st.warning("Ninguna entidad tiene dato para esa variable en ese mes.")
+        st.stop()
+
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        st.subheader(var_label)
+    with c2:
+        st.metric("Mes", mes_sel)
+    with c3:
+        st.metric("Entidades", len(res))
+
+    def fmt_mov(v):
+        if pd.isna(v):
+            return "nuevo"
+        return f"▲ {int(v)}" if v > 0 else (f"▼ {int(-v)}" if v < 0 else "=")
+
+    st.markdown(f"### 📊 Top {min(top_n, len(res))}")
+    top = res.head(top_n)[["Puesto", "Entidad", "Valor", "MoM %", "YoY %"]]
+    chart = (
+        alt.Chart(top, height=max(240, 18 * len(top)))
+        .mark_bar()
+        .encode(
+            x=alt.X("Valor:Q", title="Valor"),
+            y=alt.Y("Entidad:N", sort="-x", title=None),
+            tooltip=[
+                alt.Tooltip("Puesto:Q"),
+                alt.Tooltip("Entidad:N"),
+                alt.Tooltip("Valor:Q", format=",.2f"),
+                alt.Tooltip("MoM %:Q", format=",.1f"),
+                alt.Tooltip("YoY %:Q", format=",.1f"),
+            ],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+    t.lap("gráfico")
+
+    st.markdown("### 📋 Tabla completa")
+    tabla = res.copy()
+    tabla["Valor"] = tabla["Valor"].map(fmt_num)
+    tabla["MoM %"] = tabla["MoM %"].map(lambda x: "—" if pd.isna(x) else f"{fmt_num(x, 1)}%")
+    tabla["YoY %"] = tabla["YoY %"].map(lambda x: "—" if pd.isna(x) else f"{fmt_num(x, 1)}%")
+    tabla["Percentil"] = tabla["Percentil"].map(lambda x: fmt_num(x, 0))
+    tabla["Cambio de puesto"] = tabla["Cambio de puesto"].map(fmt_mov)
+    paginated_dataframe(tabla, key="ranking_tabla", use_container_width=True, hide_index=True)
+
+    st.download_button(
+        label="⬇️ Descargar ranking (CSV)",
+        data=csv_tempfile(iter_chunks(res)),
+        file_name=f"ranking_{var_code}_{mes_sel}.csv",
+        mime="text/csv",
+    )
+    t.done("tabla y descarga")
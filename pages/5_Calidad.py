@@ -0,0 +1,69 @@
+# pages/5_Calidad.py
+import streamlit as st
+from quality import TIPOS, Z_UMBRAL, summary
+from utils_data import load_meta, load_quality, iter_chunks, csv_tempfile, paginated_dataframe, page_timer
+
+st.set_page_config(page_title="Calidad", page_icon="🧪", layout="wide")
+st.title("🧪 Calidad de datos")
+with page_timer("Calidad") as t:
+    meta = load_meta()
+    rep = load_quality()
+    t.lap("datos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    # ---------- resumen ----------
+    res = summary(rep)
+    for col, r in zip(st.columns(len(res)), res.itertuples()):
+        col.metric(r.Tipo.capitalize(), f"{r.Casos:,}".replace(",", "."), help=r.Descripción)
+
+    st.caption(
+        "El control corre al cargar el dataset y se guarda con él: sólo se rehace para los años de archivos que "
+        "cambiaron (duplicados y no numéricos) y una vez por versión (huecos y atípicos). Cómo los trata el tablero: "
+        "ante duplicados usa el último valor (el del archivo que ordena después); los valores no numéricos quedan "
+        "vacíos; las variaciones MoM / YoY se calculan sobre meses de calendario, así que con un hueco dan vacío "
+        f"en lugar de comparar contra otro mes; los atípicos (|z| > {Z_UMBRAL:g}) sólo se señalan."
+    )
+
+    if rep.empty:
+        st.success("No se encontraron problemas.")
+        t.done("resumen")
+        st.stop()
+
+    # ---------- filtros ----------
+    st.sidebar.header("Filtros")
+    con_casos = [k for k in TIPOS if (rep["Tipo"] == k).any()]
+    tipos = st.sidebar.multiselect("Tipo", options=con_casos, default=con_casos)
+    ents = ["(todas)"] + [e for e in meta.entidades if e in set(rep["Entidad"])]
+    entidad = st.sidebar.selectbox("Entidad", options=ents)
+
+    vista = rep[rep["Tipo"].isin(tipos)]
+    if entidad != "(todas)":
+        vista = vista[vista["Entidad"] == entidad]
+    t.lap("filtros")
+
+    # ---------- detalle ----------
+    st.markdown(f"### 📋 Hallazgos ({len(vista):,})".replace(",", "."))
+    if vista.empty:
+        st.info("No hay hallazgos con esos filtros.")
+    else:
+        paginated_dataframe(vista, key="calidad_tabla", use_container_width=True, hide_index=True)
+        st.download_button(
+            label="⬇️ Descargar hallazgos (CSV)",
+            data=csv_tempfile(iter_chunks(vista)),
+            file_name="calidad.csv",
+            mime="text/csv",
+        )
+
+    por_archivo = rep[rep["Archivos"] != ""]
+    if not por_archivo.empty:
+        with st.expander("Por archivo"):
+            tabla = (
+                por_archivo.assign(Archivo=por_archivo["Archivos"].str.split(", "))
+                .explode("Archivo")
+                .pivot_table(index="Archivo", columns="Tipo", aggfunc="size", fill_value=0)
+                .reset_index()
+            )
+            st.dataframe(tabla, use_container_width=True, hide_index=True)
+    t.done("tabla")
@@ -0,0 +1,83 @@
+# pages/6_Exportar.py
+import streamlit as st
+from utils_data import (
+    load_meta, label_to_code, is_group, export_plan, fmt_num, EXPORT_FORMATS, EXPORT_LAYOUTS, EXPORT_MAX_MB, page_timer,
+)
+
+st.set_page_config(page_title="Exportar", page_icon="📦", layout="wide")
+st.title("📦 Exportar datos")
+with page_timer("Exportar") as t:
+    meta = load_meta()
+    t.lap("metadatos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    st.sidebar.header("Filtros")
+    reales = [e for e in meta.entidades if not is_group(e)]
+    ents_sel = st.sidebar.multiselect("Entidades (vacío = todas)", options=meta.entidades)
+    agregados = st.sidebar.checkbox("Incluir agregados (Σ) en «todas»", value=False, disabled=bool(ents_sel))
+
+    cat = meta.catalogo
+    labs_all = cat["Var_label"].tolist()
+    preselect = [meta.var_default_label] if meta.var_default_label in labs_all else labs_all[:1]
+    vars_sel_labels = st.sidebar.multiselect("Variables (código – descripción)", options=labs_all, default=preselect)
+    vars_sel_codes = [label_to_code(meta, lab) for lab in vars_sel_labels]
+
+    months = meta.meses
+    m_min, m_max = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
+    layout = st.sidebar.radio("Formato de tabla", options=list(EXPORT_LAYOUTS), format_func=EXPORT_LAYOUTS.get)
+    fmt = st.sidebar.radio("Archivo", options=list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get)
+    t.lap("filtros")
+
+    if not vars_sel_codes:
+        st.info("Elegí al menos una variable.")
+        st.stop()
+
+    entidades = ents_sel or (meta.entidades if agregados else reales)
+    plan = export_plan(entidades, vars_sel_codes, m_min, m_max, layout)
+    mb = plan.est_bytes(fmt) / 2**20
+    t.lap("estimación")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Entidades", len(plan.entities))
+    c2.metric("Variables", len(plan.codes))
+    c3.metric("Datos", f"{plan.rows:,}".replace(",", "."), help="Filas en formato largo (con el backend parquet, estimadas).")
+    c4.metric("Tamaño estimado", f"{fmt_num(mb, 1)} MB")
+    if layout == "ancho":
+        st.caption(f"≈ {plan.wide_rows:,} filas (entidad, mes) × {len(plan.codes)} columnas de variables.".replace(",", "."))
+
+    if not plan.rows:
+        st.warning("No hay datos para esos filtros.")
+        st.stop()
+    if mb > EXPORT_MAX_MB:
+        st.warning(f"El extracto supera el máximo de {fmt_num(EXPORT_MAX_MB, 0)} MB: acotá entidades, variables o meses.")
+        st.stop()
+
+    st.caption(
+        "El archivo se arma por bloques en un archivo temporal del servidor; al descargarlo, Streamlit lo "
+        f"guarda entero en memoria durante la sesión (de ahí el tope de {fmt_num(EXPORT_MAX_MB, 0)} MB). "
+        "Ante datos repetidos (archivos superpuestos) queda el último, como en el resto del tablero."
+    )
+    # el archivo se arma sólo al pedirlo y se guarda con los filtros que lo generaron:
+    # los reruns de la página no lo vuelven a generar
+    key = (plan.entities, plan.codes, plan.m_min, plan.m_max, layout, fmt)
+    prev = st.session_state.get("export_file")
+    if st.button("⚙️ Preparar archivo"):
+        if prev is not None:
+            prev[1].close()
+        with st.spinner("Generando…"):
+            prev = st.session_state["export_file"] = (key, plan.write(fmt))
+        t.lap("archivo")
+    if prev is None or prev[0] != key:
+        st.info("Prepará el archivo para descargarlo.")
+        st.stop()
+
+    ext = "parquet" if fmt == "parquet" else "csv"
+    st.download_button(
+        label=f"⬇️ Descargar ({EXPORT_FORMATS[fmt]})",
+        data=prev[1],
+        file_name=f"bcra_{layout}_{m_min}_{m_max}.{ext}",
+        mime="application/octet-stream" if fmt == "parquet" else "text/csv",
+    )
+    t.done("descarga")
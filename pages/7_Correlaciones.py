@@ -0,0 +1,103 @@
+# pages/7_Correlaciones.py
+import streamlit as st
+import altair as alt
+import pandas as pd
+from utils_data import (
+    load_meta, label_to_code, variable_correlations, entity_correlations, top_pairs, heatmap_data,
+    CORR_METHODS, CORR_MIN_OBS, paginated_dataframe, group_note, page_timer,
+)
+
+st.set_page_config(page_title="Correlaciones", page_icon="🔗", layout="wide")
+st.title("🔗 Correlaciones")
+with page_timer("Correlaciones") as t:
+    meta = load_meta()
+    t.lap("metadatos")
+    if not meta.entidades:
+        st.error("No hay datos.")
+        st.stop()
+
+    st.sidebar.header("Filtros")
+    MODOS = {"variables": "Variables de una entidad", "entidades": "Una variable entre entidades"}
+    modo = st.sidebar.radio("Comparar", options=list(MODOS), format_func=MODOS.get)
+
+    cat = meta.catalogo
+    labs_all = cat["Var_label"].tolist()
+    if modo == "variables":
+        entidades = meta.entidades
+        ent_sel = st.sidebar.selectbox("Entidad", options=entidades, index=entidades.index(meta.ent_default) if meta.ent_default in entidades else 0)
+        group_note(ent_sel)
+        vars_sel_labels = st.sidebar.multiselect("Variables (vacío = todas las de la entidad)", options=labs_all)
+        vars_sel_codes = [label_to_code(meta, lab) for lab in vars_sel_labels]
+    else:
+        idx_def = labs_all.index(meta.var_default_label) if meta.var_default_label in labs_all else 0
+        var_label = st.sidebar.selectbox("Variable (código – descripción)", options=labs_all, index=idx_def)
+        var_code = label_to_code(meta, var_label)
+
+    months = meta.meses
+    m_min, m_max = st.sidebar.select_slider("Rango de meses", options=months, value=(months[0], months[-1]))
+    SERIES = {"nivel": "Nivel", "yoy": "Variación YoY (%)"}
+    kind = st.sidebar.radio("Serie", options=list(SERIES), format_func=SERIES.get)
+    method = st.sidebar.radio("Método", options=list(CORR_METHODS), format_func=CORR_METHODS.get)
+    top_k = st.sidebar.slider("Pares en el gráfico", min_value=5, max_value=100, value=25, step=5)
+    t.lap("filtros")
+
+    # matrices memoizadas por (selección, rango, serie, método)
+    if modo == "variables":
+        res = variable_correlations(ent_sel, vars_sel_codes, m_min, m_max, kind, method)
+        titulo = ent_sel
+    else:
+        res = entity_correlations(var_code, m_min, m_max, kind, method)
+        titulo = var_label
+    t.lap("cálculo")
+
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        st.subheader(titulo)
+    with c2:
+        st.metric("Series", len(res.labels))
+    with c3:
+        st.metric("Pares", f"{len(res.labels) * (len(res.labels) - 1) // 2:,}".replace(",", "."))
+    st.caption(
+        f"Cada par usa sólo los meses en que las dos series tienen dato (mínimo {CORR_MIN_OBS} en común). "
+        "La variación YoY se calcula sobre meses calendario antes de recortar el rango."
+    )
+    if res.sin_datos:
+        with st.expander(f"{len(res.sin_datos)} series sin meses suficientes (no se incluyen)"):
+            st.write(", ".join(res.sin_datos))
+
+    pares = top_pairs(res, top_k)
+    if pares.empty:
+        st.warning("No hay pares con meses suficientes en común para ese filtro.")
+        st.stop()
+
+    st.markdown(f"### 🗺️ Mapa de calor ({len(pares)} pares con mayor |r|)")
+    celdas = heatmap_data(res, pares)
+    orden = list(dict.fromkeys(pares["A"].tolist() + pares["B"].tolist()))
+    lado = max(320, 18 * len(orden))
+    chart = (
+        alt.Chart(celdas, height=lado, width=lado)
+        .mark_rect()
+        .encode(
+            x=alt.X("A:N", sort=orden, title=None, axis=alt.Axis(labelLimit=160)),
+            y=alt.Y("B:N", sort=orden, title=None, axis=alt.Axis(labelLimit=160)),
+            color=alt.Color("r:Q", scale=alt.Scale(domain=[-1, 1], scheme="redblue", reverse=True), title="r"),
+            tooltip=[
+                alt.Tooltip("A:N"), alt.Tooltip("B:N"),
+                alt.Tooltip("r:Q", format=".3f"), alt.Tooltip("Meses en común:Q"),
+            ],
+        )
+    )
+    st.altair_chart(chart, use_container_width=False)
+    t.lap("gráfico")
+
+    st.markdown("### 📋 Pares")
+    tabla = top_pairs(res, len(res.labels) ** 2)
+    paginated_dataframe(tabla, key="correlaciones_tabla", use_container_width=True, hide_index=True)
+    matriz = pd.DataFrame(res.r, index=pd.Index(res.labels, name="Serie"), columns=res.labels).reset_index()
+    st.download_button(
+        label="⬇️ Descargar matriz (CSV)",
+        data=matriz.to_csv(index=False, sep=";").encode("utf-8-sig"),  # matriz chica: va directo
+        file_name=f"correlaciones_{modo}_{m_min}_{m_max}.csv",
+        mime="text/csv",
+    )
+    t.done("tabla")
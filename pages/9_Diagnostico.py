@@ -0,0 +1,105 @@
+# pages/9_Diagnostico.py
+import streamlit as st
+import pandas as pd
+import diagnostics as dg
+from parquet_store import ParquetStore
+from utils_data import current_dataset, dataset_memory, memo_info, payload_report
+
+st.set_page_config(page_title="Diagnóstico", page_icon="🩺", layout="wide")
+
+# página interna: sólo se muestra con ?diag=1 en la URL
+if st.query_params.get("diag") != "1":
+    st.info("Página interna de diagnóstico.")
+    st.stop()
+
+st.title("🩺 Diagnóstico")
+ds = current_dataset()
+rep = ds.report
+
+# ---------- dataset ----------
+st.markdown("### 🗃️ Dataset en uso")
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Versión", ds.version)
+c2.metric("Construido", f"{ds.built_at:%d/%m %H:%M:%S}")
+c3.metric("Filas", f"{rep.rows:,}".replace(",", "."))
+if ds.db is None:
+    mem = dataset_memory(ds.df)
+    c4.metric("Memoria", f"{mem['Bytes'].sum() / 2**20:,.1f} MB")
+    mem["MB"] = (mem["Bytes"] / 2**20).round(2)
+    st.dataframe(mem, use_container_width=True, hide_index=True)
+else:
+    c4.metric("En disco", f"{ds.db.nbytes() / 2**20:,.1f} MB")
+    st.caption(f"Backend en disco: `{ds.db.path.name}`; en memoria quedan sólo los cachés de cada vista.")
+    if isinstance(ds.db, ParquetStore):
+        scans = ds.db.scans
+        st.caption(f"Consultas: {scans['consultas']} · particiones leídas: {scans['particiones leídas']}"
+                   f" · podadas: {scans['particiones podadas']}")
+        with st.expander("Particiones"):
+            st.dataframe(ds.db.particiones(), use_container_width=True, hide_index=True)
+
+st.markdown("### ⏱️ Última carga")
+etapas = pd.DataFrame({"Etapa": list(rep.timings), "ms": [round(v * 1000, 1) for v in rep.timings.values()]})
+st.dataframe(etapas, use_container_width=True, hide_index=True)
+archivos = pd.DataFrame([
+    {"Archivo": n, "Filas": f["filas"], "Reutilizado": f["reutilizado"], "ms": round(f["segundos"] * 1000, 1),
+     **{f"{k} ms": round(v * 1000, 1) for k, v in f.get("tiempos", {}).items()}}
+    for n, f in rep.files.items()
+])
+if not archivos.empty:
+    with st.expander("Por archivo (tiempos del último parseo de cada uno)"):
+        st.dataframe(archivos, use_container_width=True, hide_index=True)
+
+# ---------- páginas ----------
+st.markdown("### 📄 Tiempos por página y etapa")
+reg = pd.DataFrame(dg.timings())
+if reg.empty:
+    st.caption("Todavía no hay mediciones: navegá por las páginas.")
+else:
+    agg = (
+        reg.assign(ms=reg["segundos"] * 1000)
+        .groupby(["pagina", "etapa"], sort=False)["ms"]
+        .agg(n="size", media="mean", p95=lambda x: x.quantile(0.95), max="max")
+        .round(1)
+        .reset_index()
+    )
+    st.dataframe(agg, use_container_width=True, hide_index=True)
+    with st.expander(f"Últimas mediciones ({len(reg)} de {dg.RING_SIZE} posibles)"):
+        st.dataframe(reg.iloc[::-1].head(500), use_container_width=True, hide_index=True)
+    if st.button("Vaciar mediciones"):
+        dg.clear_timings()
+        st.rerun()
+
+st.markdown("### 🧠 Cachés")
+st.caption("Aciertos = llamadas que no ejecutaron la función (salieron de st.cache_data / st.cache_resource).")
+st.dataframe(pd.DataFrame(dg.cache_stats()), use_container_width=True, hide_index=True)
+memo = memo_info()
+st.caption(f"Resultados por página (LRU): {memo['entradas']} entradas · {memo['MB']:,.2f} de {memo['presupuesto MB']:,.0f} MB"
+           f" · desalojos: {memo['desalojos']} · invalidaciones por recarga: {memo['invalidaciones']}")
+
+rep_payload = payload_report()
+if not rep_payload.empty:
+    st.markdown("### 📦 Datos enviados a los gráficos")
+    st.dataframe(rep_payload, use_container_width=True, hide_index=True)
+
+# ---------- perfil ----------
+st.markdown("### 🔬 Perfil de una ejecución")
+if st.button("Perfilar la próxima ejecución de página"):
+    st.session_state["_diag_perfilar"] = True
+if st.session_state.get("_diag_perfilar"):
+    st.info("Abrí cualquier página (o cambiá un filtro): esa ejecución se perfila con cProfile y aparece acá.")
+
+perfiles = dg.profiles()
+if perfiles:
+    opciones = list(range(len(perfiles)))[::-1]
+    i = st.selectbox(
+        "Perfil", options=opciones,
+        format_func=lambda k: f"{perfiles[k]['pagina']} · {perfiles[k]['hora']:%H:%M:%S} · {perfiles[k]['segundos'] * 1000:,.0f} ms",
+    )
+    orden = st.radio("Ordenar por", options=["cumulative", "tottime", "ncalls"], horizontal=True)
+    st.code(dg.pstats_text(perfiles[i]["stats"], orden), language="text")
+    st.download_button(
+        label="⬇️ Descargar .pstats",
+        data=dg.pstats_dump(perfiles[i]["stats"]),
+        file_name=f"perfil_{perfiles[i]['pagina']}_{perfiles[i]['hora']:%Y%m%d_%H%M%S}.pstats",
+        mime="application/octet-stream",
+    )
@@ -0,0 +1,144 @@
+# parquet_store.py
+"""
+Backend opcional sobre las particiones por año del almacén
+(BCRA_BACKEND=parquet): como sqlite_store.py, las páginas piden sólo lo
+que muestran, pero sin copiar los datos a otra base.
+
+Las estadísticas de cada partición están en el manifest (meses, entidades,
+variables), así que una consulta por rango de meses, entidad o variables
+descarta sin abrirlas las particiones que no pueden tener filas, y en las
+que quedan pyarrow filtra por fila al leer. Los catálogos salen del
+manifest, sin leer datos.
+"""
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from diagnostics import record
+from pipeline import PARTS_DIR, is_group, read_partitions
+
+_COLS = ["Fecha_dt", "Mes", "Entidad", "Var_code", "Var_label", "Valor_num"]
+
+def _mes_int(mes: str) -> int:
+    y, m = mes.split("-")
+    return int(y) * 12 + int(m) - 1
+
+def _fecha(m: int) -> pd.Timestamp:
+    return pd.Timestamp(m // 12, m % 12 + 1, 1)
+
+class ParquetStore:
+    """Consultas de sólo lectura sobre las particiones vigentes al crearlo."""
+
+    def __init__(self, store: Path):
+        self.path = Path(store) / PARTS_DIR
+        self.parts = read_partitions(store)
+        self._rango = {y: (_mes_int(p["mes_min"]), _mes_int(p["mes_max"])) for y, p in self.parts.items()}
+        self._ents = {y: set(p["entidades"]) for y, p in self.parts.items()}
+        self._codes = {y: {c for _, c in p["variables"]} for y, p in self.parts.items()}
+        self.scans = Counter()  # consultas y particiones leídas / podadas
+        self._lock = threading.Lock()
+
+    def nbytes(self) -> int:
+        return sum((self.path / p["archivo"]).stat().st_size for p in self.parts.values())
+
+    def particiones(self) -> pd.DataFrame:
+        """Estadísticas de cada partición (lo que usa la poda)."""
+        return pd.DataFrame([
+            {"Año": int(y), "Archivo": p["archivo"], "Filas": p["filas"], "Desde": p["mes_min"], "Hasta": p["mes_max"],
+             "Entidades": len(p["entidades"]), "Variables": len(p["variables"]),
+             "MB": round((self.path / p["archivo"]).stat().st_size / 2**20, 2)}
+            for y, p in self.parts.items()
+        ])
+
+    # ---------- catálogos (del manifest) ----------
+    def entidades(self) -> list:
+        """Entidades en orden de aparición en el dataset."""
+        return list(dict.fromkeys(e for p in self.parts.values() for e in p["entidades"]))
+
+    def n_codigos_entidad(self) -> int:
+        return len({e.split(" - ", 1)[0] for e in self.entidades() if not is_group(e)})
+
+    def labels(self) -> list:
+        """Etiquetas en orden de aparición en el dataset."""
+        return list(dict.fromkeys(lab for p in self.parts.values() for lab, _ in p["variables"]))
+
+    def catalogo(self) -> pd.DataFrame:
+        pares = dict.fromkeys(tuple(v) for p in self.parts.values() for v in p["variables"])
+        cat = pd.DataFrame(list(pares), columns=["Var_label", "Var_code"])
+        return cat.sort_values("Var_label", kind="stable", ignore_index=True)
+
+    def meses(self) -> list:
+        return sorted({_mes_int(m) for p in self.parts.values() for m in p["meses"]})
+
+    def n_filas(self) -> int:
+        return sum(p["filas"] for p in self.parts.values())
+
+    # ---------- filas ----------
+    def _prune(self, entity, codes, m_min, m_max) -> list:
+        out = []
+        for y in self.parts:
+            lo, hi = self._rango[y]
+            if (m_min is not None and hi < m_min) or (m_max is not None and lo > m_max):
+                continue
+            if entity is not None and entity not in self._ents[y]:
+                continue
+            if codes is not None and self._codes[y].isdisjoint(codes):
+                continue
+            out.append(y)
+        return out
+
+    def count(self, entities, codes, m_min, m_max) -> int:
+        """
+        Filas estimadas de (entidades, códigos, meses m_min..m_max) sin leer
+        datos: las de cada partición del rango, en proporción a las
+        entidades, variables y meses pedidos que tiene.
+        """
+        entities, codes = set(entities), set(map(str, codes))
+        n = 0.0
+        for y in self._prune(None, codes, m_min, m_max):
+            p = self.parts[y]
+            meses = [_mes_int(m) for m in p["meses"]]
+            f_mes = sum(m_min <= m <= m_max for m in meses) / len(meses)
+            f_ent = len(self._ents[y] & entities) / len(self._ents[y])
+            f_var = len(self._codes[y] & codes) / len(self._codes[y])
+            n += p["filas"] * f_mes * f_ent * f_var
+        return int(round(n))
+
+    def frame(self, entity=None, codes=None, m_min=None, m_max=None) -> pd.DataFrame:
+        """
+        Filas (Fecha_dt, Mes, Entidad, Var_code, Var_label, Valor_num) que
+        cumplen los filtros dados, en el orden del dataset. Meses como enteros
+        (año * 12 + mes - 1), igual que SqliteStore.frame.
+        """
+        codes = None if codes is None else [str(c) for c in codes]
+        filtros = []
+        if entity is not None:
+            filtros.append(("Entidad", "==", entity))
+        if codes is not None:
+            filtros.append(("Var_code", "in", codes))
+        if m_min is not None:
+            filtros.append(("Fecha_dt", ">=", _fecha(int(m_min))))
+        if m_max is not None:
+            filtros.append(("Fecha_dt", "<=", _fecha(int(m_max))))
+        t0 = time.perf_counter()
+        años = self._prune(entity, None if codes is None else set(codes), m_min, m_max)
+        tablas = [
+            pq.read_table(self.path / self.parts[y]["archivo"], columns=_COLS, filters=filtros or None)
+            for y in años
+        ]
+        with self._lock:
+            self.scans.update({"consultas": 1, "particiones leídas": len(años),
+                               "particiones podadas": len(self.parts) - len(años)})
+        if not tablas:
+            record("parquet", "consulta", time.perf_counter() - t0)
+            return pd.DataFrame({
+                "Fecha_dt": pd.Series([], dtype="datetime64[ns]"), "Mes": [], "Entidad": [], "Var_code": [],
+                "Var_label": [], "Valor_num": np.array([], dtype=np.float64),
+            })
+        df = pa.concat_tables(tablas).to_pandas()
+        record("parquet", "consulta", time.perf_counter() - t0)
+        return df
@@ -0,0 +1,899 @@
+# pipeline.py
+"""
+Ingesta de los CSV del BCRA, sin Streamlit: lectura con detección de
+dialecto, mapeo de encabezados, normalización, etiquetas de variables y el
+almacén en disco (.store). El tablero sólo abre lo que deja `load_dataset`.
+
+Desde la línea de comandos (por ejemplo, por cron después de la descarga
+mensual) precompila el almacén:
+
+    python pipeline.py build [--data DIR] [--store DIR] [--json]
+"""
+import argparse
+import codecs
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+import pandas as pd
+import numpy as np
+import quality
+
+DATA_DIR = Path(__file__).parent / "data"
+
+# Estructura estándar del dashboard
+COLS_STD = [
+    "Código de entidad",
+    "Descripción entidad",
+    "Fecha del dato",
+    "Código del dato",
+    "Descripción del dato",
+    "Valor",
+]
+
+# ---------- utilidades num/fecha ----------
+def _parse_valor(col: pd.Series):
+    """
+    Convierte una columna de texto a float de una sola vez.
+    Acepta formato argentino ('1.234,56'), coma decimal ('12,5'), sufijo '%'
+    y blancos. Devuelve (array float, cantidad de valores no vacíos que no
+    se pudieron convertir).
+    """
+    s = col.astype("string").str.strip().str.replace(" ", "", regex=False)
+    miles = s.str.contains(",", regex=False) & s.str.contains(".", regex=False)
+    s = s.mask(miles, s.str.replace(".", "", regex=False))
+    s = s.str.replace(",", ".", regex=False).str.replace("%", "", regex=False)
+    out = pd.to_numeric(s, errors="coerce")
+    vacio = s.isna() | (s == "")
+    n_bad = int((out.isna() & ~vacio).sum())
+    return out.to_numpy(dtype="float64", na_value=np.nan), n_bad
+
+def _parse_periodo(col: pd.Series):
+    """
+    Convierte una columna AAAAMM a (Fecha_dt, Mes 'AAAA-MM', cantidad inválida).
+    Se parsean sólo los períodos distintos (unos cientos) y se expanden con
+    los códigos de factorize, sin tocar cada fila en Python.
+    """
+    codes, uniq = pd.factorize(col, use_na_sentinel=True)
+    u = pd.Series(uniq, dtype="string").str.strip()
+    ok = u.str.fullmatch(r"\d{6}").fillna(False).astype(bool)
+    dt_u = pd.to_datetime(u.where(ok), format="%Y%m", errors="coerce")
+    mes_u = dt_u.dt.strftime("%Y-%m").astype(object).where(dt_u.notna(), None)
+    # el sentinel -1 apunta al último elemento agregado (NaT / None)
+    dt = np.append(dt_u.to_numpy(), np.datetime64("NaT"))[codes]
+    mes = np.append(mes_u.to_numpy(dtype=object), None)[codes]
+    n_bad = int(np.isnat(dt).sum())
+    return dt, mes, n_bad
+
+# ---------- normalizador de encabezados ----------
+def _strip_accents(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+def _norm_header(s: str) -> str:
+    s = _strip_accents(str(s)).lower().strip()
+    s = re.sub(r"[^a-z0-9 ]", " ", s)
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+# mapa de sinónimos normalizados -> nombre estándar
+HEADER_MAP = {
+    # Código de la entidad
+    "codigo de entidad": "Código de entidad",
+    "codigo entidad": "Código de entidad",
+    "codigo de la entidad": "Código de entidad",
+    "cod entidad": "Código de entidad",
+    "n codent": "Código de entidad",
+    "codent": "Código de entidad",
+
+    # Descripción / nombre de la entidad
+    "descripcion entidad": "Descripción entidad",
+    "nombre de la entidad": "Descripción entidad",
+    "nombre entidad": "Descripción entidad",
+    "noment": "Descripción entidad",
+
+    # Fecha (AAAAMM)
+    "fecha del dato": "Fecha del dato",
+    "fecha": "Fecha del dato",
+    "c fecinf": "Fecha del dato",
+    "fecinf": "Fecha del dato",
+    "periodo": "Fecha del dato",
+    "periodo aaamm": "Fecha del dato",
+    "aaaamm": "Fecha del dato",
+    "mes": "Fecha del dato",
+
+    # Código de variable
+    "codigo del dato": "Código del dato",
+    "codigo dato": "Código del dato",
+    "codigo partida": "Código del dato",
+    "c partida": "Código del dato",
+    "variable": "Código del dato",
+
+    # Descripción de variable
+    "descripcion del dato": "Descripción del dato",
+    "descripcion dato": "Descripción del dato",
+    "c descri2": "Descripción del dato",
+    "descripcion": "Descripción del dato",
+
+    # Valor
+    "valor": "Valor",
+    "n total": "Valor",
+    "total": "Valor",
+    "importe": "Valor",
+    "valor actual": "Valor",
+    "valor_actual": "Valor",
+}
+
+# ---------- lector flexible ----------
+SNIFF_BYTES = 64 * 1024           # muestra para detectar el dialecto
+CHUNK_BYTES = 256 * 1024 * 1024   # a partir de este tamaño se lee por bloques
+CHUNK_ROWS = 1_000_000
+_SEPS = [";", ",", "\t"]
+
+def _sniff_dialect(path: Path) -> dict:
+    """
+    Detecta separador, encoding y fila de encabezado mirando sólo los
+    primeros KB del archivo. El encabezado es la fila (de las primeras 20)
+    con más columnas reconocidas por HEADER_MAP.
+    """
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+        truncated = bool(f.read(1))
+
+    enc = "utf-8-sig"
+    try:
+        # final=False tolera un caracter multibyte cortado al final de la muestra
+        text = codecs.getincrementaldecoder("utf-8-sig")().decode(head, final=False)
+    except UnicodeDecodeError:
+        enc = "latin-1"
+        text = head.decode(enc)
+
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]
+
+    best = None  # (aciertos, -fila, -orden_sep)
+    for i, line in enumerate(lines[:20]):
+        for k, sep in enumerate(_SEPS):
+            cols = next(csv.reader([line], delimiter=sep), [])
+            hits = len({HEADER_MAP[n] for n in map(_norm_header, cols) if n in HEADER_MAP})
+            if hits and (best is None or (hits, -i, -k) > best[0]):
+                best = ((hits, -i, -k), sep, i, cols)
+
+    if best is None:
+        # sin encabezados conocidos: el separador que da más columnas estables
+        def score(sep):
+            counts = [len(next(csv.reader([ln], delimiter=sep), [])) for ln in lines[:50] if ln]
+            return min(counts) if counts else 0
+        sep = max(_SEPS, key=score)
+        cols = next(csv.reader(lines[:1], delimiter=sep), [])
+        return {"sep": sep, "encoding": enc, "header": 0, "columns": cols, "engine": "c"}
+
+    _, sep, i, cols = best
+    return {"sep": sep, "encoding": enc, "header": i, "columns": cols, "engine": "c"}
+
+def _fmt_dialect(d: dict) -> str:
+    sep = {";": "';'", ",": "','", "\t": "tab"}.get(d["sep"], repr(d["sep"]))
+    return f"sep={sep} · enc={d['encoding']} · encabezado en fila {d['header'] + 1} · motor={d['engine']}"
+
+def _read_csv_flexible(path: Path, dialect: dict | None = None, usecols=None) -> pd.DataFrame:
+    """
+    Lee el CSV una sola vez con el dialecto detectado y el motor C (por
+    bloques si es muy grande). Si el motor C no puede, reintenta con el de
+    Python. El dict `dialect` queda actualizado con lo que se usó.
+    """
+    d = dialect if dialect is not None else _sniff_dialect(path)
+    chunked = path.stat().st_size > CHUNK_BYTES
+
+    def read(engine):
+        kw = dict(sep=d["sep"], encoding=d["encoding"], skiprows=d["header"], dtype=str, usecols=usecols)
+        if chunked and engine == "c":
+            return pd.concat(pd.read_csv(path, engine=engine, chunksize=CHUNK_ROWS, **kw), ignore_index=True)
+        return pd.read_csv(path, engine=engine, **kw)
+
+    try:
+        try:
+            return read("c")
+        except UnicodeDecodeError:
+            # la muestra era utf-8 pero el resto del archivo no
+            d["encoding"] = "latin-1"
+            return read("c")
+    except (pd.errors.ParserError, ValueError):
+        d["engine"] = "python"
+        try:
+            return read("python")
+        except Exception as e:
+            raise RuntimeError(f"No pude leer {path.name} ({_fmt_dialect(d)}): {e}")
+
+# ---------- catálogo de variables ----------
+def _build_var_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Var_label = SOLO descripción.
+    Si una misma descripción corresponde a >1 código distinto,
+    se numeran: 'Descripción (1)', 'Descripción (2)', ... en orden de código.
+    Se calcula sobre los pares únicos (descripción, código) y se expande a
+    las filas con los códigos de factorize, sin recorrer filas en Python.
+    """
+    if df.empty:
+        df["Var_label"] = pd.Series(index=df.index, dtype=object)
+        return df
+    # NaN / None (celda vacía) es la descripción vacía: factorize les daría -1
+    d_ids, descs = pd.factorize(df["Var_desc"].fillna(""))
+    c_ids, codes = pd.factorize(df["Var_code"])
+    n_codes = max(len(codes), 1)
+    row_pair, pair_keys = pd.factorize(d_ids.astype(np.int64) * n_codes + c_ids)
+
+    pairs = pd.DataFrame({
+        "Var_desc": np.asarray(descs, dtype=object)[pair_keys // n_codes],
+        "Var_code": np.asarray(codes, dtype=object)[pair_keys % n_codes],
+    })
+    # número de orden del código dentro de cada descripción y cuántos hay
+    orden = pairs.sort_values(["Var_desc", "Var_code"]).groupby("Var_desc", sort=False).cumcount() + 1
+    n = pairs.groupby("Var_desc")["Var_code"].transform("size")
+    base = pairs["Var_desc"].where(pairs["Var_desc"] != "", "—")
+    labels = base.where(n <= 1, base + " (" + orden.astype(str) + ")")
+
+    df["Var_label"] = labels.to_numpy(dtype=object)[row_pair]
+    return df
+
+# ---------- normalización por archivo ----------
+COLS_NORM = COLS_STD + ["__archivo__", "Fecha_dt", "Mes", "Valor_num", "Entidad", "Var_code", "Var_desc"]
+
+def _normalize_file(p: Path):
+    """
+    Lee un CSV y lo deja normalizado (sin Var_label, que depende de todos
+    los archivos). Devuelve (df, info) o (None, info) si se ignora.
+    """
+    dialect = _sniff_dialect(p)
+    info = {"dialecto": dialect}
+    # con el encabezado detectado ya se sabe si el archivo sirve y qué
+    # columnas leer, sin tocar el resto del archivo
+    pos = {}
+    for j, c in enumerate(dialect["columns"]):
+        std = HEADER_MAP.get(_norm_header(c))
+        if std and std not in pos:
+            pos[std] = j
+    missing = [c for c in COLS_STD if c not in pos]
+    if missing:
+        return None, {**info, "motivo": f"faltan: {', '.join(missing)}"}
+
+    t = time.perf_counter()
+    tiempos = {}
+    raw = _read_csv_flexible(p, dialect, usecols=[pos[c] for c in COLS_STD])
+    raw.columns = [c for c, _ in sorted(pos.items(), key=lambda kv: kv[1])]
+    tiempos["lectura"], t = time.perf_counter() - t, time.perf_counter()
+
+    df = raw[COLS_STD].copy()
+    df["__archivo__"] = p.name
+    df["Código de entidad"] = df["Código de entidad"].astype(str).str.strip().str.zfill(5)
+    df["Descripción entidad"] = df["Descripción entidad"].astype(str).str.strip()
+
+    df["Fecha_dt"], df["Mes"], bad_fechas = _parse_periodo(df["Fecha del dato"])
+    df = df.dropna(subset=["Fecha_dt"])
+    tiempos["fechas"], t = time.perf_counter() - t, time.perf_counter()
+
+    df["Valor_num"], bad_valores = _parse_valor(df["Valor"])
+    tiempos["valores"], t = time.perf_counter() - t, time.perf_counter()
+    df["Entidad"] = df["Código de entidad"] + " - " + df["Descripción entidad"].fillna("")
+
+    df["Var_code"] = df["Código del dato"].astype(str).str.strip()
+    df["Var_desc"] = df["Descripción del dato"].astype(str).str.strip()
+    tiempos["texto"] = time.perf_counter() - t
+    # años y pares (código, descripción) del archivo: con esto el almacén
+    # sabe qué particiones toca y arma las etiquetas sin releer las partes
+    pares = df[["Var_code", "Var_desc"]].drop_duplicates()
+    info.update(filas=len(df), bad_fechas=bad_fechas, bad_valores=bad_valores,
+                tiempos={k: round(v, 4) for k, v in tiempos.items()},
+                años=sorted(int(y) for y in df["Fecha_dt"].dt.year.unique()),
+                pares=[[c, None if pd.isna(d) else d] for c, d in pares.itertuples(index=False)])
+    return df.reset_index(drop=True), info
+
+# ---------- almacén normalizado en disco (parquet) ----------
+# Un parquet por CSV (clave: nombre, tamaño, mtime y hash del contenido) más
+# el dataset combinado partido por año en dataset/ (ver particiones).
+STORE_DIR = Path(__file__).parent / ".store"
+STORE_FORMAT = 4  # subir si cambia _normalize_file o el formato del almacén
+
+def _file_hash(p: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _read_manifest(store: Path) -> dict:
+    try:
+        man = json.loads((store / "manifest.json").read_text(encoding="utf-8"))
+        if man.get("formato") == STORE_FORMAT:
+            return man
+    except (OSError, ValueError):
+        pass
+    return {"formato": STORE_FORMAT, "archivos": {}, "particiones": {}}
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+def _write_manifest(store: Path, man: dict):
+    _write_atomic(
+        store / "manifest.json",
+        lambda t: t.write_text(json.dumps(man, ensure_ascii=False, indent=1), encoding="utf-8"),
+    )
+
+# ---------- parseo en paralelo ----------
+# Los archivos son independientes: cada uno se normaliza y se escribe en su
+# parquet dentro de un proceso del pool (sólo vuelve el resumen, no el
+# DataFrame). "spawn" porque el tablero corre con hilos y así anda igual en
+# Windows. Con poco para leer, levantar procesos cuesta más de lo que ahorra.
+WORKERS = int(os.environ.get("BCRA_WORKERS", 0)) or (os.cpu_count() or 1)
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+def _parse_part(p: Path, store: Path, h: str):
+    """Normaliza `p` y guarda su parquet en `store`. Devuelve (info, segundos)."""
+    t0 = time.perf_counter()
+    try:
+        df, info = _normalize_file(p)
+    except Exception as e:
+        df, info = None, {"motivo": f"error: {e}"}
+    if "dialecto" in info:
+        info["dialecto"] = {k: v for k, v in info["dialecto"].items() if k != "columns"}
+    if df is not None:
+        part = f"{p.stem}-{h[:12]}.parquet"
+        _write_atomic(store / part, lambda t: df.to_parquet(t, index=False))
+        info["parte"] = part
+    return info, time.perf_counter() - t0
+
+def _parse_many(todo, store: Path, workers: int):
+    """`_parse_part` para cada (path, hash) de `todo`, en el mismo orden."""
+    n = min(workers, len(todo))
+    if n > 1 and sum(p.stat().st_size for p, _ in todo) >= PARALLEL_MIN_BYTES:
+        try:
+            with ProcessPoolExecutor(n, mp_context=multiprocessing.get_context("spawn")) as ex:
+                futs = [ex.submit(_parse_part, p, store, h) for p, h in todo]
+                return [f.result() for f in futs]
+        except (BrokenProcessPool, OSError):
+            pass  # sin procesos disponibles: se sigue en serie
+    return [_parse_part(p, store, h) for p, h in todo]
+
+def _sync_store(paths, store: Path, workers: int | None = None):
+    """
+    Pone al día el almacén `store` con los CSV de `paths`: reutiliza los que
+    no cambiaron y re-parsea sólo los nuevos o modificados (en `workers`
+    procesos). Devuelve (manifest, nombres re-parseados -> segundos, cambió_algo).
+    """
+    store.mkdir(parents=True, exist_ok=True)
+    man = _read_manifest(store)
+    prev = man["archivos"]
+    cur = {}
+    parsed = {}
+    todo = []
+    changed = False
+
+    for p in paths:
+        stt = p.stat()
+        ent = prev.get(p.name)
+        if ent and ent["size"] == stt.st_size and ent["mtime_ns"] == stt.st_mtime_ns:
+            cur[p.name] = ent
+            continue
+        h = _file_hash(p)
+        if ent and ent["hash"] == h:
+            cur[p.name] = {**ent, "size": stt.st_size, "mtime_ns": stt.st_mtime_ns}
+            continue
+
+        changed = True
+        # se reserva el lugar para que el orden siga siendo el de `paths`
+        cur[p.name] = {"size": stt.st_size, "mtime_ns": stt.st_mtime_ns, "hash": h}
+        todo.append((p, h))
+
+    for (p, _), (info, secs) in zip(todo, _parse_many(todo, store, workers or WORKERS)):
+        cur[p.name].update(info)
+        parsed[p.name] = secs
+
+    if set(cur) != set(prev):
+        changed = True
+    # partes huérfanas (archivos borrados o reemplazados)
+    vivas = {e.get("parte") for e in cur.values()}
+    for e in prev.values():
+        part = e.get("parte")
+        if part and part not in vivas:
+            (store / part).unlink(missing_ok=True)
+
+    man["archivos"] = cur
+    return man, parsed, changed
+
+def _read_parquet(path: Path) -> pd.DataFrame:
+    return pd.read_parquet(path, memory_map=True)
+
+# ---------- agregados (sistema y grupos) ----------
+# Pseudo-entidades con la suma de cada variable y mes sobre un conjunto de
+# entidades: "Σ Sistema financiero" (todas) y un grupo por cada entrada de
+# grupos.json (BCRA_GRUPOS), {"nombre": ["código de entidad", ...]}. Se
+# guardan como filas más de cada partición (código de entidad vacío), así
+# que las páginas, los cubos y los backends las tratan como a cualquier
+# entidad; se recalculan con la partición, sólo en los años que cambian.
+GROUPS_FILE = Path(os.environ.get("BCRA_GRUPOS", Path(__file__).parent / "grupos.json"))
+GROUP_PREFIX = "Σ "
+SYSTEM_GROUP = "Sistema financiero"
+
+def load_groups(path: Path | None = None) -> dict:
+    """Nombre -> códigos de entidad (5 dígitos) de cada grupo; {} si no hay archivo."""
+    path = Path(path or GROUPS_FILE)
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    if not isinstance(raw, dict) or not all(isinstance(v, list) for v in raw.values()):
+        raise ValueError(f"{path.name}: se esperaba {{\"grupo\": [\"código\", ...]}}")
+    return {str(k): sorted({str(c).strip().zfill(5) for c in v}) for k, v in raw.items()}
+
+def is_group(entidad) -> bool:
+    return str(entidad).startswith(GROUP_PREFIX)
+
+def group_code(i: int) -> str:
+    """
+    Código de entidad del agregado número `i` (0 = sistema): negativo, con
+    el mismo ancho que los reales ('-0001', '-0002', ...), así la columna
+    sigue siendo numérica (int32 en `compact_df`) y no choca con un código
+    del BCRA.
+    """
+    return str(-(i + 1)).zfill(5)
+
+def is_group_code(codigo) -> bool:
+    return str(codigo).startswith("-")
+
+def group_rows(df: pd.DataFrame, groups: dict) -> pd.DataFrame:
+    """
+    Filas agregadas de `df` (una partición ya etiquetada): suma de Valor_num
+    por (grupo, variable, mes), NaN si ninguna entidad del grupo tiene dato.
+    Ante (entidad, variable, mes) repetidos cuenta el último, como en el cubo.
+    """
+    base = df.drop_duplicates(["Entidad", "Var_code", "Fecha_dt"], keep="last")
+    keys = ["Fecha_dt", "Mes", "Var_code", "Var_desc", "Var_label"]
+    parts = []
+    for i, (name, codes) in enumerate({SYSTEM_GROUP: None, **groups}.items()):
+        sel = base if codes is None else base[base["Código de entidad"].isin(codes)]
+        if sel.empty:
+            continue
+        g = sel.groupby(keys, sort=False, dropna=False, observed=True)["Valor_num"].sum(min_count=1).reset_index()
+        g["Código de entidad"] = group_code(i)
+        g["Descripción entidad"] = name
+        g["Entidad"] = GROUP_PREFIX + name
+        parts.append(g)
+    if not parts:
+        return df.iloc[0:0]
+    out = pd.concat(parts, ignore_index=True)
+    out["Fecha del dato"] = out["Fecha_dt"].dt.strftime("%Y%m")
+    out["Código del dato"] = out["Var_code"]
+    out["Descripción del dato"] = out["Var_desc"]
+    out["Valor"] = None
+    out["__archivo__"] = "(agregado)"
+    return out[df.columns]
+
+# ---------- particiones por año ----------
+# El dataset combinado vive en dataset/AAAA-<firma>.parquet, ordenado como
+# siempre (fecha, entidad, descripción, código). La firma de un año son los
+# archivos que tienen datos de ese año (nombre y hash) más las etiquetas:
+# un archivo nuevo con un mes sólo reescribe la partición de ese año. El
+# manifest guarda por partición filas, meses, entidades y variables, que
+# alcanzan para saber qué particiones abrir sin abrirlas (parquet_store.py).
+PARTS_DIR = "dataset"
+QUALITY_DIR = "calidad"  # hallazgos de cada partición (quality.scan_partition), mismo nombre
+
+def _label_map(files: dict, loaded: list) -> dict:
+    """
+    (Var_code, Var_desc) -> Var_label con los pares de cada archivo, en el
+    orden de carga: el mismo resultado que `_build_var_labels` sobre todas
+    las filas, sin leerlas.
+    """
+    pares = [tuple(pr) for n in loaded for pr in files[n]["pares"]]
+    cat = _build_var_labels(pd.DataFrame(list(dict.fromkeys(pares)), columns=["Var_code", "Var_desc"], dtype=object))
+    return {(c, d): lab for c, d, lab in cat[["Var_code", "Var_desc", "Var_label"]].itertuples(index=False)}
+
+def _pair_key(df: pd.DataFrame) -> pd.Series:
+    # "\x00" representa la descripción vacía (NaN no sirve como clave)
+    return df["Var_code"].astype(str) + "\x1f" + df["Var_desc"].fillna("\x00").astype(str)
+
+def _partition_stats(df: pd.DataFrame) -> dict:
+    """Estadísticas de una partición, en orden de aparición (para poda y catálogos)."""
+    meses = sorted(df["Mes"].dropna().unique().tolist())
+    return {
+        "filas": len(df),
+        "mes_min": meses[0] if meses else None,
+        "mes_max": meses[-1] if meses else None,
+        "meses": meses,
+        "entidades": df["Entidad"].unique().tolist(),
+        "variables": df[["Var_label", "Var_code"]].drop_duplicates().values.tolist(),
+    }
+
+def _sync_partitions(store: Path, man: dict, loaded: list, groups: dict, timings: dict) -> list:
+    """
+    Reescribe sólo las particiones cuyo año cambió (o todas si cambiaron las
+    etiquetas o los grupos). Actualiza man["particiones"] y devuelve los
+    años reescritos. Las reemplazadas no se borran acá (ver prune_store).
+    """
+    files = man["archivos"]
+    t0 = time.perf_counter()
+    labels = _label_map(files, loaded)
+    h_lab = hashlib.blake2b(json.dumps([sorted(labels.items(), key=str), groups], ensure_ascii=False).encode(),
+                            digest_size=8)
+    firmas = {}
+    for y in sorted({y for n in loaded for y in files[n]["años"]}):
+        h = h_lab.copy()
+        for n in loaded:
+            if y in files[n]["años"]:
+                h.update(f"{n}:{files[n]['hash']};".encode())
+        firmas[y] = h.hexdigest()
+    prev = man.get("particiones", {})
+    out_dir, q_dir = store / PARTS_DIR, store / QUALITY_DIR
+    out_dir.mkdir(exist_ok=True)
+    q_dir.mkdir(exist_ok=True)
+    todo = [y for y, f in firmas.items()
+            if prev.get(str(y), {}).get("firma") != f
+            or not (out_dir / prev[str(y)]["archivo"]).exists() or not (q_dir / prev[str(y)]["archivo"]).exists()]
+    timings["etiquetas"] = time.perf_counter() - t0
+
+    if todo:
+        t0 = time.perf_counter()
+        # cada parte se lee una vez y se reparte entre los años a reescribir
+        grupos = {y: [] for y in todo}
+        for n in loaded:
+            if set(files[n]["años"]) & grupos.keys():
+                d = _read_parquet(store / files[n]["parte"])
+                for y, g in d.groupby(d["Fecha_dt"].dt.year, sort=False):
+                    if y in grupos:
+                        grupos[y].append(g)
+        timings["lectura partes"] = time.perf_counter() - t0
+        t_orden = t_escr = t_cal = 0.0
+        lab = {c + "\x1f" + ("\x00" if d is None else d): v for (c, d), v in labels.items()}
+        for y in todo:
+            t0 = time.perf_counter()
+            d = pd.concat(grupos.pop(y), ignore_index=True)
+            d["Var_label"] = _pair_key(d).map(lab).to_numpy(dtype=object)
+            n_real = len(d)
+            d = pd.concat([d, group_rows(d, groups)], ignore_index=True)
+            # los agregados (códigos negativos) quedan al principio de cada mes
+            d = d.sort_values(["Fecha_dt", "Código de entidad", "Var_desc", "Var_code"]).reset_index(drop=True)
+            t1 = time.perf_counter()
+            nombre = f"{y}-{firmas[y][:12]}.parquet"
+            _write_atomic(out_dir / nombre, lambda t: d.to_parquet(t, index=False))
+            t2 = time.perf_counter()
+            q = quality.scan_partition(d, ~d["Entidad"].str.startswith(GROUP_PREFIX).to_numpy())
+            _write_atomic(q_dir / nombre, lambda t: q.to_parquet(t, index=False))
+            prev[str(y)] = {"archivo": nombre, "firma": firmas[y], **_partition_stats(d), "agregadas": len(d) - n_real,
+                            "hallazgos": q["Tipo"].value_counts().to_dict()}
+            t_orden, t_escr = t_orden + t1 - t0, t_escr + t2 - t1
+            t_cal += time.perf_counter() - t2
+        timings["orden"], timings["escritura particiones"] = t_orden, t_escr
+        timings["calidad particiones"] = t_cal
+
+    man["particiones"] = {str(y): prev[str(y)] for y in firmas}
+    (store / "dataset.parquet").unlink(missing_ok=True)  # formato anterior (un solo archivo)
+    return todo
+
+def _sync_quality(store: Path, man: dict, version: str) -> Path:
+    """
+    Reporte de calidad de la versión (quality.COLS): los hallazgos guardados
+    de cada partición más huecos y atípicos, que necesitan las series
+    enteras y salen de una pasada sobre cuatro columnas. Se arma una vez por
+    versión; los de versiones anteriores quedan para prune_store.
+    """
+    out = store / f"calidad-{version}.parquet"
+    if not out.exists():
+        parts = man["particiones"].values()
+        cols = ["Entidad", "Var_code", "Var_label", "Fecha_dt", "Valor_num"]
+        series = [pd.read_parquet(store / PARTS_DIR / p["archivo"], columns=cols) for p in parts]
+        series = pd.concat(series, ignore_index=True) if series else pd.DataFrame(columns=cols)
+        series = series[~series["Entidad"].astype(str).str.startswith(GROUP_PREFIX)]
+        rep = pd.concat(
+            [pd.read_parquet(store / QUALITY_DIR / p["archivo"]) for p in parts] + [quality.scan_series(series)],
+            ignore_index=True,
+        )
+        _write_atomic(out, lambda t: rep.to_parquet(t, index=False))
+    return out
+
+def read_partitions(store: Path | None = None) -> dict:
+    """Año -> estadísticas de la partición vigente (archivo, filas, meses, entidades, variables), en orden."""
+    return _read_manifest(Path(store or STORE_DIR))["particiones"]
+
+# ---------- representación compacta ----------
+# Activada por defecto; BCRA_COMPACT=0 devuelve el frame con texto plano y
+# BCRA_FLOAT32=1 guarda Valor_num en float32 (mitad de memoria, ~7 dígitos).
+COMPACT = os.environ.get("BCRA_COMPACT", "1") != "0"
+COMPACT_FLOAT32 = os.environ.get("BCRA_FLOAT32", "0") == "1"
+
+_CAT_COLS = ["Entidad", "Descripción entidad", "Var_code", "Var_desc", "Var_label", "__archivo__"]
+# texto crudo que se puede reconstruir desde las columnas normalizadas
+_RAW_COLS = ["Valor", "Fecha del dato", "Código del dato", "Descripción del dato"]
+
+def compact_df(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """
+    Versión compacta del dataset: columnas repetidas como categóricas (un
+    diccionario por columna compartido por todas las filas), Mes como
+    categórica ordenada (admite >=, <=), código de entidad como entero y sin
+    las columnas de texto crudo. `with_raw_columns` las reconstruye.
+    """
+    out = df.drop(columns=[c for c in _RAW_COLS if c in df.columns])
+    for c in _CAT_COLS:
+        if c in out.columns:
+            out[c] = out[c].astype("category")
+    if "Mes" in out.columns:
+        out["Mes"] = pd.Categorical(out["Mes"], categories=sorted(out["Mes"].dropna().unique()), ordered=True)
+    cod = pd.to_numeric(out["Código de entidad"], errors="coerce")
+    if cod.notna().all() and len(cod):
+        out["Código de entidad"] = cod.astype(np.int32)
+    else:
+        out["Código de entidad"] = out["Código de entidad"].astype("category")
+    if float32:
+        out["Valor_num"] = out["Valor_num"].astype(np.float32)
+    out.attrs = dict(df.attrs)
+    return out
+
+def with_raw_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reconstruye sobre una copia las columnas crudas que `compact_df` descarta.
+    'Valor' sale de Valor_num: el formato original del archivo no se conserva.
+    """
+    out = df.copy()
+    if "Fecha del dato" not in out.columns:
+        out["Fecha del dato"] = out["Fecha_dt"].dt.strftime("%Y%m")
+    if "Código del dato" not in out.columns:
+        out["Código del dato"] = out["Var_code"].astype(str)
+    if "Descripción del dato" not in out.columns:
+        out["Descripción del dato"] = out["Var_desc"].astype(str)
+    if "Valor" not in out.columns:
+        out["Valor"] = out["Valor_num"].astype("float64").map(lambda v: "" if pd.isna(v) else repr(v))
+    if pd.api.types.is_integer_dtype(out["Código de entidad"]):
+        out["Código de entidad"] = out["Código de entidad"].astype(str).str.zfill(5)
+    return out
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Bytes por columna antes y después de compactar (memory_usage deep)."""
+    b = before.memory_usage(index=False, deep=True)
+    a = after.memory_usage(index=False, deep=True)
+    rep = pd.DataFrame({"Bytes antes": b, "Bytes después": a}).fillna(0).astype(np.int64)
+    rep.loc["TOTAL"] = rep.sum()
+    rep["Ratio"] = (rep["Bytes después"] / rep["Bytes antes"].replace(0, np.nan)).round(3)
+    return rep.rename_axis("Columna").reset_index()
+
+def readonly(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Marca de sólo lectura (en el lugar) los buffers NumPy de `df`: valores,
+    fechas y códigos de las categorías; los strings Arrow ya son inmutables.
+    Escribir sobre el frame o sobre un array que salga de él levanta
+    ValueError; lo derivado (filtros, .copy(), operaciones) sigue siendo
+    escribible. Pensado para el dataset que comparten todas las sesiones.
+    """
+    for blk in df._mgr.blocks:
+        v = blk.values
+        for arr in (v, getattr(v, "_ndarray", None), getattr(v, "_codes", None)):
+            if isinstance(arr, np.ndarray):
+                arr.flags.writeable = False
+    return df
+
+# ---------- carga ----------
+@dataclass
+class LoadReport:
+    """Resumen de una carga; `to_dict()` lo deja listo para JSON."""
+    data_dir: str
+    version: str = ""
+    dataset: str = ""                            # carpeta de las particiones en el almacén
+    partitions: list = field(default_factory=list)  # parquet de cada año, en orden
+    quality: str = ""                            # reporte de calidad de esta versión (quality.py)
+    issues: dict = field(default_factory=dict)   # tipo de hallazgo -> casos
+    loaded: list = field(default_factory=list)   # archivos usados, en orden
+    skipped: list = field(default_factory=list)  # {"archivo", "motivo", "dialecto"}
+    files: dict = field(default_factory=dict)    # archivo -> filas, bad_*, segundos, reutilizado, tiempos
+    rows: int = 0
+    bad_fechas: int = 0
+    bad_valores: int = 0
+    timings: dict = field(default_factory=dict)  # etapa -> segundos
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def dataset_files(rep: LoadReport) -> set:
+    """Archivos del almacén que lee la versión de `rep`: particiones, sus hallazgos y el reporte de calidad."""
+    out = set()
+    for p in map(Path, rep.partitions):
+        out.update({p, p.parent.parent / QUALITY_DIR / p.name})
+    if rep.quality:
+        out.add(Path(rep.quality))
+    return out
+
+def prune_store(store: Path | None, keep) -> list:
+    """
+    Borra del almacén las particiones, hallazgos, reportes de calidad y bases
+    SQLite que no estén en `keep` (rutas). La carga no borra nada de eso: un
+    dataset publicado sigue leyendo sus archivos hasta que lo reemplaza otro,
+    y quien lo publica decide cuándo limpiar. Devuelve los nombres borrados.
+    """
+    store = Path(store or STORE_DIR)
+    keep = {Path(p).resolve() for p in keep}
+    borrados = []
+    for f in [*(store / PARTS_DIR).glob("*.parquet"), *(store / QUALITY_DIR).glob("*.parquet"),
+              *store.glob("calidad-*.parquet"), *store.glob("dataset-*.sqlite")]:
+        if f.resolve() in keep:
+            continue
+        try:
+            f.unlink()
+            borrados.append(f.name)
+        except OSError:  # abierto por otro proceso (Windows): queda para la próxima
+            pass
+    return borrados
+
+def data_signature(data_dir: Path | None = None) -> tuple:
+    """
+    (nombre, tamaño, mtime) de cada CSV y del archivo de grupos: cambia si
+    se agrega, modifica o borra uno.
+    """
+    sig = []
+    try:
+        stt = GROUPS_FILE.stat()
+        sig.append((GROUPS_FILE.name, stt.st_size, stt.st_mtime_ns))
+    except OSError:
+        pass
+    for p in sorted((data_dir or DATA_DIR).glob("*.csv")):
+        try:
+            stt = p.stat()
+        except OSError:  # borrado entre glob y stat: se verá en la próxima vuelta
+            continue
+        sig.append((p.name, stt.st_size, stt.st_mtime_ns))
+    return tuple(sig)
+
+def load_dataset(data_dir: Path | None = None, store_dir: Path | None = None, workers: int | None = None,
+                 frame: bool = True):
+    """
+    Lee TODOS los .csv de `data_dir` (./data), intenta mapear encabezados
+    "parecidos" a los nombres estándar y concatena sólo los que quedan
+    completos. Usa el almacén de `store_dir` (./.store) para no re-parsear
+    archivos sin cambios; los que sí hay que leer se parsean en `workers`
+    procesos (BCRA_WORKERS, por defecto uno por núcleo). Devuelve
+    (dataset, LoadReport); no depende de Streamlit. Con frame=False sólo
+    deja al día el almacén y devuelve (None, LoadReport) sin leer el
+    dataset combinado si no hizo falta rearmarlo.
+    """
+    data_dir = Path(data_dir or DATA_DIR)
+    store = Path(store_dir or STORE_DIR)
+    t_total = time.perf_counter()
+    data_dir.mkdir(parents=True, exist_ok=True)
+    rep = LoadReport(data_dir=str(data_dir))
+
+    t0 = time.perf_counter()
+    man, parsed, _ = _sync_store(sorted(data_dir.glob("*.csv")), store, workers)
+    rep.timings["almacen"] = time.perf_counter() - t0
+    files = man["archivos"]
+    rep.loaded = [n for n, e in files.items() if e.get("parte")]
+    rep.skipped = [
+        {"archivo": n, "motivo": e["motivo"], "dialecto": _fmt_dialect(e["dialecto"]) if e.get("dialecto") else None}
+        for n, e in files.items() if not e.get("parte")
+    ]
+    for n in rep.loaded:
+        e = files[n]
+        rep.files[n] = {
+            "filas": e["filas"], "bad_fechas": e["bad_fechas"], "bad_valores": e["bad_valores"],
+            "segundos": round(parsed.get(n, 0.0), 4), "reutilizado": n not in parsed,
+            "tiempos": e.get("tiempos", {}),
+        }
+    # versión = contenido de los archivos cargados y grupos (no cambia con un simple touch)
+    try:
+        groups = load_groups()
+    except ValueError as e:  # como un CSV ilegible: se informa y se sigue sin grupos
+        groups = {}
+        rep.skipped.append({"archivo": GROUPS_FILE.name, "motivo": f"error: {e}", "dialecto": None})
+    h = hashlib.blake2b(str(STORE_FORMAT).encode(), digest_size=6)
+    for n in rep.loaded:
+        h.update(f"{n}:{files[n]['hash']};".encode())
+    if groups:
+        h.update(json.dumps(groups, ensure_ascii=False).encode())
+    rep.version = h.hexdigest()
+
+    # Etiquetas SOLO con descripción (con sufijos si hay duplicados); se
+    # recalculan con los pares de todos los archivos porque la numeración
+    # depende de todos, pero sólo se reescriben los años afectados
+    _sync_partitions(store, man, rep.loaded, groups, rep.timings)
+    if not rep.loaded:
+        _write_manifest(store, man)
+        rep.timings["total"] = time.perf_counter() - t_total
+        return pd.DataFrame(columns=COLS_NORM + ["Var_label"]), rep
+
+    def lap(etapa):
+        nonlocal t0
+        rep.timings[etapa] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+
+    rep.dataset = str(store / PARTS_DIR)
+    rep.bad_fechas = sum(files[n]["bad_fechas"] for n in rep.loaded)
+    rep.bad_valores = sum(files[n]["bad_valores"] for n in rep.loaded)
+    _write_manifest(store, man)
+    rep.partitions = [str(store / PARTS_DIR / p["archivo"]) for p in man["particiones"].values()]
+    rep.rows = sum(p["filas"] for p in man["particiones"].values())
+    t0 = time.perf_counter()
+    q = _sync_quality(store, man, rep.version)
+    rep.quality = str(q)
+    rep.issues = pd.read_parquet(q, columns=["Tipo"])["Tipo"].value_counts().to_dict()
+    lap("calidad")
+    if not frame:
+        rep.timings["total"] = time.perf_counter() - t_total
+        return None, rep
+
+    t0 = time.perf_counter()
+    big = pd.concat([_read_parquet(Path(p)) for p in rep.partitions], ignore_index=True)
+    lap("lectura dataset")
+
+    if COMPACT:
+        t0 = time.perf_counter()
+        big = compact_df(big, float32=COMPACT_FLOAT32)
+        lap("compactar")
+
+    big.attrs["errores_parseo"] = {"Fecha del dato": rep.bad_fechas, "Valor": rep.bad_valores}
+    rep.timings["total"] = time.perf_counter() - t_total
+    return big, rep
+
+# ---------- línea de comandos ----------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="pipeline.py",
+        description="Precompila el almacén normalizado (.store) a partir de los CSV de ./data.",
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="lee ./data y deja el dataset listo en el almacén")
+    b.add_argument("--data", type=Path, default=None, help=f"carpeta con los CSV (por defecto {DATA_DIR})")
+    b.add_argument("--store", type=Path, default=None, help=f"carpeta del almacén (por defecto {STORE_DIR})")
+    b.add_argument("--workers", type=int, default=None, help=f"procesos para parsear (por defecto {WORKERS})")
+    b.add_argument("--sqlite", action="store_true", help="también arma la base del backend sqlite")
+    b.add_argument("--limpiar", action="store_true",
+                   help="borra del almacén lo de versiones anteriores (con el tablero abierto lo hace él solo)")
+    b.add_argument("--memoria", action="store_true", help="compara la memoria del dataset antes y después de compactar")
+    b.add_argument("--json", action="store_true", help="imprime el reporte completo en JSON")
+    args = ap.parse_args(argv)
+
+    _, rep = load_dataset(args.data, args.store, args.workers, frame=False)
+    vivos = dataset_files(rep)
+    if args.sqlite and rep.loaded:
+        import sqlite_store
+        t0 = time.perf_counter()
+        vivos.add(sqlite_store.build(rep.partitions, Path(rep.dataset).parent, rep.version))
+        rep.timings["sqlite"] = time.perf_counter() - t0
+    if args.limpiar and rep.loaded:
+        prune_store(args.store, vivos)
+    mem = None
+    if args.memoria and rep.loaded:
+        full = pd.concat([_read_parquet(Path(p)) for p in rep.partitions], ignore_index=True)
+        mem = memory_report(full, compact_df(full, float32=COMPACT_FLOAT32))
+    if args.json:
+        out = rep.to_dict()
+        if mem is not None:
+            out["memoria"] = mem.to_dict("records")
+        print(json.dumps(out, ensure_ascii=False, indent=1))
+    else:
+        print(f"versión {rep.version} · {rep.rows} filas · {len(rep.loaded)} archivos cargados, {len(rep.skipped)} ignorados")
+        for n in rep.loaded:
+            f = rep.files[n]
+            estado = "reutilizado" if f["reutilizado"] else f"{f['segundos']:.2f} s"
+            print(f"  + {n}: {f['filas']} filas ({estado})")
+        for s in rep.skipped:
+            print(f"  - {s['archivo']}: {s['motivo']}")
+        if rep.issues:
+            print("calidad: " + " · ".join(f"{k} {v}" for k, v in rep.issues.items()))
+        print("tiempos: " + " · ".join(f"{k} {v:.2f} s" for k, v in rep.timings.items()))
+        if mem is not None:
+            print("memoria (bytes por columna, antes y después de compactar):")
+            print(mem.to_string(index=False))
+    # para cron: distinto de cero si no quedó nada utilizable
+    return 0 if rep.loaded else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# quality.py
+"""
+Control de calidad del dataset, sin Streamlit, en pasadas vectorizadas:
+
+- duplicados: la misma (entidad, variable, mes) más de una vez, casi
+  siempre por archivos que se superponen. "conflicto" si los valores
+  difieren; el tablero usa el último (el del archivo que ordena después).
+- valores no numéricos: texto en Valor que no se pudo convertir.
+- huecos: meses faltantes entre el primer y el último dato de una serie.
+- atípicos: saltos MoM con z-score robusto (mediana / MAD de la serie)
+  mayor a Z_UMBRAL.
+
+Duplicados y no numéricos dependen sólo de las filas de cada mes: se
+calculan por partición al escribirla (pipeline._sync_partitions), así que
+sólo se rehacen para los años de archivos que cambiaron. Huecos y atípicos
+necesitan la serie entera y salen de una pasada sobre cuatro columnas.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+Z_UMBRAL = float(os.environ.get("BCRA_Z_UMBRAL", 6.0))
+MIN_SALTOS = 12  # saltos MoM mínimos de una serie para estimar su dispersión
+
+COLS = ["Tipo", "Entidad", "Var_code", "Var_label", "Mes", "Archivos", "Valores", "Detalle"]
+TIPOS = {
+    "conflicto": "Duplicado con valores distintos",
+    "duplicado": "Duplicado con el mismo valor",
+    "no numérico": "Valor que no se pudo convertir",
+    "hueco": "Meses faltantes dentro de una serie",
+    "atípico": "Salto MoM atípico (z robusto)",
+}
+_KEY = ["Entidad", "Var_code", "Fecha_dt"]
+
+def _fmt(v) -> str:
+    """Formato argentino ('1.234,56'), vacío si NaN."""
+    return "" if pd.isna(v) else f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _mes(m: np.ndarray) -> np.ndarray:
+    return np.array([f"{x // 12:04d}-{x % 12 + 1:02d}" for x in m.tolist()], dtype=object)
+
+def empty() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in COLS})
+
+# ---------- por partición ----------
+def scan_partition(d: pd.DataFrame, real: np.ndarray | None = None) -> pd.DataFrame:
+    """
+    Duplicados y valores no numéricos de una partición (filas de entidades
+    reales: `real` excluye los agregados). Un renglón por (entidad, variable,
+    mes) duplicada y uno por valor no convertido.
+    """
+    if real is not None:
+        d = d[real]
+    out = []
+
+    txt = d["Valor"].astype("string").str.strip()
+    bad = (txt.notna() & (txt != "") & d["Valor_num"].isna()).to_numpy()
+    if bad.any():
+        b = d[bad]
+        out.append(pd.DataFrame({
+            "Tipo": "no numérico", "Entidad": b["Entidad"].to_numpy(), "Var_code": b["Var_code"].to_numpy(),
+            "Var_label": b["Var_label"].to_numpy(), "Mes": b["Mes"].to_numpy(), "Archivos": b["__archivo__"].to_numpy(),
+            "Valores": txt[bad].to_numpy(dtype=object), "Detalle": "",
+        }))
+
+    dup = d.duplicated(_KEY, keep=False).to_numpy()
+    if dup.any():
+        s = d.loc[dup, _KEY + ["Mes", "Var_label", "__archivo__", "Valor_num"]]
+        gid = s.groupby(_KEY, sort=False, observed=True).ngroup().to_numpy()
+        v = s["Valor_num"]
+        # NaN cuenta como un valor más: dato vacío contra dato lleno es conflicto
+        distintos = v.fillna(np.inf).groupby(gid).nunique().to_numpy()
+        first = s.groupby(gid).first()
+        archivos = s[["__archivo__"]].assign(g=gid).drop_duplicates().groupby("g")["__archivo__"].agg(", ".join)
+        valores = v.map(_fmt).groupby(gid).agg(" | ".join)
+        n = v.groupby(gid).size().to_numpy()
+        queda = v.groupby(gid).last(skipna=False).to_numpy()
+        out.append(pd.DataFrame({
+            "Tipo": np.where(distintos > 1, "conflicto", "duplicado"),
+            "Entidad": first["Entidad"].to_numpy(), "Var_code": first["Var_code"].to_numpy(),
+            "Var_label": first["Var_label"].to_numpy(), "Mes": first["Mes"].to_numpy(),
+            "Archivos": archivos.to_numpy(), "Valores": valores.to_numpy(),
+            "Detalle": [f"{k} filas; el tablero usa {_fmt(q) or 'vacío'}" for k, q in zip(n.tolist(), queda.tolist())],
+        }))
+    return pd.concat(out, ignore_index=True) if out else empty()
+
+# ---------- por serie (todo el dataset) ----------
+def scan_series(d: pd.DataFrame, z_umbral: float = Z_UMBRAL) -> pd.DataFrame:
+    """
+    Huecos y saltos atípicos de todas las series de `d` (Entidad, Var_code,
+    Var_label, Fecha_dt, Valor_num; sin agregados). Ante duplicados usa el
+    último valor, como el tablero.
+    """
+    if d.empty:
+        return empty()
+    ent_ids, ents = pd.factorize(d["Entidad"])
+    var_ids, codes = pd.factorize(d["Var_code"])
+    f = d["Fecha_dt"]
+    mes = (f.dt.year * 12 + f.dt.month - 1).to_numpy(dtype=np.int64)
+    serie = ent_ids.astype(np.int64) * len(codes) + var_ids
+    # orden estable por (serie, mes): ante repetidos el último queda al final
+    order = np.lexsort((mes, serie))
+    serie, mes = serie[order], mes[order]
+    val = d["Valor_num"].to_numpy(dtype=np.float64)[order]
+    lab = d["Var_label"].to_numpy(dtype=object)[order]
+    ultimo = np.r_[(serie[1:] != serie[:-1]) | (mes[1:] != mes[:-1]), True]
+    serie, mes, val, lab = serie[ultimo], mes[ultimo], val[ultimo], lab[ultimo]
+
+    ents, codes = np.asarray(ents, dtype=object), np.asarray(codes, dtype=object)
+    misma = serie[1:] == serie[:-1]
+    salto = mes[1:] - mes[:-1]
+    out = []
+
+    # huecos: dos meses consecutivos de la misma serie separados por más de uno
+    h = np.flatnonzero(misma & (salto > 1))
+    if len(h):
+        desde, hasta = _mes(mes[h] + 1), _mes(mes[h + 1] - 1)
+        out.append(pd.DataFrame({
+            "Tipo": "hueco", "Entidad": ents[serie[h] // len(codes)], "Var_code": codes[serie[h] % len(codes)],
+            "Var_label": lab[h], "Mes": desde, "Archivos": "", "Valores": "",
+            "Detalle": [f"faltan {k - 1} meses ({a} a {b})" if k > 2 else f"falta {a}"
+                        for k, a, b in zip(salto[h].tolist(), desde, hasta)],
+        }))
+
+    # atípicos: variación MoM entre meses contiguos, z = 0,6745 (r - mediana) / MAD
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = val[1:] / val[:-1] - 1.0
+    ok = misma & (salto == 1) & np.isfinite(r)
+    if ok.any():
+        i = np.flatnonzero(ok) + 1  # posición del mes que salta
+        s = pd.Series(r[ok])
+        g = serie[i]
+        med = s.groupby(g).transform("median").to_numpy()
+        mad = pd.Series(np.abs(r[ok] - med)).groupby(g).transform("median").to_numpy()
+        n = s.groupby(g).transform("size").to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = 0.6745 * (r[ok] - med) / mad
+        at = (n >= MIN_SALTOS) & (mad > 0) & (np.abs(z) > z_umbral)
+        if at.any():
+            j, za, ra = i[at], z[at], r[ok][at]
+            out.append(pd.DataFrame({
+                "Tipo": "atípico", "Entidad": ents[serie[j] // len(codes)], "Var_code": codes[serie[j] % len(codes)],
+                "Var_label": lab[j], "Mes": _mes(mes[j]), "Archivos": "",
+                "Valores": [f"{_fmt(a)} → {_fmt(b)}" for a, b in zip(val[j - 1], val[j])],
+                "Detalle": [f"MoM {x:+.1%}, z robusto {y:+.1f}" for x, y in zip(ra.tolist(), za.tolist())],
+            }))
+    return pd.concat(out, ignore_index=True) if out else empty()
+
+def summary(rep: pd.DataFrame) -> pd.DataFrame:
+    """Cantidad de hallazgos por tipo (todos los tipos, aunque sean cero)."""
+    n = rep["Tipo"].value_counts()
+    return pd.DataFrame({"Tipo": list(TIPOS), "Descripción": list(TIPOS.values()),
+                         "Casos": [int(n.get(t, 0)) for t in TIPOS]})
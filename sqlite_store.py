@@ -0,0 +1,196 @@
+# sqlite_store.py
+"""
+Backend opcional en SQLite (BCRA_BACKEND=sqlite): el dataset queda en un
+archivo con índices y las páginas piden sólo lo que muestran (una entidad,
+unas variables, un rango de meses) con consultas parametrizadas, en lugar
+de tener todo el histórico en memoria.
+
+Tablas: `entidades` y `variables` (ids en orden de aparición en el
+dataset), `datos` (ent_id, var_id, mes, valor; rowid = orden del dataset)
+indexada por (entidad, variable, mes) y por (variable, entidad, mes), y
+`meses` / `info` con lo que los filtros necesitan sin recorrer `datos`.
+Los meses se guardan como enteros año * 12 + mes - 1.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from diagnostics import record
+
+BATCH_ROWS = 250_000
+_COLS = ["Entidad", "Código de entidad", "Var_code", "Var_desc", "Var_label", "Fecha_dt", "Valor_num"]
+
+SCHEMA = """
+CREATE TABLE entidades (id INTEGER PRIMARY KEY, entidad TEXT NOT NULL UNIQUE, codigo TEXT);
+CREATE TABLE variables (id INTEGER PRIMARY KEY, var_code TEXT NOT NULL, var_desc TEXT, var_label TEXT NOT NULL);
+CREATE TABLE datos (ent_id INTEGER NOT NULL, var_id INTEGER NOT NULL, mes INTEGER NOT NULL, valor REAL);
+CREATE TABLE meses (mes INTEGER PRIMARY KEY);
+CREATE TABLE info (clave TEXT PRIMARY KEY, valor TEXT);
+"""
+INDEXES = """
+CREATE INDEX variables_code ON variables (var_code);
+CREATE INDEX datos_ent_var_mes ON datos (ent_id, var_id, mes);
+CREATE INDEX datos_var_ent_mes ON datos (var_id, ent_id, mes);
+"""
+
+def db_path(store: Path, version: str) -> Path:
+    # un archivo por versión: una recarga nunca reemplaza un archivo abierto
+    return Path(store) / f"dataset-{version}.sqlite"
+
+def _batches(parts):
+    for path in parts:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=BATCH_ROWS, columns=_COLS)
+
+def build(parts: list, store: Path, version: str) -> Path:
+    """
+    Vuelca las particiones del dataset (en orden) a SQLite por lotes, sin
+    cargarlas enteras, si esa versión todavía no existe. Las de versiones
+    anteriores pueden seguir abiertas: las borra pipeline.prune_store.
+    """
+    out = db_path(store, version)
+    if not out.exists():
+        tmp = out.with_name(out.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        con = sqlite3.connect(tmp)
+        try:
+            con.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + SCHEMA)
+            ent_ids, var_ids, meses, n = {}, {}, set(), 0
+            for batch in _batches(parts):
+                df = batch.to_pandas()
+                ent = df["Entidad"].astype(str)
+                nuevas = [e for e in pd.unique(ent) if e not in ent_ids]
+                if nuevas:
+                    cod = df.drop_duplicates("Entidad").set_index("Entidad")["Código de entidad"]
+                    rows = [(len(ent_ids) + i + 1, e, None if pd.isna(cod[e]) else str(cod[e])) for i, e in enumerate(nuevas)]
+                    con.executemany("INSERT INTO entidades VALUES (?, ?, ?)", rows)
+                    ent_ids.update((e, i) for i, e, _ in rows)
+                # clave del par (código, descripción); "\x00" marca descripción vacía (NULL)
+                key = df["Var_code"].astype(str) + "\x1f" + df["Var_desc"].fillna("\x00").astype(str)
+                nuevas = [k for k in pd.unique(key) if k not in var_ids]
+                if nuevas:
+                    lab = pd.Series(df["Var_label"].astype(str).to_numpy(), index=key).groupby(level=0).first()
+                    rows = []
+                    for i, k in enumerate(nuevas):
+                        code, desc = k.split("\x1f", 1)
+                        rows.append((len(var_ids) + i + 1, code, None if desc == "\x00" else desc, lab[k]))
+                    con.executemany("INSERT INTO variables VALUES (?, ?, ?, ?)", rows)
+                    var_ids.update((k, r[0]) for k, r in zip(nuevas, rows))
+                fecha = df["Fecha_dt"]
+                mes = (fecha.dt.year * 12 + fecha.dt.month - 1).to_numpy(dtype=np.int64)
+                meses.update(np.unique(mes).tolist())
+                valor = df["Valor_num"].astype("float64").to_numpy()
+                con.executemany(
+                    "INSERT INTO datos VALUES (?, ?, ?, ?)",
+                    zip(ent.map(ent_ids).tolist(), key.map(var_ids).tolist(), mes.tolist(),
+                        [None if v != v else v for v in valor.tolist()]),
+                )
+                n += len(df)
+            con.executemany("INSERT INTO meses VALUES (?)", [(m,) for m in sorted(meses)])
+            con.executemany("INSERT INTO info VALUES (?, ?)", [("version", version), ("filas", str(n))])
+            con.executescript(INDEXES + "ANALYZE;")
+            con.commit()
+        finally:
+            con.close()
+        tmp.replace(out)
+    return out
+
+def _ph(n: int) -> str:
+    return ", ".join("?" * n)
+
+class SqliteStore:
+    """Consultas de sólo lectura sobre un archivo de `build` (una conexión por hilo)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    @property
+    def con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(f"file:{self.path.as_posix()}?mode=ro", uri=True)
+            self._local.con = con
+        return con
+
+    def nbytes(self) -> int:
+        return self.path.stat().st_size
+
+    def _scalar(self, sql, params=()):
+        row = self.con.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    # ---------- catálogos (todo sale de tablas chicas) ----------
+    def entidades(self) -> list:
+        """Entidades en orden de aparición en el dataset."""
+        return [r[0] for r in self.con.execute("SELECT entidad FROM entidades ORDER BY id")]
+
+    def n_codigos_entidad(self) -> int:
+        # los agregados (pipeline.group_rows) tienen códigos negativos
+        return self._scalar("SELECT COUNT(DISTINCT codigo) FROM entidades WHERE codigo NOT LIKE '-%'")
+
+    def labels(self) -> list:
+        """Etiquetas en orden de aparición en el dataset."""
+        return [r[0] for r in self.con.execute("SELECT var_label FROM variables ORDER BY id")]
+
+    def catalogo(self) -> pd.DataFrame:
+        rows = self.con.execute("SELECT DISTINCT var_label, var_code FROM variables ORDER BY var_label").fetchall()
+        return pd.DataFrame(rows, columns=["Var_label", "Var_code"])
+
+    def meses(self) -> list:
+        return [r[0] for r in self.con.execute("SELECT mes FROM meses ORDER BY mes")]
+
+    def n_filas(self) -> int:
+        return int(self._scalar("SELECT valor FROM info WHERE clave = 'filas'") or 0)
+
+    # ---------- filas ----------
+    def count(self, entities, codes, m_min, m_max) -> int:
+        """Cantidad de filas de (entidades, códigos, meses m_min..m_max), con los índices."""
+        entities, codes = list(entities), list(codes)
+        sql = (
+            f"SELECT COUNT(*) FROM datos WHERE var_id IN (SELECT id FROM variables WHERE var_code IN ({_ph(len(codes))}))"
+            f" AND ent_id IN (SELECT id FROM entidades WHERE entidad IN ({_ph(len(entities))})) AND mes BETWEEN ? AND ?"
+        )
+        return int(self._scalar(sql, codes + entities + [int(m_min), int(m_max)]) or 0)
+
+    def frame(self, entity=None, codes=None, m_min=None, m_max=None) -> pd.DataFrame:
+        """
+        Filas (Fecha_dt, Mes, Entidad, Var_code, Var_label, Valor_num) que
+        cumplen los filtros dados, en el orden del dataset. Meses como enteros.
+        """
+        where, params = [], []
+        if entity is not None:
+            where.append("d.ent_id = (SELECT id FROM entidades WHERE entidad = ?)")
+            params.append(entity)
+        if codes is not None:
+            codes = list(codes)
+            where.append(f"d.var_id IN (SELECT id FROM variables WHERE var_code IN ({_ph(len(codes))}))")
+            params += codes
+        if m_min is not None:
+            where.append("d.mes >= ?")
+            params.append(int(m_min))
+        if m_max is not None:
+            where.append("d.mes <= ?")
+            params.append(int(m_max))
+        sql = (
+            "SELECT d.mes, e.entidad, v.var_code, v.var_label, d.valor FROM datos d "
+            "JOIN entidades e ON e.id = d.ent_id JOIN variables v ON v.id = d.var_id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY d.rowid"
+        )
+        t0 = time.perf_counter()
+        rows = self.con.execute(sql, params).fetchall()
+        record("sqlite", "consulta", time.perf_counter() - t0)
+        mes, ent, code, lab, val = (list(c) for c in zip(*rows)) if rows else ([], [], [], [], [])
+        mes = np.asarray(mes, dtype=np.int64)
+        fecha = pd.to_datetime({"year": mes // 12, "month": mes % 12 + 1, "day": 1}) if len(mes) else pd.Series([], dtype="datetime64[ns]")
+        return pd.DataFrame({
+            "Fecha_dt": fecha,
+            "Mes": fecha.dt.strftime("%Y-%m"),
+            "Entidad": ent,
+            "Var_code": code,
+            "Var_label": lab,
+            "Valor_num": np.asarray(val, dtype=np.float64),
+        })
@@ -0,0 +1,120 @@
+# synth_data.py
+"""
+Genera CSV sintéticos con la forma de las exportaciones del BCRA, para
+medir la carga y las páginas sin depender de los archivos reales.
+
+Cada archivo cubre un tramo de meses y varía a propósito lo que el lector
+tiene que tolerar: encabezados (rota por todos los sinónimos de
+HEADER_MAP), separador (; , tab), encoding (utf-8, utf-8 con BOM, latin-1)
+y números en formato argentino ('1.234.567,89'), con algunos vacíos.
+
+    python synth_data.py DESTINO --rows 1000000 [--files 12] [--seed 0]
+"""
+import argparse
+import math
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pipeline import COLS_STD, HEADER_MAP
+
+SEPS = [";", ",", "\t"]
+ENCODINGS = ["utf-8", "latin-1", "utf-8-sig"]
+
+_ENTIDADES = [
+    "BANCO DE LA NACIÓN ARGENTINA", "BANCO DE GALICIA Y BUENOS AIRES S.A.U.",
+    "BANCO SANTANDER ARGENTINA S.A.", "BANCO MACRO S.A.", "BANCO DE LA PROVINCIA DE BUENOS AIRES",
+    "BBVA ARGENTINA S.A.", "BANCO CREDICOOP COOPERATIVO LIMITADO", "BANCO PATAGONIA S.A.",
+    "BANCO DE CÓRDOBA S.A.", "BANCO SUPERVIELLE S.A.",
+]
+_VARIABLES = [
+    "Préstamos al sector privado", "Depósitos en pesos", "Depósitos en dólares",
+    "Patrimonio neto", "Activo total", "Cantidad de sucursales", "Resultado del ejercicio",
+    "Cartera irregular", "Previsiones", "Integración de efectivo mínimo",
+]
+
+def header_variants() -> dict:
+    """Nombre estándar -> todos los sinónimos de HEADER_MAP (el primero es el propio)."""
+    out = {c: [] for c in COLS_STD}
+    for alias, std in HEADER_MAP.items():
+        out[std].append(alias)
+    return out
+
+def dims_for_rows(rows: int):
+    """(entidades, variables, meses) que dan aproximadamente `rows` filas."""
+    meses = 60 if rows < 100_000 else 120
+    variables = min(500, max(20, rows // (meses * 80)))
+    entidades = max(1, math.ceil(rows / (meses * variables)))
+    return entidades, variables, meses
+
+def _fmt_ar(v: np.ndarray) -> list:
+    """'1.234.567,89' (vacío si NaN)."""
+    return ["" if v != v else f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for v in v.tolist()]
+
+def generate(entidades: int, variables: int, meses: int, seed: int = 0):
+    """
+    DataFrame con las columnas de COLS_STD ya como texto: una serie por
+    (entidad, variable) con crecimiento mensual ruidoso y ~1% de vacíos.
+    Algunas descripciones se repiten con otro código (ejercita los sufijos
+    de Var_label).
+    """
+    rng = np.random.default_rng(seed)
+    ent_cod = np.array([f"{i:05d}" for i in range(1, entidades + 1)])
+    ent_desc = np.array([f"{_ENTIDADES[i % len(_ENTIDADES)]}" + (f" {i // len(_ENTIDADES)}" if i >= len(_ENTIDADES) else "")
+                         for i in range(entidades)])
+    var_cod = np.array([str(1000 + i) for i in range(variables)])
+    var_desc = np.array([_VARIABLES[i % len(_VARIABLES)] + (f" ({i // len(_VARIABLES)})" if i % 7 else "")
+                         for i in range(variables)])
+    periodos = pd.period_range("2015-01", periods=meses, freq="M").strftime("%Y%m").to_numpy()
+
+    n_series = entidades * variables
+    nivel = np.exp(rng.normal(12, 2, size=(n_series, 1)))
+    crec = rng.normal(0.02, 0.05, size=(n_series, meses))
+    valores = (nivel * np.cumprod(1 + crec, axis=1)).ravel()
+    valores[rng.random(valores.size) < 0.01] = np.nan
+
+    e_idx = np.repeat(np.arange(entidades), variables * meses)
+    v_idx = np.tile(np.repeat(np.arange(variables), meses), entidades)
+    return pd.DataFrame({
+        "Código de entidad": ent_cod[e_idx],
+        "Descripción entidad": ent_desc[e_idx],
+        "Fecha del dato": np.tile(periodos, n_series),
+        "Código del dato": var_cod[v_idx],
+        "Descripción del dato": var_desc[v_idx],
+        "Valor": _fmt_ar(valores),
+    })
+
+def write_dataset(dest: Path, rows: int = 100_000, files: int = 12, seed: int = 0) -> list:
+    """
+    Escribe en `dest` un dataset de ~`rows` filas repartido en `files` CSV
+    (por tramos de meses). Con 8 o más archivos aparecen todos los
+    sinónimos de encabezado. Devuelve las rutas escritas.
+    """
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    df = generate(*dims_for_rows(rows), seed=seed)
+    variantes = header_variants()
+    periodos = np.sort(df["Fecha del dato"].unique())
+    tramos = np.array_split(periodos, min(files, len(periodos)))
+    out = []
+    for i, tramo in enumerate(tramos):
+        part = df[df["Fecha del dato"].isin(tramo)]
+        ren = {c: variantes[c][i % len(variantes[c])] for c in COLS_STD}
+        part = part.rename(columns={c: (h.title() if i % 2 else h) for c, h in ren.items()})
+        sep, enc = SEPS[i % len(SEPS)], ENCODINGS[(i // len(SEPS)) % len(ENCODINGS)]
+        p = dest / f"synth_{i:03d}.csv"
+        part.to_csv(p, sep=sep, encoding=enc, index=False)
+        out.append(p)
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="synth_data.py", description="Genera CSV sintéticos tipo BCRA.")
+    ap.add_argument("dest", type=Path)
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--files", type=int, default=12)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    paths = write_dataset(args.dest, args.rows, args.files, args.seed)
+    print(f"{len(paths)} archivos en {args.dest} ({dims_for_rows(args.rows)} entidades × variables × meses)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# los módulos del tablero viven en la raíz del repo (layout plano)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
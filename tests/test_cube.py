@@ -0,0 +1,76 @@
+# tests/test_cube.py
+"""
+SeriesCube contra el pivot del Panel original (pivot_table aggfunc="last"
+por entidad), con huecos, pares faltantes y (entidad, variable, mes)
+repetidos, también con un vacío después del valor.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from utils_data import SeriesCube, SeriesIndex
+
+ENTS = ["Banco A", "Banco B", "Banco C"]
+CODES = ["1001", "1002", "2001", "3001"]
+
+def _frame(seed=0):
+    rng = np.random.default_rng(seed)
+    meses = pd.period_range("2021-01", "2022-12", freq="M")
+    rows = []
+    for e in ENTS:
+        for c in CODES:
+            if (e, c) == ("Banco C", "2001"):
+                continue  # par que no existe
+            for p in meses:
+                if rng.random() < 0.15:
+                    continue  # hueco
+                rows.append((e, c, str(p), rng.uniform(1, 100)))
+    df = pd.DataFrame(rows, columns=["Entidad", "Var_code", "Mes", "Valor_num"])
+    dup = df.sample(40, random_state=seed).assign(Valor_num=lambda d: d["Valor_num"] + 1000)
+    vacio = df.sample(15, random_state=seed + 1).assign(Valor_num=np.nan)
+    df = pd.concat([df, dup, vacio], ignore_index=True)
+    df.loc[df.sample(10, random_state=seed + 2).index, "Valor_num"] = np.nan
+    df = df.sample(frac=1, random_state=seed).reset_index(drop=True)  # orden del dataset arbitrario
+    df["Fecha_dt"] = pd.to_datetime(df["Mes"], format="%Y-%m")
+    df["Var_label"] = "Var " + df["Var_code"]
+    return df
+
+def _pivot(df, entity, meses):
+    # Panel original: subset de la entidad y pivot (última observación con valor)
+    sub = df[df["Entidad"] == entity]
+    pvt = sub.pivot_table(index="Var_code", columns="Mes", values="Valor_num", aggfunc="last")
+    return pvt.reindex(index=CODES, columns=meses).to_numpy()
+
+@pytest.fixture(scope="module")
+def data():
+    df = _frame()
+    return df, SeriesCube(SeriesIndex(df))
+
+def test_block_matches_baseline_pivot(data):
+    df, cube = data
+    assert cube.meses == [str(p) for p in pd.period_range("2021-01", "2022-12", freq="M")]
+    for e in ENTS:
+        np.testing.assert_array_equal(cube.block(e, CODES), _pivot(df, e, cube.meses))
+
+def test_matrix_and_entity_cube_match_baseline(data):
+    df, cube = data
+    for c in CODES:
+        pvt = df[df["Var_code"] == c].pivot_table(index="Entidad", columns="Mes", values="Valor_num", aggfunc="last")
+        np.testing.assert_array_equal(cube.matrix(c), pvt.reindex(index=cube.entidades, columns=cube.meses).to_numpy())
+    sub = SeriesCube(SeriesIndex(df), entity="Banco B")
+    np.testing.assert_array_equal(sub.block("Banco B", CODES), cube.block("Banco B", CODES))
+    assert sub.entidades == ["Banco B"]
+
+def test_mom_yoy_match_panel_formula(data):
+    df, cube = data
+    pvt = _pivot(df, "Banco A", cube.meses)
+    rows = cube.rows_for("Banco A", CODES)
+    for lag, arr in [(1, cube.mom), (12, cube.yoy)]:
+        esperado = np.full_like(pvt, np.nan)
+        esperado[:, lag:] = (pvt[:, lag:] / pvt[:, :-lag] - 1.0) * 100.0
+        np.testing.assert_allclose(arr[rows], esperado, equal_nan=True)
+
+def test_missing_pair_and_month(data):
+    _, cube = data
+    assert cube.rows_for("Banco C", ["2001"])[0] == -1
+    assert np.isnan(cube.block("Banco C", ["2001"])).all()
+    assert cube.month_pos("2020-12") is None and cube.month_pos("2022-12") == len(cube.meses) - 1
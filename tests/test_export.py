@@ -0,0 +1,83 @@
+# tests/test_export.py
+"""
+ExportPlan sobre datos de synth_data.py: tamaño estimado contra el archivo
+real, y bloques del formato ancho (cada entidad-mes entero en un bloque,
+los bloques juntos = el pivot del extracto completo).
+"""
+import io
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import pipeline
+import synth_data
+import utils_data
+
+@pytest.fixture(scope="module", params=["memoria", "parquet", "sqlite"])
+def ctx(request, tmp_path_factory):
+    d = tmp_path_factory.mktemp("export")
+    synth_data.write_dataset(d / "data", rows=20_000, files=3, seed=1)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(pipeline, "DATA_DIR", d / "data")
+        mp.setattr(pipeline, "STORE_DIR", d / "store")
+        mp.setattr(pipeline, "GROUPS_FILE", d / "grupos.json")
+        mp.setattr(pipeline, "WORKERS", 1)
+        mp.setattr(utils_data, "BACKEND", request.param)
+        w = utils_data.DatasetWatcher(watch=False)
+        mp.setattr(utils_data, "_watcher", lambda: w)
+        mp.setattr(utils_data, "EXPORT_CHUNK_ROWS", 500)  # muchos bloques con el backend en memoria
+        meta = utils_data._current_meta()
+        yield w.current, meta, list(meta.catalogo["Var_code"][:5])
+
+def _size(f):
+    return os.fstat(f.fileno()).st_size
+
+@pytest.mark.parametrize("layout", ["largo", "ancho"])
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_size_estimate_is_close_to_the_file(ctx, layout, fmt):
+    _, meta, codes = ctx
+    plan = utils_data.export_plan([], codes, meta.meses[0], meta.meses[-1], layout)
+    with plan.write(fmt) as f:
+        real = _size(f)
+    assert 1 / 1.5 < plan.est_bytes(fmt) / real < 1.5
+
+def test_long_export_has_every_row_once(ctx):
+    _, meta, codes = ctx
+    plan = utils_data.export_plan([], codes, meta.meses[0], meta.meses[-1], "largo")
+    with plan.write("csv") as f:
+        df = pd.read_csv(f, sep=";", encoding="utf-8-sig", dtype={"Var_code": str})
+    assert len(df) == plan.rows
+    assert not df.duplicated(["Entidad", "Var_code", "Mes"]).any()
+    assert list(df.columns) == ["Entidad", "Mes", "Var_code", "Var_label", "Valor"]
+
+def test_wide_chunks_keep_entity_months_whole(ctx):
+    ds, meta, codes = ctx
+    m_min, m_max = meta.meses[2], meta.meses[-3]
+    plan = utils_data.export_plan([], codes, m_min, m_max, "ancho")
+    chunks = list(plan.chunks())
+    assert len(chunks) > 1
+    cols = ["Entidad", "Mes"] + list(plan.labels)
+    assert all(list(c.columns) == cols for c in chunks)
+    claves = pd.concat([c[["Entidad", "Mes"]] for c in chunks], ignore_index=True)
+    assert not claves.duplicated().any()  # ninguna entidad-mes partida entre dos bloques
+    ancho = pd.concat(chunks, ignore_index=True).set_index(["Entidad", "Mes"]).sort_index()
+
+    full = ds.df if ds.db is None else ds.db.frame()
+    full = full[full["Var_code"].astype(str).isin(codes) & full["Mes"].astype(str).between(m_min, m_max)]
+    ref = (full.astype({"Entidad": str, "Mes": str, "Var_code": str})
+           .pivot(index=["Entidad", "Mes"], columns="Var_code", values="Valor_num")
+           .reindex(columns=codes).rename(columns=dict(zip(codes, plan.labels))).sort_index())
+    ref.columns.name = None
+    np.testing.assert_allclose(ancho.to_numpy(dtype=float), ref.to_numpy(dtype=float), equal_nan=True)
+    assert ancho.index.equals(ref.index)
+    assert plan.wide_rows == pytest.approx(len(ref), rel=0.05)
+
+def test_wide_parquet_matches_csv(ctx):
+    _, meta, codes = ctx
+    plan = utils_data.export_plan([], codes, meta.meses[0], meta.meses[-1], "ancho")
+    with plan.write("csv") as f:
+        csv = pd.read_csv(f, sep=";", encoding="utf-8-sig", dtype={"Mes": str})
+    with plan.write("parquet") as f:
+        par = pq.read_table(io.BytesIO(f.read())).to_pandas()
+    pd.testing.assert_frame_equal(par, csv, check_dtype=False)
@@ -0,0 +1,68 @@
+# tests/test_formula.py
+"""
+Motor de fórmulas: lista blanca, rechazos (siempre FormulaError, nunca una
+excepción cruda) y resultados contra NumPy.
+"""
+import numpy as np
+import pytest
+from formula import FUNCS, FormulaError, compile_formula
+
+A = np.array([[1.0, 2.0, 4.0, np.nan, 8.0, 10.0],
+              [3.0, 3.0, 0.0, 6.0, 9.0, 12.0]])
+B = np.array([[2.0, 2.0, 2.0, 2.0, 0.0, 5.0],
+              [1.0, 3.0, 1.0, 3.0, 1.0, 3.0]])
+
+def _eval(text):
+    return compile_formula(text).evaluate({"A": A, "B": B})
+
+@pytest.mark.parametrize("text", [
+    "lag(1, 1)", "diff(3)", "pct_change(2 * 3)", "rolling_mean(2, 3)", "rolling_sum(-1, 2)",
+])
+def test_constant_series_argument_is_a_formula_error(text):
+    with pytest.raises(FormulaError, match="variable"):
+        compile_formula(text)
+
+@pytest.mark.parametrize("text", [
+    "__import__('os')", "A.__class__", "open('x')", "a + 1", "AB", "A[0]", "lambda: 1",
+    "A if B else 1", "A < B", "[A]", "'x'", "A // B", "A % B", "f(A)", "np.log(A)",
+    "lag(A, n=2)", "lag(A)", "lag(A, 1, 2)", "lag(A, 1.5)", "lag(A, B)", "rolling_mean(A, 0)",
+    "rolling_sum(A, 5000)", "min(A)", "abs(A, 1)", "", "   ", "A +", "A" * 501,
+])
+def test_rejected(text):
+    with pytest.raises(FormulaError):
+        compile_formula(text)
+
+@pytest.mark.parametrize("text, expected", [
+    ("(A + B) / B * 100", (A + B) / np.where(B == 0, np.nan, B) * 100),
+    ("A × 2 ÷ B", A * 2 / np.where(B == 0, np.nan, B)),
+    ("-A ** 2", -(A ** 2)),
+    ("abs(B - A)", np.abs(B - A)),
+    ("min(A, B) + max(A, 0)", np.minimum(A, B) + np.maximum(A, 0)),
+    ("log(A)", np.where(A > 0, np.log(np.where(A > 0, A, 1.0)), np.nan)),
+])
+def test_arithmetic_and_elementwise(text, expected):
+    np.testing.assert_allclose(_eval(text), expected, equal_nan=True)
+
+def test_series_functions_run_along_months():
+    np.testing.assert_array_equal(_eval("lag(A, 2)")[0], [np.nan, np.nan, 1.0, 2.0, 4.0, np.nan])
+    np.testing.assert_array_equal(_eval("lag(A, -1)")[1], [3.0, 0.0, 6.0, 9.0, 12.0, np.nan])
+    np.testing.assert_array_equal(_eval("diff(B)")[1], [np.nan, 2.0, -2.0, 2.0, -2.0, 2.0])
+    np.testing.assert_allclose(_eval("pct_change(A, 1)")[0], [np.nan, 1.0, 1.0, np.nan, np.nan, 0.25])
+    # ventana con un mes faltante -> NaN
+    np.testing.assert_array_equal(_eval("rolling_sum(A, 2)")[0], [np.nan, 3.0, 6.0, np.nan, np.nan, 18.0])
+    np.testing.assert_array_equal(_eval("rolling_mean(B, 3)")[1], [np.nan, np.nan, 5 / 3, 7 / 3, 5 / 3, 7 / 3])
+    # una entidad (M,) da lo mismo que su fila de (E, M)
+    uno = compile_formula("rolling_mean(A, 2) - lag(B, 1)").evaluate({"A": A[1], "B": B[1]})
+    np.testing.assert_array_equal(uno, _eval("rolling_mean(A, 2) - lag(B, 1)")[1])
+
+def test_every_whitelisted_function_compiles():
+    for name, (_, n_series, (n_min, _), _) in FUNCS.items():
+        args = ["A", "B"][:n_series] + ["2"] * n_min
+        assert _eval(f"{name}({', '.join(args)})").shape == A.shape
+
+def test_constants_broadcast_and_variables_are_listed():
+    assert compile_formula("1 + 2").evaluate({}) == 3.0
+    f = compile_formula("B * 2 + lag(A, 1)")
+    assert f.variables == ("A", "B")
+    with pytest.raises(FormulaError, match="sin asignar"):
+        f.evaluate({"A": A})
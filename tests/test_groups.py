@@ -0,0 +1,47 @@
+# tests/test_groups.py
+"""Agregados (sistema y grupos) en el dataset compacto."""
+import json
+import numpy as np
+import pandas as pd
+import pipeline
+
+CSV = """Código de entidad;Descripción entidad;Fecha del dato;Código del dato;Descripción del dato;Valor
+00011;Banco A;202301;1001;Activo;100,5
+00011;Banco A;202302;1001;Activo;110
+00007;Banco B;202301;1001;Activo;50
+00007;Banco B;202302;1001;Activo;
+00072;Banco C;202301;1001;Activo;7
+"""
+
+def _load(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.csv").write_text(CSV, encoding="utf-8")
+    grupos = tmp_path / "grupos.json"
+    grupos.write_text(json.dumps({"Públicos": ["00011"], "Privados": ["00007", "00072"]}), encoding="utf-8")
+    monkeypatch.setattr(pipeline, "GROUPS_FILE", grupos)
+    monkeypatch.setattr(pipeline, "COMPACT", True)
+    df, rep = pipeline.load_dataset(data, tmp_path / "store", workers=1)
+    return df
+
+def test_entity_codes_stay_int32_with_aggregates(tmp_path, monkeypatch):
+    df = _load(tmp_path, monkeypatch)
+    assert df["Código de entidad"].dtype == np.int32
+    cod = df.drop_duplicates("Entidad").set_index("Entidad")["Código de entidad"]
+    assert cod[pipeline.GROUP_PREFIX + pipeline.SYSTEM_GROUP] == -1
+    assert cod[pipeline.GROUP_PREFIX + "Públicos"] == -2
+    assert cod[pipeline.GROUP_PREFIX + "Privados"] == -3
+    assert (cod[[not pipeline.is_group(e) for e in cod.index]] > 0).all()
+    # el texto original se reconstruye con el mismo ancho
+    raw = pipeline.with_raw_columns(df)
+    assert set(raw.loc[raw["Entidad"].map(pipeline.is_group), "Código de entidad"]) == {"-0001", "-0002", "-0003"}
+
+def test_aggregate_values(tmp_path, monkeypatch):
+    df = _load(tmp_path, monkeypatch)
+    v = df.assign(Entidad=df["Entidad"].astype(str), Mes=df["Mes"].astype(str)).set_index(["Entidad", "Mes"])["Valor_num"]
+    sistema = pipeline.GROUP_PREFIX + pipeline.SYSTEM_GROUP
+    assert v[(sistema, "2023-01")] == 157.5
+    assert v[(sistema, "2023-02")] == 110.0
+    assert v[(pipeline.GROUP_PREFIX + "Privados", "2023-01")] == 57.0
+    # ninguna entidad del grupo tiene dato: vacío, no cero
+    assert pd.isna(v[(pipeline.GROUP_PREFIX + "Privados", "2023-02")])
@@ -0,0 +1,82 @@
+# tests/test_memo.py
+"""ResultMemo: tope en bytes, desalojo LRU e invalidación por versión."""
+import numpy as np
+import pandas as pd
+import utils_data
+from utils_data import _MISS as MISS, ResultMemo, _nbytes
+
+KB = 1024
+
+def _arr(kb, fill=0.0):
+    return np.full(kb * KB // 8, fill)
+
+def _put(memo, version, key, value):
+    # como memoized: se busca (lo que fija la versión en uso) y después se guarda
+    memo.lookup(version, key)
+    memo.store(version, key, value)
+
+def test_byte_bound_and_lru_eviction():
+    memo = ResultMemo(100 * KB)
+    for k in "abcd":
+        _put(memo, "v1", k, _arr(20))
+    assert memo.nbytes == 80 * KB
+    assert memo.lookup("v1", "a") is not MISS  # "a" pasa a ser el más reciente
+    _put(memo, "v1", "e", _arr(20))
+    assert memo.nbytes == memo.budget and memo.info()["desalojos"] == 0  # justo en el tope
+    _put(memo, "v1", "f", _arr(20))
+    _put(memo, "v1", "g", _arr(20))
+    assert memo.nbytes == memo.budget
+    # se fueron los dos menos usados: b y c
+    assert [k for k in "abcdefg" if memo.lookup("v1", k) is MISS] == ["b", "c"]
+    assert memo.info()["desalojos"] == 2
+
+def test_replacing_a_key_does_not_count_twice():
+    memo = ResultMemo(100 * KB)
+    _put(memo, "v1", "a", _arr(20))
+    _put(memo, "v1", "a", _arr(10, 1.0))
+    assert memo.nbytes == 10 * KB
+    assert memo.lookup("v1", "a")[0] == 1.0
+
+def test_oversized_results_are_not_kept():
+    memo = ResultMemo(100 * KB)
+    _put(memo, "v1", "a", _arr(10))
+    _put(memo, "v1", "grande", _arr(30))  # más de un cuarto del presupuesto
+    assert memo.lookup("v1", "grande") is MISS
+    assert memo.lookup("v1", "a") is not MISS and memo.nbytes == 10 * KB
+
+def test_new_version_invalidates_everything():
+    memo = ResultMemo(100 * KB)
+    _put(memo, "v1", "a", _arr(10))
+    assert memo.lookup("v2", "a") is MISS
+    assert memo.nbytes == 0 and memo.info()["invalidaciones"] == 1
+    memo.store("v1", "a", _arr(10))  # resultado de una versión ya reemplazada: no entra
+    assert memo.lookup("v2", "a") is MISS and memo.nbytes == 0
+
+def test_sizes_include_frames_and_containers():
+    df = pd.DataFrame({"x": np.zeros(1000), "s": ["abc"] * 1000})
+    assert _nbytes(df) >= df.memory_usage(deep=True).sum()
+    assert _nbytes((df, _arr(8))) >= _nbytes(df) + 8 * KB
+
+def test_memoized_returns_shallow_copies_of_read_only_data(monkeypatch):
+    class Ds:
+        version = "v1"
+
+    memo = ResultMemo(1 << 20)
+    monkeypatch.setattr(utils_data, "_memo", lambda: memo)
+    monkeypatch.setattr(utils_data, "current_dataset", lambda: Ds)
+    llamadas = []
+
+    @utils_data.memoized
+    def vista(n, cols=("a",)):
+        llamadas.append(n)
+        return pd.DataFrame({c: np.arange(float(n)) for c in cols})
+
+    a = vista(3, ["a"])
+    b = vista(3)  # misma clave: lista y tupla, valores por defecto
+    assert llamadas == [3]
+    a["nueva"] = 1
+    assert list(b.columns) == ["a"] and list(vista(3).columns) == ["a"]
+    assert not b["a"].to_numpy().flags.writeable
+    Ds.version = "v2"
+    vista(3)
+    assert llamadas == [3, 3]
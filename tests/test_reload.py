@@ -0,0 +1,114 @@
+# tests/test_reload.py
+"""
+Recarga con el dataset anterior todavía en uso: el watcher publica el nuevo
+y el anterior se sigue pudiendo leer (particiones, calidad) hasta la
+recarga siguiente, que recién ahí lo borra del almacén.
+"""
+import os
+import threading
+import pandas as pd
+import pytest
+import pipeline
+import utils_data
+
+HEADER = "Código de entidad;Descripción entidad;Fecha del dato;Código del dato;Descripción del dato;Valor\n"
+
+def _write(path, rows, mtime):
+    path.write_text(HEADER + "".join(f"00011;Banco A;{f};1001;Activo;{v}\n" for f, v in rows), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+def _read(ds):
+    """Lo que hace una página con el dataset, en otro hilo (como un rerun de Streamlit)."""
+    out = {}
+
+    def run():
+        try:
+            df = ds.df if ds.db is None else ds.db.frame()
+            reales = ~df["Entidad"].astype(str).map(pipeline.is_group)
+            out["valores"] = sorted(df.loc[reales, "Valor_num"].astype(float).tolist())
+            out["calidad"] = len(pd.read_parquet(ds.report.quality))
+        except Exception as e:
+            out["error"] = e
+
+    t = threading.Thread(target=run)
+    t.start()
+    t.join()
+    if "error" in out:
+        raise out["error"]
+    return out
+
+@pytest.fixture(params=["memoria", "parquet", "sqlite"])
+def watcher(request, tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(pipeline, "DATA_DIR", data)
+    monkeypatch.setattr(pipeline, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(pipeline, "GROUPS_FILE", tmp_path / "grupos.json")
+    monkeypatch.setattr(pipeline, "WORKERS", 1)
+    monkeypatch.setattr(utils_data, "BACKEND", request.param)
+    _write(data / "a.csv", [("202201", 1), ("202301", 2)], 1_000_000)
+    return utils_data.DatasetWatcher(watch=False), data
+
+def test_previous_dataset_stays_readable_after_reload(watcher):
+    w, data = watcher
+    v1 = w.current
+    assert _read(v1)["valores"] == [1.0, 2.0]
+
+    # cambia un valor de 2023: se reescribe esa partición
+    _write(data / "a.csv", [("202201", 1), ("202301", 5)], 2_000_000)
+    assert w.poll()
+    v2 = w.current
+    assert v2.version != v1.version
+    assert _read(v2)["valores"] == [1.0, 5.0]
+    assert _read(v1)["valores"] == [1.0, 2.0]  # el anterior sigue entero
+
+    # la recarga siguiente borra lo que sólo usaba v1
+    _write(data / "a.csv", [("202201", 1), ("202301", 7)], 3_000_000)
+    assert w.poll()
+    assert _read(w.current)["valores"] == [1.0, 7.0]
+    assert _read(v2)["valores"] == [1.0, 5.0]
+    vivos = set().union(*(utils_data._store_files(ds) for ds in (v2, w.current)))
+    en_disco = {p for p in pipeline.STORE_DIR.rglob("*") if p.is_file() and p.suffix in (".parquet", ".sqlite")}
+    assert not vivos - en_disco
+    assert en_disco <= vivos | {pipeline.STORE_DIR / e["parte"] for e in pipeline._read_manifest(pipeline.STORE_DIR)["archivos"].values()}
+
+def test_unchanged_version_does_not_swap(watcher):
+    w, data = watcher
+    v1 = w.current
+    os.utime(data / "a.csv", (5_000_000, 5_000_000))  # touch: cambia la firma, no el contenido
+    assert not w.poll()
+    assert w.current is v1
+    assert _read(v1)["valores"] == [1.0, 2.0]
+
+def test_failed_rebuild_keeps_the_published_dataset(watcher, monkeypatch):
+    w, data = watcher
+    v1 = w.current
+    real = utils_data.load_dataset
+
+    def falla(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(utils_data, "load_dataset", falla)
+    _write(data / "a.csv", [("202201", 1), ("202301", 5)], 2_000_000)
+    with pytest.raises(OSError):
+        w.poll()
+    assert w.current is v1
+    assert _read(v1)["valores"] == [1.0, 2.0]
+    monkeypatch.setattr(utils_data, "load_dataset", real)
+    assert w.poll()  # la firma no se dio por vista: se reintenta
+    assert _read(w.current)["valores"] == [1.0, 5.0]
+
+def test_views_follow_the_swap_without_clearing_caches(watcher, monkeypatch):
+    w, data = watcher
+    monkeypatch.setattr(utils_data, "_watcher", lambda: w)
+    meta = utils_data._current_meta()
+    ent = next(e for e in meta.entidades if not pipeline.is_group(e))
+
+    def serie():
+        return utils_data.transformed_frame(ent, ["1001"], "nivel", "2022-01", "2023-01")["Valor_num"].tolist()
+
+    assert serie() == [1.0, 2.0]
+    _write(data / "a.csv", [("202201", 1), ("202301", 5)], 2_000_000)
+    assert w.poll()
+    assert serie() == [1.0, 5.0]
+    assert utils_data._current_meta().meses == ["2022-01", "2023-01"]
@@ -0,0 +1,59 @@
+# tests/test_shared.py
+"""
+Dataset compartido por proceso: una sola copia de sólo lectura (asignar
+falla con ValueError) de la que se derivan frames escribibles.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import pipeline
+import utils_data
+
+CSV = """Código de entidad;Descripción entidad;Fecha del dato;Código del dato;Descripción del dato;Valor
+00011;Banco A;202301;1001;Activo;100,5
+00011;Banco A;202302;1001;Activo;110
+00007;Banco B;202301;1001;Activo;50
+00007;Banco B;202302;2002;Pasivo;20
+"""
+
+@pytest.fixture
+def ds(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.csv").write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(pipeline, "DATA_DIR", data)
+    monkeypatch.setattr(pipeline, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(pipeline, "GROUPS_FILE", tmp_path / "grupos.json")
+    monkeypatch.setattr(pipeline, "WORKERS", 1)
+    monkeypatch.setattr(pipeline, "COMPACT", True)
+    monkeypatch.setattr(utils_data, "BACKEND", "memoria")
+    return utils_data.DatasetWatcher(watch=False).current
+
+@pytest.mark.parametrize("write", [
+    lambda df: df.iloc.__setitem__((0, df.columns.get_loc("Valor_num")), 0.0),
+    lambda df: df.loc.__setitem__((0, "Valor_num"), 0.0),
+    lambda df: df["Valor_num"].to_numpy().__setitem__(0, 0.0),
+    lambda df: df["Fecha_dt"].to_numpy().__setitem__(0, np.datetime64("2000-01-01")),
+    lambda df: df["Entidad"].cat.codes.to_numpy().__setitem__(0, 1),
+])
+def test_published_frame_is_read_only(ds, write):
+    antes = ds.df["Valor_num"].to_numpy().copy()
+    with pytest.raises(ValueError, match="read-only"):
+        write(ds.df)
+    np.testing.assert_array_equal(ds.df["Valor_num"].to_numpy(), antes)
+
+def test_derived_frames_are_writable(ds):
+    sub = ds.df[ds.df["Valor_num"] > 60].copy()
+    sub.iloc[0, sub.columns.get_loc("Valor_num")] = -1.0
+    sub["x"] = 1
+    nuevo = ds.df.assign(Doble=ds.df["Valor_num"] * 2)
+    nuevo.loc[0, "Doble"] = 0.0
+    assert ds.df["Valor_num"].max() > 60 and "Doble" not in ds.df.columns
+
+def test_derived_structures_are_read_only(ds):
+    # una por proceso lo asegura st.cache_resource, que sin runtime no siempre cachea
+    ix = utils_data._series_index(ds.version, ds)
+    cube = utils_data._cube(ds.version, ix)
+    for arr in (ix.months, ix.starts, ix.stops, ix.frame["Valor_num"].to_numpy(), cube.values, cube.mom, cube.yoy):
+        assert not arr.flags.writeable
+    assert isinstance(ix.frame, pd.DataFrame) and len(ix.frame) == len(ds.df)
@@ -0,0 +1,55 @@
+# tests/test_var_labels.py
+"""
+_build_var_labels vectorizado contra la implementación anterior (iterrows),
+con descripciones repetidas entre códigos, vacías y NaN / None.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from pipeline import _build_var_labels
+
+def _labels_iterrows(df: pd.DataFrame) -> list:
+    # implementación original (baseline), tal cual
+    pairs = df[["Var_desc", "Var_code"]].drop_duplicates()
+    counts = pairs.groupby("Var_desc")["Var_code"].nunique()
+    dup_desc = set(counts[counts > 1].index)
+    label_map = {}
+    for desc, sub in pairs.groupby("Var_desc"):
+        sub = sub.sort_values("Var_code")
+        if desc in dup_desc:
+            for i, (_, row) in enumerate(sub.iterrows(), start=1):
+                label_map[(desc, row["Var_code"])] = f"{desc or '—'} ({i})"
+        else:
+            for _, row in sub.iterrows():
+                label_map[(desc, row["Var_code"])] = desc or "—"
+    return [label_map.get((d, c), d or "—") for d, c in zip(df["Var_desc"], df["Var_code"])]
+
+def _frame(descs, codes):
+    return pd.DataFrame({"Var_desc": pd.Series(descs, dtype=object), "Var_code": pd.Series(codes, dtype=object)})
+
+def test_nan_description_does_not_take_another_label():
+    df = _frame(["Desc", "Desc", np.nan, "Otra"], ["1", "2", "3", "4"])
+    assert _build_var_labels(df)["Var_label"].tolist() == ["Desc (1)", "Desc (2)", "—", "Otra"]
+
+@pytest.mark.parametrize("vacio", [np.nan, None, ""])
+def test_empty_descriptions_share_the_dash_label(vacio):
+    df = _frame([vacio, "A", vacio, "A"], ["9", "1", "3", "1"])
+    assert _build_var_labels(df)["Var_label"].tolist() == ["— (2)", "A", "— (1)", "A"]
+
+def test_matches_iterrows_version():
+    rng = np.random.default_rng(7)
+    n = 5000
+    descs = np.array(["Activo", "Pasivo", "Depósitos", "", "—", "Préstamos", None, np.nan], dtype=object)
+    df = _frame(descs[rng.integers(0, len(descs), n)], [f"{c:05d}" for c in rng.integers(1, 60, n)])
+    got = _build_var_labels(df.copy())["Var_label"].tolist()
+    # la versión anterior dejaba NaN como etiqueta (float) y no numeraba esas
+    # filas; sobre las descripciones vacías normalizadas es la referencia
+    ref = _labels_iterrows(df.assign(Var_desc=df["Var_desc"].fillna("")))
+    assert got == ref
+    # sin vacíos, idéntica sin normalizar nada
+    llenas = df[df["Var_desc"].notna()].reset_index(drop=True)
+    assert _build_var_labels(llenas.copy())["Var_label"].tolist() == _labels_iterrows(llenas)
+
+def test_empty_frame():
+    out = _build_var_labels(_frame([], []))
+    assert "Var_label" in out and out.empty
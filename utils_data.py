@@ -1,263 +1,1303 @@
-# utils_data.py
-from pathlib import Path
-import re
-import unicodedata
-import pandas as pd
-import numpy as np
-import streamlit as st
-
-DATA_DIR = Path(__file__).parent / "data"
-
-# Estructura estándar del dashboard
-COLS_STD = [
-    "Código de entidad",
-    "Descripción entidad",
-    "Fecha del dato",
-    "Código del dato",
-    "Descripción del dato",
-    "Valor",
-]
-
-# ---------- utilidades num/fecha ----------
-def _to_float(v: str):
-    if v is None:
-        return np.nan
-    s = str(v).strip()
-    if s == "":
-        return np.nan
-    s = s.replace(" ", "")
-    if "," in s and "." in s:
-        s = s.replace(".", "").replace(",", ".")
-    elif "," in s and "." not in s:
-        s = s.replace(",", ".")
-    s = s.replace("%", "")
-    try:
-        return float(s)
-    except Exception:
-        return np.nan
-
-def _yyyymm_to_date(yyyymm: str):
-    if not isinstance(yyyymm, str):
-        yyyymm = str(yyyymm)
-    m = re.match(r"^\s*(\d{4})(\d{2})\s*$", yyyymm)
-    if not m:
-        return pd.NaT, None
-    y, mth = int(m.group(1)), int(m.group(2))
-    ts = pd.Timestamp(year=y, month=mth, day=1)
-    return ts, f"{y:04d}-{mth:02d}"
-
-# ---------- normalizador de encabezados ----------
-def _strip_accents(s: str) -> str:
-    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
-
-def _norm_header(s: str) -> str:
-    s = _strip_accents(str(s)).lower().strip()
-    s = re.sub(r"[^a-z0-9 ]", " ", s)
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-# mapa de sinónimos normalizados -> nombre estándar
-HEADER_MAP = {
-    # Código de la entidad
-    "codigo de entidad": "Código de entidad",
-    "codigo entidad": "Código de entidad",
-    "codigo de la entidad": "Código de entidad",
-    "cod entidad": "Código de entidad",
-    "n codent": "Código de entidad",
-    "codent": "Código de entidad",
-
-    # Descripción / nombre de la entidad
-    "descripcion entidad": "Descripción entidad",
-    "nombre de la entidad": "Descripción entidad",
-    "nombre entidad": "Descripción entidad",
-    "noment": "Descripción entidad",
-
-    # Fecha (AAAAMM)
-    "fecha del dato": "Fecha del dato",
-    "fecha": "Fecha del dato",
-    "c fecinf": "Fecha del dato",
-    "fecinf": "Fecha del dato",
-    "periodo": "Fecha del dato",
-    "periodo aaamm": "Fecha del dato",
-    "aaaamm": "Fecha del dato",
-    "mes": "Fecha del dato",
-
-    # Código de variable
-    "codigo del dato": "Código del dato",
-    "codigo dato": "Código del dato",
-    "codigo partida": "Código del dato",
-    "c partida": "Código del dato",
-    "variable": "Código del dato",
-
-    # Descripción de variable
-    "descripcion del dato": "Descripción del dato",
-    "descripcion dato": "Descripción del dato",
-    "c descri2": "Descripción del dato",
-    "descripcion": "Descripción del dato",
-
-    # Valor
-    "valor": "Valor",
-    "n total": "Valor",
-    "total": "Valor",
-    "importe": "Valor",
-    "valor actual": "Valor",
-    "valor_actual": "Valor",
-}
-
-def _rename_headers(df: pd.DataFrame) -> pd.DataFrame:
-    ren = {}
-    for c in df.columns:
-        nc = _norm_header(c)
-        if nc in HEADER_MAP:
-            ren[c] = HEADER_MAP[nc]
-    if ren:
-        df = df.rename(columns=ren)
-    return df
-
-# ---------- lector flexible ----------
-def _read_csv_flexible(path: Path) -> pd.DataFrame:
-    tries = [
-        {"sep": ";", "enc": "utf-8-sig"},
-        {"sep": ";", "enc": "latin-1"},
-        {"sep": ",", "enc": "utf-8-sig"},
-        {"sep": ",", "enc": "latin-1"},
-        {"sep": "\t", "enc": "utf-8-sig"},
-        {"sep": "\t", "enc": "latin-1"},
-    ]
-    last_err = None
-    for t in tries:
-        try:
-            df = pd.read_csv(path, sep=t["sep"], encoding=t["enc"], dtype=str, engine="python")
-            return df
-        except Exception as e:
-            last_err = e
-            continue
-    raise RuntimeError(f"No pude leer {path.name}: {last_err}")
-
-# ---------- catálogo de variables ----------
-def _build_var_labels(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Var_label = SOLO descripción.
-    Si una misma descripción corresponde a >1 código distinto,
-    se numeran: 'Descripción', 'Descripción (2)', 'Descripción (3)', ...
-    """
-    pairs = df[["Var_desc", "Var_code"]].drop_duplicates()
-    # cuántos códigos únicos por descripción
-    counts = pairs.groupby("Var_desc")["Var_code"].nunique()
-    dup_desc = set(counts[counts > 1].index)
-
-    label_map = {}
-    for desc, sub in pairs.groupby("Var_desc"):
-        sub = sub.sort_values("Var_code")  # estable
-        if desc in dup_desc:
-            for i, (_, row) in enumerate(sub.iterrows(), start=1):
-                label_map[(desc, row["Var_code"])] = f"{desc or '—'} ({i})"
-        else:
-            # único
-            for _, row in sub.iterrows():
-                label_map[(desc, row["Var_code"])] = desc or "—"
-
-    df["Var_label"] = [label_map.get((d, c), d or "—") for d, c in zip(df["Var_desc"], df["Var_code"])]
-    return df
-
-# ---------- API pública ----------
-@st.cache_data(show_spinner=True, ttl=600)
-def load_df() -> pd.DataFrame:
-    """
-    Lee TODOS los .csv en ./data, intenta mapear encabezados "parecidos"
-    a los nombres estándar y concatena sólo los que quedan completos.
-    """
-    if not DATA_DIR.exists():
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-    frames = []
-    loaded, skipped = [], []
-
-    for p in sorted(DATA_DIR.glob("*.csv")):
-        try:
-            raw = _read_csv_flexible(p)
-            raw = _rename_headers(raw)
-            missing = [c for c in COLS_STD if c not in raw.columns]
-            if missing:
-                skipped.append(f"{p.name} (faltan: {', '.join(missing)})")
-                continue
-            df = raw[COLS_STD].copy()
-            df["__archivo__"] = p.name
-            frames.append(df)
-            loaded.append(p.name)
-        except Exception as e:
-            skipped.append(f"{p.name} (error: {e})")
-
-    if not frames:
-        st.caption("No se cargaron CSV válidos desde ./data")
-        return pd.DataFrame(columns=COLS_STD + ["Fecha_dt","Mes","Valor_num","Entidad","Var_code","Var_desc","Var_label"])
-
-    big = pd.concat(frames, ignore_index=True)
-
-    # Normalizaciones
-    big["Código de entidad"] = big["Código de entidad"].astype(str).str.strip().str.zfill(5)
-    big["Descripción entidad"] = big["Descripción entidad"].astype(str).str.strip()
-
-    dt, lab = zip(*big["Fecha del dato"].astype(str).map(_yyyymm_to_date))
-    big["Fecha_dt"] = list(dt)
-    big["Mes"] = list(lab)
-    big = big.dropna(subset=["Fecha_dt"])
-
-    big["Valor_num"] = big["Valor"].map(_to_float)
-    big["Entidad"] = big["Código de entidad"] + " - " + big["Descripción entidad"].fillna("")
-
-    # Variables
-    big["Var_code"] = big["Código del dato"].astype(str).str.strip()
-    big["Var_desc"] = big["Descripción del dato"].astype(str).str.strip()
-
-    # Etiquetas SOLO con descripción (con sufijos si hay duplicados)
-    big = _build_var_labels(big)
-
-    big = big.sort_values(["Fecha_dt", "Código de entidad", "Var_desc", "Var_code"]).reset_index(drop=True)
-
-    # Info al usuario
-    msg = f"Archivos cargados desde ./data: {len(loaded)}"
-    if loaded:
-        msg += " (" + ", ".join(loaded) + ")"
-    if skipped:
-        msg += f" · Ignorados: {len(skipped)}"
-    st.caption(msg)
-    if skipped:
-        with st.expander("Ver archivos ignorados"):
-            for s in skipped:
-                st.markdown(f"- {s}")
-
-    return big
-
-def get_defaults(df: pd.DataFrame):
-    """Entidad: la que contenga 'nación' si existe; Variable: la primera etiqueta (por descripción)."""
-    ent_default = None
-    if not df.empty:
-        ents = df["Entidad"].unique().tolist()
-        cand = [e for e in ents if "nacion" in e.lower() or "nación" in e.lower()]
-        ent_default = cand[0] if cand else (ents[0] if ents else None)
-
-    var_default_label = None
-    if not df.empty:
-        labs = df["Var_label"].unique().tolist()
-        var_default_label = labs[0] if labs else None
-
-    return ent_default, var_default_label
-
-def month_options(df: pd.DataFrame):
-    months = df.dropna(subset=["Mes"])["Mes"].unique().tolist()
-    months = sorted(months)
-    return months
-
-def variable_catalog(df: pd.DataFrame) -> pd.DataFrame:
-    """Catálogo único: etiqueta (sólo descripción) y su código asociado."""
-    return df[["Var_label","Var_code"]].drop_duplicates().sort_values("Var_label")
-
-def label_to_code(df: pd.DataFrame, label: str) -> str:
-    """Convierte etiqueta (descripción o descripción con sufijo) a código."""
-    cat = variable_catalog(df)
-    row = cat.loc[cat["Var_label"] == label]
-    if not row.empty:
-        return row.iloc[0]["Var_code"]
-    # fallback: si no encuentra, devuelve el mismo label
-    return label
+# utils_data.py
+import codecs
+import cProfile
+import functools
+import inspect
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, fields, is_dataclass, replace
+from pathlib import Path
+from datetime import datetime
+from functools import cached_property
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from formula import compile_formula, FormulaError, rolling_window
+from diagnostics import PageTimer, count, record, tracked
+import quality
+from sqlite_store import SqliteStore, build as build_sqlite
+from parquet_store import ParquetStore
+# la ingesta vive en pipeline.py (sin Streamlit); las páginas toman is_group de acá
+from pipeline import (
+    LoadReport, freeze_frame, readonly, data_signature, load_dataset, dataset_files, prune_store,
+    GROUP_PREFIX, SYSTEM_GROUP, is_group, is_group_code,
+)
+
+# ---------- dataset activo y recarga en segundo plano ----------
+# Un hilo sondea DATA_DIR (nombre, tamaño y mtime de cada CSV); si algo
+# cambió reconstruye el dataset fuera de los pedidos (el almacén re-parsea
+# sólo los archivos afectados) y publica el nuevo de una sola asignación.
+# Los cachés derivados usan la versión del dataset como clave, así que nadie
+# espera una recarga y nada queda viejo más que unos segundos.
+# El dataset y lo que se deriva de él (índice, cubos, series) existen una
+# sola vez por proceso (st.cache_resource, sin copias por rerun) y se
+# comparten entre sesiones: sus buffers son de sólo lectura, así que una
+# asignación accidental falla en lugar de cambiarle los datos a todos.
+# Los archivos que una recarga deja sin usar se borran recién después de
+# publicar la versión nueva, y no los del dataset que reemplazó: un pedido
+# que ya lo había tomado termina de leerlo. Caen en la recarga siguiente.
+WATCH = os.environ.get("BCRA_WATCH", "1") != "0"
+WATCH_SECS = float(os.environ.get("BCRA_WATCH_SECS", 5))
+# "memoria": el dataset entero en un DataFrame; "sqlite" / "parquet": queda
+# en disco (ver sqlite_store.py y parquet_store.py) y cada vista consulta
+# sólo sus filas
+BACKEND = os.environ.get("BCRA_BACKEND", "memoria")
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    Dataset publicado: no se modifica (`df` tiene los buffers de sólo
+    lectura); una recarga crea otro. Con los backends en disco `df` es None
+    y las consultas van a `db` (SqliteStore o ParquetStore).
+    """
+    df: pd.DataFrame | None
+    report: LoadReport
+    version: str
+    built_at: datetime
+    build_secs: float
+    db: SqliteStore | ParquetStore | None = None
+
+def _build_dataset() -> Dataset:
+    t0 = time.perf_counter()
+    big, rep = load_dataset(frame=BACKEND not in ("sqlite", "parquet"))
+    db = None
+    if big is not None:
+        freeze_frame(big)
+    elif BACKEND == "parquet":
+        db = ParquetStore(Path(rep.dataset).parent)
+    else:
+        t1 = time.perf_counter()
+        db = SqliteStore(build_sqlite(rep.partitions, Path(rep.dataset).parent, rep.version))
+        rep.timings["sqlite"] = time.perf_counter() - t1
+    for etapa, secs in rep.timings.items():
+        record("carga", etapa, secs)
+    return Dataset(big, rep, rep.version, datetime.now(), time.perf_counter() - t0, db)
+
+def _store_files(ds: Dataset) -> set:
+    """Archivos del almacén que lee `ds` (con el backend sqlite, también su base)."""
+    files = dataset_files(ds.report)
+    if isinstance(ds.db, SqliteStore):
+        files.add(ds.db.path)
+    return files
+
+def _prune(*datasets: Dataset):
+    """Borra del almacén lo que no lee ninguno de `datasets` (ver pipeline.prune_store)."""
+    prune_store(None, set().union(*map(_store_files, datasets)))
+
+class DatasetWatcher:
+    """Mantiene el Dataset activo y lo reemplaza cuando cambian los CSV de DATA_DIR."""
+
+    def __init__(self, interval: float = WATCH_SECS, watch: bool = WATCH):
+        self.interval = interval
+        self.error = None
+        self._sig = data_signature()
+        self.current = _build_dataset()
+        _prune(self.current)
+        if watch:
+            threading.Thread(target=self._run, name="bcra-watcher", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:  # el hilo no puede morir: se informa y se reintenta
+                self.error = f"{type(e).__name__}: {e}"
+
+    def poll(self) -> bool:
+        """Reconstruye si cambió la carpeta; True si publicó una versión nueva."""
+        sig = data_signature()
+        if sig == self._sig:
+            return False
+        ds = _build_dataset()
+        self._sig, self.error = sig, None
+        if ds.version == self.current.version:
+            return False
+        old, self.current = self.current, ds
+        # los pedidos en curso terminan con el anterior: sus archivos quedan
+        _prune(ds, old)
+        return True
+
+@st.cache_resource(show_spinner=True)
+def _watcher() -> DatasetWatcher:
+    return DatasetWatcher()
+
+def current_dataset() -> Dataset:
+    """Dataset publicado en este momento (la primera llamada lo construye)."""
+    return _watcher().current
+
+def _show_load_info(ds: Dataset):
+    rep = ds.report
+    loaded, skipped = rep.loaded, rep.skipped
+    error = _watcher().error
+    if error:
+        st.warning(f"La última recarga de ./data falló ({error}); se siguen mostrando los datos anteriores.")
+    if not loaded:
+        st.caption("No se cargaron CSV válidos desde ./data")
+        return
+    msg = f"Archivos cargados desde ./data: {len(loaded)}"
+    if loaded:
+        msg += " (" + ", ".join(loaded) + ")"
+    if skipped:
+        msg += f" · Ignorados: {len(skipped)}"
+    if rep.bad_fechas or rep.bad_valores:
+        msg += f" · Filas con fecha inválida (descartadas): {rep.bad_fechas} · Valores no numéricos: {rep.bad_valores}"
+    msg += f" · Versión {ds.version} ({ds.built_at:%d/%m/%Y %H:%M:%S})"
+    st.caption(msg)
+    if skipped:
+        with st.expander("Ver archivos ignorados"):
+            for s in skipped:
+                st.markdown(f"- {s['archivo']} ({s['motivo']}" + (f" · {s['dialecto']})" if s["dialecto"] else ")"))
+
+# ---------- resultados por página ----------
+# Lo que una página arma a partir de sus filtros (tabla del Panel, frame del
+# Comparador, resultado de la Calculadora) se guarda por (función, filtros
+# normalizados) en un LRU acotado en bytes y compartido por el proceso:
+# volver a una combinación ya vista no recalcula nada. Las entradas son de
+# la versión del dataset en uso; la primera consulta con otra versión las
+# descarta todas.
+MEMO_MB = float(os.environ.get("BCRA_MEMO_MB", 128))
+_MISS = object()
+
+def _nbytes(obj) -> int:
+    """Tamaño aproximado de un resultado (frames con memory_usage deep)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(index=True, deep=True)))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_nbytes(x) for x in obj)
+    if is_dataclass(obj):
+        return sum(_nbytes(getattr(obj, f.name)) for f in fields(obj))
+    return sys.getsizeof(obj)
+
+def _freeze(obj):
+    """Deja de sólo lectura frames y arrays de un resultado (se comparte entre sesiones)."""
+    if isinstance(obj, pd.DataFrame):
+        freeze_frame(obj)
+    elif isinstance(obj, np.ndarray):
+        readonly(obj)
+    elif isinstance(obj, (list, tuple)):
+        for x in obj:
+            _freeze(x)
+    elif is_dataclass(obj):
+        for f in fields(obj):
+            _freeze(getattr(obj, f.name))
+    return obj
+
+def _shallow(obj):
+    """
+    Copia superficial de un resultado: frames nuevos sobre los mismos
+    buffers (de sólo lectura), así agregar o quitar columnas en una página
+    no cambia la entrada compartida.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return obj.copy(deep=False)
+    if isinstance(obj, tuple):
+        return tuple(_shallow(x) for x in obj)
+    if isinstance(obj, list):
+        return [_shallow(x) for x in obj]
+    if is_dataclass(obj):
+        return replace(obj, **{f.name: _shallow(getattr(obj, f.name)) for f in fields(obj)})
+    return obj
+
+class ResultMemo:
+    """LRU de resultados de una versión del dataset, acotado a `budget` bytes."""
+
+    def __init__(self, budget: int):
+        self.budget = int(budget)
+        self.version = None
+        self.nbytes = 0
+        self.stats = Counter()
+        self._items = OrderedDict()  # clave -> (resultado, bytes)
+        self._lock = threading.Lock()
+
+    def _use(self, version):
+        if version != self.version:
+            self.stats["invalidaciones"] += self.version is not None
+            self._items.clear()
+            self.nbytes, self.version = 0, version
+
+    def lookup(self, version, key):
+        with self._lock:
+            self._use(version)
+            item = self._items.get(key)
+            if item is None:
+                return _MISS
+            self._items.move_to_end(key)
+            return item[0]
+
+    def store(self, version, key, value, n: int | None = None):
+        # `n` medido antes de congelar: memory_usage(deep=True) de pandas 2.x
+        # falla con columnas object de sólo lectura
+        n = _nbytes(value) if n is None else n
+        with self._lock:
+            # de una versión que ya se reemplazó, o tan grande que vaciaría el LRU
+            if version != self.version or n > self.budget // 4:
+                return
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._items[key] = (value, n)
+            self.nbytes += n
+            while self.nbytes > self.budget:
+                _, (_, m) = self._items.popitem(last=False)
+                self.nbytes -= m
+                self.stats["desalojos"] += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"entradas": len(self._items), "MB": round(self.nbytes / 2**20, 2),
+                    "presupuesto MB": round(self.budget / 2**20, 1),
+                    "desalojos": self.stats["desalojos"], "invalidaciones": self.stats["invalidaciones"]}
+
+@st.cache_resource(show_spinner=False)
+def _memo() -> ResultMemo:
+    return ResultMemo(MEMO_MB * 2**20)
+
+def memo_info() -> dict:
+    """Uso del LRU de resultados por página (para Diagnóstico)."""
+    return _memo().info()
+
+def _norm(v):
+    # listas y escalares NumPy de los widgets: misma clave para el mismo filtro
+    if isinstance(v, (list, tuple)):
+        return tuple(_norm(x) for x in v)
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+def memoized(fn):
+    """
+    Memoiza `fn` en el LRU de resultados, con clave (nombre, argumentos
+    normalizados, con sus valores por defecto). Cada llamada recibe una
+    copia superficial (ver `_shallow`) de la entrada compartida, con los
+    datos de sólo lectura.
+    """
+    sig = inspect.signature(fn)
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        b = sig.bind(*args, **kwargs)
+        b.apply_defaults()
+        params = tuple(_norm(v) for v in b.arguments.values())
+        version = current_dataset().version
+        memo = _memo()
+        out = memo.lookup(version, (name,) + params)
+        count(name, out is not _MISS)
+        if out is _MISS:
+            out = fn(*params)
+            n = _nbytes(out)
+            memo.store(version, (name,) + params, _freeze(out), n)
+        return _shallow(out)
+    return call
+
+# ---------- índice de series ----------
+def _mes_to_int(mes) -> int:
+    """'AAAA-MM' -> meses desde el año 0 (para comparar y buscar rápido)."""
+    y, m = str(mes).split("-")
+    return int(y) * 12 + int(m) - 1
+
+class SeriesIndex:
+    """
+    Dataset reordenado por (entidad, Var_code, fecha) con un diccionario
+    (entidad, Var_code) -> tramo contiguo. Filtrar por rango de meses es una
+    búsqueda binaria dentro del tramo: el costo depende del tamaño de la
+    respuesta, no del dataset.
+    """
+    COLS = ["Fecha_dt", "Mes", "Entidad", "Var_code", "Var_label", "Valor_num"]
+
+    def __init__(self, df: pd.DataFrame, month_range=None):
+        ent_codes, ents = pd.factorize(df["Entidad"], sort=True)
+        var_codes, codes = pd.factorize(df["Var_code"], sort=True)
+        fecha = df["Fecha_dt"]
+        months = (fecha.dt.year * 12 + fecha.dt.month - 1).to_numpy(dtype=np.int32)
+        # lexsort es estable: ante duplicados se conserva el orden del dataset
+        order = np.lexsort((months, var_codes, ent_codes))
+
+        self.frame = freeze_frame(df[self.COLS].take(order).reset_index(drop=True))
+        self.months = readonly(months[order])
+        key = ent_codes[order].astype(np.int64) * len(codes) + var_codes[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.array([], dtype=np.int64)
+        stops = np.r_[starts[1:], len(key)]
+        ents, codes = np.asarray(ents, dtype=object), np.asarray(codes, dtype=object)
+        self.slices = {
+            (ents[k // len(codes)], codes[k % len(codes)]): (a, b)
+            for k, a, b in zip(key[starts].tolist(), starts.tolist(), stops.tolist())
+        }
+        self.starts, self.stops = readonly(starts), readonly(stops)
+        self.month_min = int(self.months.min()) if len(self.months) else 0
+        self.month_max = int(self.months.max()) if len(self.months) else -1
+        if month_range is not None:
+            # subconjunto del dataset (backend en disco): el eje es el de todo el dataset
+            self.month_min, self.month_max = month_range
+
+    def _bounds(self, entity, code, m_min=None, m_max=None):
+        a, b = self.slices.get((entity, code), (0, 0))
+        if a == b:
+            return a, b
+        ms = self.months[a:b]
+        lo = a if m_min is None else a + int(np.searchsorted(ms, _mes_to_int(m_min), side="left"))
+        hi = b if m_max is None else a + int(np.searchsorted(ms, _mes_to_int(m_max), side="right"))
+        return lo, max(lo, hi)
+
+@tracked(st.cache_resource(show_spinner=False, max_entries=2))
+def _series_index(version, _ds) -> SeriesIndex:
+    return SeriesIndex(_ds.df)
+
+def _month_range(ds: "Dataset"):
+    meses = _meta(ds.version, ds).meses
+    return (_mes_to_int(meses[0]), _mes_to_int(meses[-1])) if meses else (0, -1)
+
+def _index_for(entity=None, codes=None, m_min=None, m_max=None) -> SeriesIndex:
+    """
+    Índice que cubre (entidad, códigos, meses 'AAAA-MM'): el de todo el
+    dataset en memoria, o con un backend en disco uno armado sólo con las
+    filas que devuelve la consulta (parquet sólo abre las particiones del
+    rango).
+    """
+    ds = current_dataset()
+    if ds.db is None:
+        return _series_index(ds.version, ds)
+    lo = _mes_to_int(m_min) if m_min is not None else None
+    hi = _mes_to_int(m_max) if m_max is not None else None
+    return SeriesIndex(ds.db.frame(entity=entity, codes=codes, m_min=lo, m_max=hi), _month_range(ds))
+
+# ---------- cubo entidad × variable × mes ----------
+# El cubo denso cuesta 8 bytes por (par entidad-variable × mes del rango);
+# si supera este límite (o con BCRA_CUBE=0) se arma uno por entidad a pedido.
+CUBE = os.environ.get("BCRA_CUBE", "1") != "0"
+CUBE_MAX_CELLS = int(os.environ.get("BCRA_CUBE_MAX_CELLS", 60_000_000))
+
+def _int_to_mes(m: int) -> str:
+    return f"{m // 12:04d}-{m % 12 + 1:02d}"
+
+def _pct_shift(a: np.ndarray, k: int) -> np.ndarray:
+    """a[t] / a[t-k] - 1 sobre el eje de meses (NaN donde no hay t-k)."""
+    out = np.full(a.shape, np.nan)
+    if k < a.shape[-1]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[..., k:] = a[..., k:] / a[..., :-k] - 1.0
+    return out
+
+class SeriesCube:
+    """
+    Valores en una matriz (par entidad-variable × mes), con un mes por
+    columna para todo el rango calendario del dataset (sin huecos), así
+    MoM/YoY/base 100 son desplazamientos de columnas para todas las series a
+    la vez. Las filas son sólo los pares que existen (bloque disperso), con
+    búsquedas enteras por entidad, variable y mes.
+    Ante (entidad, variable, mes) repetidos queda el último con valor, como
+    pivot_table(aggfunc="last").
+    """
+
+    def __init__(self, index: SeriesIndex, entity=None):
+        pairs = list(index.slices)
+        sel = np.arange(len(pairs))
+        if entity is not None:
+            # en el índice las filas de una entidad son contiguas
+            sel = np.array([i for i, (e, _) in enumerate(pairs) if e == entity], dtype=np.int64)
+            pairs = [pairs[i] for i in sel]
+        lo = int(index.starts[sel[0]]) if len(sel) else 0
+        hi = int(index.stops[sel[-1]]) if len(sel) else 0
+
+        self.m0 = index.month_min
+        self.meses = [_int_to_mes(m) for m in range(index.month_min, index.month_max + 1)]
+        self.fechas = pd.to_datetime(self.meses, format="%Y-%m")
+
+        self.pairs = pairs
+        self.row = {p: i for i, p in enumerate(pairs)}
+        self.entidades = sorted({e for e, _ in pairs})
+        self.codes = sorted({c for _, c in pairs})
+        self.ent_pos = {e: i for i, e in enumerate(self.entidades)}
+        self.code_pos = {c: i for i, c in enumerate(self.codes)}
+        self.pair_ent = np.array([self.ent_pos[e] for e, _ in pairs], dtype=np.int64)
+        self.pair_code = np.array([self.code_pos[c] for _, c in pairs], dtype=np.int64)
+
+        rows = np.repeat(np.arange(len(pairs)), index.stops[sel] - index.starts[sel])
+        cols = index.months[lo:hi] - self.m0
+        vals = index.frame["Valor_num"].to_numpy(dtype=np.float64)[lo:hi]
+        # "last" de pandas saltea los NaN: un vacío repetido no tapa el valor anterior
+        ok = ~np.isnan(vals)
+        rows, cols, vals = rows[ok], cols[ok], vals[ok]
+        # filas ordenadas por (par, mes): queda el último de cada grupo repetido
+        last = np.r_[(rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1]), True] if len(rows) else np.zeros(0, bool)
+        self.values = np.full((len(pairs), len(self.meses)), np.nan)
+        self.values[rows[last], cols[last]] = vals[last]
+        readonly(self.values)
+
+    def month_pos(self, mes):
+        i = _mes_to_int(mes) - self.m0
+        return i if 0 <= i < len(self.meses) else None
+
+    def rows_for(self, entity, codes):
+        """Filas del cubo para (entidad, cada código); -1 si el par no existe."""
+        return np.array([self.row.get((entity, c), -1) for c in codes], dtype=np.int64)
+
+    def block(self, entity, codes) -> np.ndarray:
+        """Matriz (códigos × meses) de una entidad; filas NaN para pares sin datos."""
+        rows = self.rows_for(entity, codes)
+        out = np.full((len(rows), len(self.meses)), np.nan)
+        ok = rows >= 0
+        out[ok] = self.values[rows[ok]]
+        return out
+
+    def matrix(self, code) -> np.ndarray:
+        """Matriz (entidades × meses) de una variable, en el orden de `entidades`."""
+        out = np.full((len(self.entidades), len(self.meses)), np.nan)
+        sel = np.flatnonzero(self.pair_code == self.code_pos[code]) if code in self.code_pos else []
+        out[self.pair_ent[sel]] = self.values[sel]
+        return out
+
+    @cached_property
+    def mom(self) -> np.ndarray:
+        """MoM % de todas las series (ver `apply_transform`)."""
+        return readonly(apply_transform(self.values, "mom"))
+
+    @cached_property
+    def yoy(self) -> np.ndarray:
+        """YoY % de todas las series."""
+        return readonly(apply_transform(self.values, "yoy"))
+
+@tracked(st.cache_resource(show_spinner=False, max_entries=2))
+def _cube(version, _ix):
+    if not CUBE or len(_ix.slices) * (_ix.month_max - _ix.month_min + 1) > CUBE_MAX_CELLS:
+        return None
+    return SeriesCube(_ix)
+
+def load_cube():
+    """Cubo completo, o None si está desactivado, no entra en CUBE_MAX_CELLS o el backend es en disco."""
+    ds = current_dataset()
+    if ds.db is not None:
+        return None
+    return _cube(ds.version, _series_index(ds.version, ds))
+
+@tracked(st.cache_resource(show_spinner=False, max_entries=16))
+def _entity_cube(version, entity, _ds):
+    if _ds.db is None:
+        return SeriesCube(_series_index(version, _ds), entity)
+    return SeriesCube(SeriesIndex(_ds.db.frame(entity=entity), _month_range(_ds)), entity)
+
+def entity_cube(entity) -> SeriesCube:
+    """Cubo que contiene a `entity`: el global si existe, si no uno sólo de esa entidad."""
+    cube = load_cube()
+    if cube is not None:
+        return cube
+    ds = current_dataset()
+    return _entity_cube(ds.version, entity, ds)
+
+def code_matrix(code, m_min=None, m_max=None):
+    """
+    (entidades, meses, matriz entidades × meses) de una variable para todo el
+    sistema. Sale del cubo global; sin cubo se arma desde el índice (con un
+    backend en disco, desde las filas de esa variable). El eje de meses es
+    siempre el completo; con `m_min`/`m_max` un backend en disco sólo lee ese
+    rango y el resto queda NaN.
+    """
+    cube = load_cube()
+    if cube is not None:
+        return cube.entidades, cube.meses, cube.matrix(code)
+    ix = _index_for(codes=[code], m_min=m_min, m_max=m_max)
+    ents = sorted(e for e, c in ix.slices if c == code)
+    meses = [_int_to_mes(m) for m in range(ix.month_min, ix.month_max + 1)]
+    out = np.full((len(ents), len(meses)), np.nan)
+    vals = ix.frame["Valor_num"].to_numpy(dtype=np.float64)
+    for i, e in enumerate(ents):
+        a, b = ix.slices[(e, code)]
+        out[i, ix.months[a:b] - ix.month_min] = vals[a:b]
+    return ents, meses, out
+
+# ---------- transformaciones derivadas ----------
+# Se aplican sobre series alineadas a meses calendario (un mes por posición,
+# sin huecos), así YoY compara siempre con el mismo mes del año anterior
+# aunque falten meses en el medio.
+TRANSFORMS = {
+    "nivel": "Valor",
+    "base100": "Índice (Base=100)",
+    "yoy": "YoY (%)",
+    "mom": "MoM (%)",
+    "media_movil": "Media móvil",
+    "cagr": "CAGR (%)",
+}
+
+def _first_valid_from(a: np.ndarray, pos: int) -> np.ndarray:
+    """Primer valor no NaN desde la posición `pos` (por fila)."""
+    tail = a[..., pos:]
+    if not tail.shape[-1]:
+        return np.full(a.shape[:-1], np.nan)
+    ok = ~np.isnan(tail)
+    v = np.take_along_axis(tail, np.argmax(ok, axis=-1)[..., None], axis=-1)[..., 0]
+    return np.where(ok.any(axis=-1), v, np.nan)
+
+def apply_transform(a: np.ndarray, kind: str, base_pos: int = 0, window: int = 3) -> np.ndarray:
+    """
+    Transformación vectorizada de series (..., meses).
+    base100 y cagr toman como base el primer dato desde `base_pos`.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    if kind == "nivel":
+        return a
+    if kind == "mom":
+        return _pct_shift(a, 1) * 100.0
+    if kind == "yoy":
+        return _pct_shift(a, 12) * 100.0
+    if kind == "media_movil":
+        return rolling_window(a, window, True)
+    base = _first_valid_from(a, base_pos)[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if kind == "base100":
+            return a / base * 100.0
+        if kind == "cagr":
+            t = np.arange(a.shape[-1]) - base_pos
+            years = np.where(t > 0, t / 12.0, np.nan)
+            return (np.power(a / base, 1.0 / years) - 1.0) * 100.0
+    raise ValueError(f"Transformación desconocida: {kind}")
+
+def calendar_months() -> list:
+    """Meses 'AAAA-MM' del rango completo del dataset, sin huecos (eje de las transformaciones)."""
+    m_min, m_max = _month_range(current_dataset())
+    return [_int_to_mes(m) for m in range(m_min, m_max + 1)]
+
+@tracked(st.cache_resource(show_spinner=False, max_entries=2048))
+def _transform_series(version, entity, code, kind, base_mes, window) -> np.ndarray:
+    cube = entity_cube(entity)
+    a = cube.block(entity, [code])[0]
+    base_pos = cube.month_pos(base_mes) if base_mes else 0
+    return readonly(apply_transform(a, kind, base_pos or 0, window))
+
+def transform_series(entity, code, kind="nivel", base_mes=None, window=3) -> np.ndarray:
+    """
+    Serie (entidad, variable) transformada sobre el eje de `calendar_months()`.
+    Memoizada por (versión del dataset, entidad, código, transformación,
+    parámetros): cambiar de transformación y volver no recalcula nada.
+    El array es compartido y de sólo lectura.
+    """
+    return _transform_series(current_dataset().version, entity, code, kind, base_mes, window)
+
+@memoized
+def transformed_frame(entity, codes, kind, m_min, m_max, base_mes=None, window=3) -> pd.DataFrame:
+    """
+    Filas (Fecha_dt, Mes, Var_label, Valor_num, Valor_calc) de varias
+    variables de una entidad entre dos meses, armadas desde las series
+    memoizadas. Sólo quedan los meses con dato original. Los datos son
+    compartidos y de sólo lectura (ver `memoized`).
+    """
+    meses = calendar_months()
+    if m_min not in meses or m_max not in meses:
+        return pd.DataFrame(columns=["Fecha_dt", "Mes", "Var_label", "Valor_num", "Valor_calc"])
+    i0, i1 = meses.index(m_min), meses.index(m_max) + 1
+    code2lab = _current_meta().code_to_label
+    fechas = pd.to_datetime(meses[i0:i1], format="%Y-%m")
+    parts = []
+    for code in codes:
+        nivel = transform_series(entity, code, "nivel")[i0:i1]
+        calc = nivel if kind == "nivel" else transform_series(entity, code, kind, base_mes, window)[i0:i1]
+        parts.append(pd.DataFrame({
+            "Fecha_dt": fechas,
+            "Mes": meses[i0:i1],
+            "Var_label": code2lab.get(code, code),
+            "Valor_num": nivel,
+            "Valor_calc": calc,
+        }))
+    if not parts:
+        return pd.DataFrame(columns=["Fecha_dt", "Mes", "Var_label", "Valor_num", "Valor_calc"])
+    out = pd.concat(parts, ignore_index=True)
+    return out[out["Valor_num"].notna()].reset_index(drop=True)
+
+# ---------- datos para gráficos y tablas ----------
+# Lo que se pasa a alt.Chart viaja entero al navegador: se proyectan sólo
+# los campos codificados y, si hay más puntos que el presupuesto, cada serie
+# se decima con LTTB (conserva picos y valles).
+CHART_MAX_POINTS = int(os.environ.get("BCRA_CHART_MAX_POINTS", 4000))  # total por gráfico
+TABLE_PAGE_ROWS = 500
+
+_payload_stats = {}
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Índices elegidos por Largest-Triangle-Three-Buckets (siempre incluye extremos)."""
+    m = len(x)
+    if n >= m or n < 3:
+        return np.arange(m)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, m - 1, n - 1).astype(np.int64)
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i == n - 3:
+            avg_x, avg_y = x[m - 1], y[m - 1]
+        else:
+            avg_x, avg_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def fmt_num(v, nd=2) -> str:
+    """Número en formato argentino ('1.234,56'); '—' si falta."""
+    if pd.isna(v):
+        return "—"
+    try:
+        return f"{float(v):,.{nd}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except Exception:
+        return str(v)
+
+def payload_bytes(df: pd.DataFrame) -> int:
+    """Tamaño aproximado de lo que Streamlit envía por `df` (Arrow IPC)."""
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as w:
+        w.write_table(table)
+    return sink.getvalue().size
+
+@tracked(st.cache_data(show_spinner=False, max_entries=128))
+def chart_data(df: pd.DataFrame, x: str, y: str, color=None, extra=(), max_points=None, name="chart") -> pd.DataFrame:
+    """
+    Datos mínimos para un gráfico de líneas: columnas x, y, color y `extra`
+    (tooltips), sin filas con y vacía, decimados por serie con LTTB si
+    superan `max_points` en total. Memoizado: si los datos no cambian entre
+    reruns se reutiliza el mismo payload.
+    """
+    max_points = max_points or CHART_MAX_POINTS
+    cols = list(dict.fromkeys(c for c in [x, y, color, *extra] if c))
+    d = df[cols].dropna(subset=[y])
+    groups = [d] if not color else [g for _, g in d.groupby(color, observed=True, sort=False)]
+    budget = max(3, max_points // max(1, len(groups)))
+    if len(d) > max_points:
+        keep = []
+        for g in groups:
+            g = g.sort_values(x)
+            gx = g[x].to_numpy()
+            gx = gx.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(gx.dtype, np.datetime64) else gx
+            keep.append(g.iloc[lttb(gx, g[y].to_numpy(), budget)])
+        d = pd.concat(keep)
+    d = d.reset_index(drop=True)
+    _payload_stats[name] = {
+        "filas_antes": len(df), "bytes_antes": payload_bytes(df),
+        "filas_despues": len(d), "bytes_despues": payload_bytes(d),
+    }
+    return d
+
+def payload_report() -> pd.DataFrame:
+    """Filas y bytes de cada gráfico antes/después de preparar sus datos (última vez calculado)."""
+    return pd.DataFrame.from_dict(_payload_stats, orient="index").rename_axis("Gráfico").reset_index()
+
+def paginated_dataframe(df: pd.DataFrame, key: str, page_rows: int = TABLE_PAGE_ROWS, **kwargs):
+    """st.dataframe de a una página: sólo viaja al navegador la página elegida."""
+    n_pages = max(1, -(-len(df) // page_rows))
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(
+            f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_pagina"
+        )
+    a = (page - 1) * page_rows
+    st.dataframe(df.iloc[a:a + page_rows], **kwargs)
+    if n_pages > 1:
+        st.caption(f"Filas {a + 1}–{min(a + page_rows, len(df))} de {len(df)}")
+
+# ---------- diagnóstico ----------
+def page_timer(pagina: str) -> PageTimer:
+    """
+    Cronómetro de una ejecución de página (ver diagnostics.PageTimer). Si
+    desde Diagnóstico se pidió perfilar, esta ejecución corre con cProfile.
+    """
+    prof = cProfile.Profile() if st.session_state.pop("_diag_perfilar", False) else None
+    return PageTimer(pagina, prof)
+
+def dataset_memory(df: pd.DataFrame) -> pd.DataFrame:
+    """Memoria por columna del dataset en uso (memory_usage deep), de mayor a menor."""
+    mem = df.memory_usage(index=False, deep=True)
+    out = pd.DataFrame({"Columna": mem.index, "Tipo": [str(df[c].dtype) for c in mem.index], "Bytes": mem.to_numpy()})
+    return out.sort_values("Bytes", ascending=False, ignore_index=True)
+
+# ---------- API pública ----------
+def load_df() -> pd.DataFrame:
+    """
+    Dataset completo normalizado (ver `pipeline.load_dataset`), con el
+    resumen de carga. Es el mismo objeto para todas las sesiones y de sólo
+    lectura: para modificarlo, trabajar sobre un filtro o un `.copy()`.
+    Con un backend en disco lo lee entero: las páginas usan los cubos e
+    índices de cada vista, que filtran en la consulta.
+    """
+    ds = current_dataset()
+    _show_load_info(ds)
+    return ds.df if ds.db is None else ds.db.frame()
+
+def get_defaults(df: pd.DataFrame):
+    """Entidad: la que contenga 'nación' si existe; Variable: la primera etiqueta (por descripción)."""
+    ent_default = None
+    if not df.empty:
+        ent_default = _default_entity(df["Entidad"].unique().tolist())
+
+    var_default_label = None
+    if not df.empty:
+        labs = df["Var_label"].unique().tolist()
+        var_default_label = labs[0] if labs else None
+
+    return ent_default, var_default_label
+
+def _default_entity(ents):
+    """`ents` en orden de aparición: la primera con 'nación', o la primera (sin contar agregados)."""
+    ents = [e for e in ents if not is_group(e)] or ents
+    cand = [e for e in ents if "nacion" in e.lower() or "nación" in e.lower()]
+    return cand[0] if cand else (ents[0] if ents else None)
+
+def month_options(df: pd.DataFrame):
+    months = df.dropna(subset=["Mes"])["Mes"].unique().tolist()
+    months = sorted(months)
+    return months
+
+def variable_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """Catálogo único: etiqueta (sólo descripción) y su código asociado."""
+    return df[["Var_label","Var_code"]].drop_duplicates().sort_values("Var_label")
+
+def label_to_code(df, label: str) -> str:
+    """
+    Convierte etiqueta (descripción o descripción con sufijo) a código.
+    Con un DatasetMeta es una búsqueda en diccionario; con un DataFrame
+    recorre el catálogo.
+    """
+    if isinstance(df, DatasetMeta):
+        return df.label_to_code.get(label, label)
+    cat = variable_catalog(df)
+    row = cat.loc[cat["Var_label"] == label]
+    if not row.empty:
+        return row.iloc[0]["Var_code"]
+    # fallback: si no encuentra, devuelve el mismo label
+    return label
+
+def group_note(entidad):
+    """Aclaración bajo el selector cuando se elige un agregado."""
+    if is_group(entidad):
+        st.sidebar.caption(
+            "Agregado: suma de las entidades del grupo para cada variable y mes (ver grupos.json). "
+            "Para variables que son cocientes o tasas la suma no tiene sentido."
+        )
+
+# ---------- metadatos del dataset ----------
+@dataclass(frozen=True)
+class DatasetMeta:
+    """
+    Todo lo que necesitan los filtros de las páginas, calculado una vez por
+    carga: las barras laterales se arman sin tocar el dataset.
+    """
+    entidades: list
+    meses: list
+    catalogo: pd.DataFrame  # Var_label, Var_code ordenado por etiqueta
+    labels: list
+    label_to_code: dict
+    code_to_label: dict
+    ent_default: str | None
+    var_default_label: str | None
+    n_filas: int
+    n_codigos_entidad: int
+
+def _entity_order(e):
+    # agregados primero (el sistema encabeza), después las entidades por código
+    return (not is_group(e), e != GROUP_PREFIX + SYSTEM_GROUP, e)
+
+def _make_meta(cat, entidades, meses, ent_default, var_default_label, n_filas, n_codigos) -> DatasetMeta:
+    cat = cat.astype(str).reset_index(drop=True)
+    labels = cat["Var_label"].tolist()
+    lab2code, code2lab = {}, {}
+    for lab, code in zip(labels, cat["Var_code"].tolist()):
+        lab2code.setdefault(lab, code)
+        code2lab.setdefault(code, lab)
+    return DatasetMeta(
+        entidades=sorted(entidades, key=_entity_order),
+        meses=meses,
+        catalogo=cat,
+        labels=labels,
+        label_to_code=lab2code,
+        code_to_label=code2lab,
+        ent_default=ent_default,
+        var_default_label=var_default_label,
+        n_filas=n_filas,
+        n_codigos_entidad=n_codigos,
+    )
+
+def build_meta(df: pd.DataFrame) -> DatasetMeta:
+    ent_default, var_default_label = get_defaults(df)
+    return _make_meta(
+        variable_catalog(df), df["Entidad"].astype(str).unique(), [str(m) for m in month_options(df)],
+        ent_default, var_default_label, len(df), sum(not is_group_code(c) for c in df["Código de entidad"].unique()),
+    )
+
+def build_meta_store(db) -> DatasetMeta:
+    """Como `build_meta`, con los catálogos de un backend en disco (sin leer los datos)."""
+    ents, labs = db.entidades(), db.labels()
+    return _make_meta(
+        db.catalogo(), ents, [_int_to_mes(m) for m in db.meses()],
+        _default_entity(ents), labs[0] if labs else None, db.n_filas(), db.n_codigos_entidad(),
+    )
+
+@tracked(st.cache_resource(show_spinner=False, max_entries=2))
+def _meta(version, _ds) -> DatasetMeta:
+    return build_meta(_ds.df) if _ds.db is None else build_meta_store(_ds.db)
+
+def _current_meta() -> DatasetMeta:
+    ds = current_dataset()
+    return _meta(ds.version, ds)
+
+def load_meta() -> DatasetMeta:
+    """Metadatos del dataset cargado, con el resumen de carga (como `load_df`)."""
+    ds = current_dataset()
+    _show_load_info(ds)
+    return _meta(ds.version, ds)
+
+# ---------- Panel ----------
+@dataclass(frozen=True)
+class PanelView:
+    """Lo que muestra el Panel para (entidad, mes, variables)."""
+    res: pd.DataFrame    # Variable, Valor, MoM %, YoY %, de mayor a menor valor
+    tabla: pd.DataFrame  # `res` con los números formateados
+    hist: pd.DataFrame   # Fecha_dt, Var_label, Valor_num de los últimos 24 meses
+
+@memoized
+def panel_view(entity, mes, codes) -> PanelView | None:
+    """
+    Valor, MoM y YoY de `codes` para una entidad en un mes (lecturas del
+    cubo) y su historia reciente; None si no hay datos para esos filtros.
+    """
+    cube = entity_cube(entity)
+    codes = list(dict.fromkeys(codes))
+    filas = cube.rows_for(entity, codes)
+    codes_ok = [c for c, r in zip(codes, filas) if r >= 0]
+    filas = filas[filas >= 0]
+    i_m = cube.month_pos(mes)
+    if not len(filas) or i_m is None:
+        return None
+    code2lab = _current_meta().code_to_label
+    labels = [code2lab.get(c, c) for c in codes_ok]
+
+    res = pd.DataFrame({
+        "Variable": labels,
+        "Valor": cube.values[filas, i_m],
+        "MoM %": cube.mom[filas, i_m],
+        "YoY %": cube.yoy[filas, i_m],
+    }).sort_values(by=["Valor"], ascending=False)
+
+    tabla = res.rename(columns={"Variable": "Código – Descripción"})
+    tabla["Valor"] = tabla["Valor"].map(fmt_num)
+    tabla["MoM %"] = tabla["MoM %"].map(lambda x: "—" if pd.isna(x) else f"{fmt_num(x, 1)}%")
+    tabla["YoY %"] = tabla["YoY %"].map(lambda x: "—" if pd.isna(x) else f"{fmt_num(x, 1)}%")
+
+    lo = max(0, i_m - 24)
+    win = cube.values[filas, lo:i_m + 1]
+    hist = pd.DataFrame({
+        "Fecha_dt": np.tile(cube.fechas[lo:i_m + 1], len(filas)),
+        "Var_label": np.repeat(labels, win.shape[1]),
+        "Valor_num": win.ravel(),
+    }).dropna(subset=["Valor_num"])
+    return PanelView(res, tabla, hist)
+
+# ---------- fórmulas (Calculadora) ----------
+def variables_matrix(codes):
+    """
+    (entidades, meses, [matriz entidades × meses por código]) alineadas
+    sobre la misma lista de entidades (la de todo el dataset).
+    """
+    ents = _current_meta().entidades
+    pos = {e: i for i, e in enumerate(ents)}
+    meses = calendar_months()
+    mats = []
+    for code in codes:
+        code_ents, _, mat = code_matrix(code)
+        out = np.full((len(ents), len(meses)), np.nan)
+        out[[pos[e] for e in code_ents]] = mat
+        mats.append(out)
+    return ents, meses, mats
+
+@tracked(st.cache_resource(show_spinner=False, max_entries=64))
+def _formula_matrix(version, text, bindings):
+    f = compile_formula(text)
+    codes = dict(bindings)
+    missing = [v for v in f.variables if v not in codes]
+    if missing:
+        raise FormulaError(f"Variables sin asignar: {', '.join(missing)}")
+    ents, meses, mats = variables_matrix([codes[v] for v in f.variables])
+    res = f.evaluate(dict(zip(f.variables, mats)))
+    return ents, meses, readonly(np.broadcast_to(res, (len(ents), len(meses))).copy())
+
+def formula_matrix(text, bindings):
+    """
+    Evalúa la fórmula para todas las entidades a la vez.
+    `bindings` = ((letra, Var_code), ...). Devuelve (entidades, meses,
+    matriz entidades × meses, compartida y de sólo lectura). Lanza
+    FormulaError si la fórmula no es válida.
+    """
+    return _formula_matrix(current_dataset().version, text, bindings)
+
+@memoized
+def formula_view(text, bindings, entity, m_min, m_max) -> pd.DataFrame:
+    """
+    Resultado de la fórmula para una entidad entre dos meses: Fecha_dt, Mes,
+    una columna por letra usada (la serie de esa variable) y Resultado. La
+    fórmula se evalúa sobre toda la historia (lag/rolling usan meses
+    previos) y después se recorta. Lanza FormulaError como formula_matrix.
+    """
+    ents, meses, res = formula_matrix(text, bindings)
+    i0, i1 = meses.index(m_min), meses.index(m_max) + 1
+    i = ents.index(entity) if entity in ents else None
+    out = pd.DataFrame({"Fecha_dt": pd.to_datetime(meses[i0:i1], format="%Y-%m"), "Mes": meses[i0:i1]})
+    for letra in compile_formula(text).variables:
+        # la fórmula trivial "A" devuelve la serie de esa variable
+        _, _, serie = formula_matrix(letra, bindings)
+        out[letra] = serie[i, i0:i1] if i is not None else np.nan
+    out["Resultado"] = res[i, i0:i1] if i is not None else np.nan
+    return out
+
+@memoized
+def formula_table(text, bindings, m_min, m_max):
+    """
+    (tabla entidades × meses sin filas vacías, ordenada por el último mes;
+    la misma en formato largo Entidad, Mes, Resultado para descargar).
+    """
+    ents, meses, res = formula_matrix(text, bindings)
+    i0, i1 = meses.index(m_min), meses.index(m_max) + 1
+    tabla = pd.DataFrame(res[:, i0:i1], index=pd.Index(ents, name="Entidad"), columns=meses[i0:i1])
+    tabla = tabla.dropna(how="all")
+    if len(tabla.columns):
+        tabla = tabla.sort_values(tabla.columns[-1], ascending=False)
+    largo = tabla.reset_index().melt(id_vars="Entidad", var_name="Mes", value_name="Resultado").dropna(subset=["Resultado"])
+    return tabla, largo
+
+# ---------- ranking del sistema ----------
+@tracked(st.cache_data(show_spinner=False, max_entries=256))
+def _ranking(version, code, mes) -> pd.DataFrame:
+    # sólo hacen falta `mes` y los 12 anteriores (MoM, YoY)
+    ents, meses, mat = code_matrix(code, _int_to_mes(_mes_to_int(mes) - 12), mes)
+    # el ranking es entre entidades: los agregados quedan afuera
+    reales = [i for i, e in enumerate(ents) if not is_group(e)]
+    ents, mat = [ents[i] for i in reales], mat[reales]
+    cols = ["Puesto", "Entidad", "Valor", "MoM %", "YoY %", "Percentil", "Puesto anterior", "Cambio de puesto"]
+    if mes not in meses or not len(ents):
+        return pd.DataFrame(columns=cols)
+    i = meses.index(mes)
+    nan = np.full(len(ents), np.nan)
+    cur = mat[:, i]
+    prev = mat[:, i - 1] if i >= 1 else nan
+    yoy = mat[:, i - 12] if i >= 12 else nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df = pd.DataFrame({
+            "Entidad": ents,
+            "Valor": cur,
+            "MoM %": (cur / prev - 1.0) * 100.0,
+            "YoY %": (cur / yoy - 1.0) * 100.0,
+        })
+    df["Puesto"] = pd.Series(cur).rank(ascending=False, method="min")
+    df["Percentil"] = pd.Series(cur).rank(pct=True) * 100.0
+    df["Puesto anterior"] = pd.Series(prev).where(~np.isnan(cur)).rank(ascending=False, method="min")
+    df["Cambio de puesto"] = df["Puesto anterior"] - df["Puesto"]
+    df = df.dropna(subset=["Valor"]).sort_values(["Puesto", "Entidad"])
+    return df[cols].astype({"Puesto": "Int64", "Puesto anterior": "Int64", "Cambio de puesto": "Int64"}).reset_index(drop=True)
+
+def ranking(code, mes) -> pd.DataFrame:
+    """
+    Todas las entidades con dato de `code` en `mes`, ordenadas por valor:
+    MoM/YoY, puesto, percentil y cambio de puesto contra el mes anterior.
+    Una pasada vectorizada sobre la matriz entidades × meses de la variable.
+    """
+    return _ranking(current_dataset().version, code, mes)
+
+# ---------- correlaciones ----------
+# Series alineadas a meses calendario (filas = series, columnas = meses) y
+# todas las correlaciones de a pares en unos pocos productos de matrices:
+# cada par usa sólo los meses en que las dos tienen dato (máscaras de a
+# pares), sin descartar meses para todas por un hueco en una.
+CORR_MIN_OBS = 12  # meses en común mínimos para informar una correlación
+CORR_METHODS = {"pearson": "Pearson", "spearman": "Spearman (rangos)"}
+
+def corr_matrix(x: np.ndarray, method: str = "pearson", min_obs: int = CORR_MIN_OBS):
+    """
+    (r, n) entre las filas de `x` (series × meses, NaN = sin dato): n son
+    los meses en común de cada par y r es NaN si n < min_obs o si una de
+    las dos es constante en esos meses. Spearman es Pearson sobre los
+    rangos de cada serie en sus meses con dato (igual al clásico si no
+    faltan meses).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if method == "spearman":
+        x = pd.DataFrame(x).rank(axis=1).to_numpy()
+    m = (~np.isnan(x)).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # centrar cada serie reduce la cancelación en las sumas
+        x = x - (np.where(m > 0, x, 0.0).sum(axis=1) / m.sum(axis=1))[:, None]
+        z = np.where(m > 0, x, 0.0)
+        n = m @ m.T
+        sx = z @ m.T          # suma de la serie i en los meses comunes con j
+        sxx = (z * z) @ m.T
+        cov = z @ z.T - sx * sx.T / n
+        vx = sxx - sx * sx / n
+        vy = vx.T
+        r = cov / np.sqrt(vx * vy)
+    cte = (vx <= 1e-12 * sxx) | (vy <= 1e-12 * sxx.T)
+    r[(n < min_obs) | cte | ~np.isfinite(r)] = np.nan
+    return np.clip(r, -1.0, 1.0), n.astype(np.int64)
+
+@dataclass(frozen=True)
+class CorrResult:
+    """Matriz de correlaciones de `labels` (r y meses en común n)."""
+    labels: tuple
+    r: np.ndarray
+    n: np.ndarray
+    sin_datos: tuple  # series descartadas por tener menos de min_obs meses
+
+def _corr_result(labels, x, meses, m_min, m_max, kind, method, min_obs) -> CorrResult:
+    # la transformación va sobre todo el eje (YoY del primer mes usa el año anterior)
+    x = apply_transform(x, kind)
+    i0, i1 = meses.index(m_min), meses.index(m_max) + 1
+    x = x[:, i0:i1]
+    ok = (~np.isnan(x)).sum(axis=1) >= min_obs
+    r, n = corr_matrix(x[ok], method, min_obs)
+    labels = np.asarray(labels, dtype=object)
+    return CorrResult(tuple(labels[ok]), r, n, tuple(labels[~ok]))
+
+@memoized
+def variable_correlations(entity, codes, m_min, m_max, kind="nivel", method="pearson", min_obs=CORR_MIN_OBS) -> CorrResult:
+    """
+    Correlaciones entre variables de una entidad (`codes` vacío = todas
+    las que tiene) en el rango de meses, sobre niveles o una
+    transformación de TRANSFORMS.
+    """
+    cube = entity_cube(entity)
+    codes = list(codes) or [c for e, c in cube.pairs if e == entity]
+    code2lab = _current_meta().code_to_label
+    labels = [code2lab.get(c, c) for c in codes]
+    return _corr_result(labels, cube.block(entity, codes), cube.meses, m_min, m_max, kind, method, min_obs)
+
+@memoized
+def entity_correlations(code, m_min, m_max, kind="nivel", method="pearson", min_obs=CORR_MIN_OBS) -> CorrResult:
+    """Correlaciones de una variable entre todas las entidades (sin los agregados)."""
+    ents, meses, mat = code_matrix(code)
+    reales = [i for i, e in enumerate(ents) if not is_group(e)]
+    return _corr_result([ents[i] for i in reales], mat[reales], meses, m_min, m_max, kind, method, min_obs)
+
+def top_pairs(res: CorrResult, k: int) -> pd.DataFrame:
+    """Los `k` pares con mayor |r| (A, B, r, Meses en común)."""
+    iu, ju = np.triu_indices(len(res.labels), 1)
+    r = res.r[iu, ju]
+    ok = np.flatnonzero(~np.isnan(r))
+    top = ok[np.argsort(-np.abs(r[ok]), kind="stable")[:k]]
+    labels = np.asarray(res.labels, dtype=object)
+    return pd.DataFrame({"A": labels[iu[top]], "B": labels[ju[top]], "r": r[top], "Meses en común": res.n[iu[top], ju[top]]})
+
+def heatmap_data(res: CorrResult, pares: pd.DataFrame, name="correlaciones") -> pd.DataFrame:
+    """
+    Celdas (A, B, r, n) de la submatriz de las series que aparecen en
+    `pares`: lo que viaja al navegador crece con k, no con la matriz.
+    """
+    series = list(dict.fromkeys(pares["A"].tolist() + pares["B"].tolist()))
+    pos = {lab: i for i, lab in enumerate(res.labels)}
+    idx = np.array([pos[lab] for lab in series], dtype=np.int64)
+    a, b = np.meshgrid(idx, idx, indexing="ij")
+    labels = np.asarray(res.labels, dtype=object)
+    d = pd.DataFrame({"A": labels[a.ravel()], "B": labels[b.ravel()],
+                      "r": res.r[a, b].ravel(), "Meses en común": res.n[a, b].ravel()})
+    n_total = len(res.labels) ** 2
+    after = payload_bytes(d)
+    _payload_stats[name] = {
+        "filas_antes": n_total, "bytes_antes": int(after * n_total / max(1, len(d))),
+        "filas_despues": len(d), "bytes_despues": after,
+    }
+    return d
+
+# ---------- calidad de datos ----------
+@tracked(st.cache_resource(show_spinner=False, max_entries=2))
+def _quality(version, _ds) -> pd.DataFrame:
+    path = _ds.report.quality
+    return freeze_frame(pd.read_parquet(path)) if path else quality.empty()
+
+def load_quality() -> pd.DataFrame:
+    """
+    Hallazgos de calidad del dataset en uso (columnas de quality.COLS),
+    calculados en la carga y guardados con la versión: abrir la página no
+    recorre el dataset. Compartido y de sólo lectura.
+    """
+    ds = current_dataset()
+    return _quality(ds.version, ds)
+
+# ---------- exportación ----------
+# Extractos grandes (muchas entidades × variables × años): se recorren por
+# bloques y se escriben a un archivo temporal bloque por bloque, sin armar
+# el resultado entero en memoria. Antes de generar nada se estima el tamaño.
+# Ojo: st.download_button lee el archivo entero y el MediaFileManager de
+# Streamlit lo guarda en memoria mientras dure la sesión; el archivo
+# temporal sólo evita el DataFrame intermedio. De ahí el tope bajo.
+EXPORT_CHUNK_ROWS = int(os.environ.get("BCRA_EXPORT_CHUNK_ROWS", 200_000))
+EXPORT_MAX_MB = float(os.environ.get("BCRA_EXPORT_MAX_MB", 100))
+EXPORT_FORMATS = {"csv": "CSV (;, utf-8-sig)", "parquet": "Parquet (columnar)"}
+EXPORT_LAYOUTS = {"largo": "Largo (una fila por dato)", "ancho": "Ancho (una columna por variable)"}
+# bytes por valor en CSV y en Parquet (float64 más claves con diccionario;
+# medidos con synth_data.py, ~8,3 en los dos formatos de tabla)
+_CSV_NUM_BYTES = 14
+_PARQUET_NUM_BYTES = 9
+
+@dataclass(frozen=True)
+class ExportPlan:
+    """
+    Extracto a generar: (entidades, códigos, meses enteros m_min..m_max) en
+    formato largo o ancho. `rows` son las filas largas (con el backend
+    parquet, estimadas desde las estadísticas de las particiones).
+    """
+    entities: tuple
+    codes: tuple
+    labels: tuple  # etiqueta de cada código (columnas del formato ancho)
+    m_min: int
+    m_max: int
+    layout: str
+    rows: int
+    ix: SeriesIndex | None = None
+    db: SqliteStore | ParquetStore | None = None
+
+    @property
+    def wide_rows(self) -> int:
+        return -(-self.rows // max(1, len(self.codes)))
+
+    def est_bytes(self, fmt: str) -> int:
+        """Tamaño aproximado del archivo."""
+        if fmt == "parquet":
+            celdas = self.wide_rows * len(self.codes) if self.layout == "ancho" else self.rows
+            return int(celdas * _PARQUET_NUM_BYTES)
+        ent = np.mean([len(e) for e in self.entities]) if self.entities else 0
+        if self.layout == "ancho":
+            n = self.wide_rows * (ent + 8 + len(self.codes) * (_CSV_NUM_BYTES + 1))
+        else:
+            lab = np.mean([len(c) + len(l) for c, l in zip(self.codes, self.labels)]) if self.codes else 0
+            n = self.rows * (ent + lab + 8 + _CSV_NUM_BYTES + 4)
+        return int(n)
+
+    def _long_chunks(self):
+        cols = ["Entidad", "Mes", "Var_code", "Var_label", "Valor_num"]
+        if self.ix is not None:
+            # índice en memoria: tramos (entidad, código) contiguos, bloques de entidades enteras
+            lo, hi = _int_to_mes(self.m_min), _int_to_mes(self.m_max)
+            ranges, n = [], 0
+            for i, e in enumerate(self.entities):
+                for c in self.codes:
+                    a, b = self.ix._bounds(e, c, lo, hi)
+                    if b > a:
+                        ranges.append(np.arange(a, b))
+                        n += b - a
+                if ranges and (n >= EXPORT_CHUNK_ROWS or i == len(self.entities) - 1):
+                    yield self.ix.frame.take(np.concatenate(ranges))[cols]
+                    ranges, n = [], 0
+            return
+        # backend en disco: un año por consulta (parquet abre sólo esa partición)
+        ents = set(self.entities)
+        for y in range(self.m_min // 12, self.m_max // 12 + 1):
+            d = self.db.frame(codes=list(self.codes), m_min=max(self.m_min, y * 12), m_max=min(self.m_max, y * 12 + 11))
+            d = d[d["Entidad"].isin(ents)]
+            if len(d):
+                yield d.sort_values(["Entidad", "Var_code", "Fecha_dt"], kind="stable")[cols]
+
+    def chunks(self):
+        """
+        Bloques del extracto como DataFrames con las mismas columnas. Cada
+        (entidad, mes) cae entero en un bloque; ante datos repetidos queda
+        el último, como en el tablero.
+        """
+        label = dict(zip(self.codes, self.labels))
+        empty = True
+        for d in self._long_chunks():
+            d = d.astype({"Entidad": str, "Mes": str, "Var_code": str, "Var_label": str})
+            d = d.drop_duplicates(["Entidad", "Var_code", "Mes"], keep="last")
+            if self.layout == "ancho":
+                d = (d.pivot(index=["Entidad", "Mes"], columns="Var_code", values="Valor_num")
+                     .reindex(columns=list(self.codes)).rename(columns=label).reset_index())
+                d.columns.name = None
+            else:
+                d = d.rename(columns={"Valor_num": "Valor"}).reset_index(drop=True)
+            empty = False
+            yield d
+        if empty:
+            cols = ["Entidad", "Mes"] + list(self.labels) if self.layout == "ancho" else ["Entidad", "Mes", "Var_code", "Var_label", "Valor"]
+            yield pd.DataFrame({c: pd.Series(dtype=float if c in self.labels else str) for c in cols})
+
+    def write(self, fmt: str):
+        """Archivo temporal con el extracto (ver csv_tempfile / parquet_tempfile)."""
+        return parquet_tempfile(self.chunks()) if fmt == "parquet" else csv_tempfile(self.chunks())
+
+def export_plan(entities, codes, m_min, m_max, layout="largo") -> ExportPlan:
+    """
+    Arma el extracto de `codes` para `entities` (vacío = todas) entre dos
+    meses 'AAAA-MM' y cuenta sus filas sin leer los datos: búsquedas en el
+    índice en memoria, COUNT en SQLite o estadísticas de las particiones.
+    """
+    ds = current_dataset()
+    meta = _current_meta()
+    entities = tuple(meta.entidades if not entities else entities)
+    codes = tuple(dict.fromkeys(codes))
+    lo, hi = _mes_to_int(m_min), _mes_to_int(m_max)
+    labels = tuple(meta.code_to_label.get(c, c) for c in codes)
+    if ds.db is None:
+        ix = _series_index(ds.version, ds)
+        rows = 0
+        for e in entities:
+            for c in codes:
+                a, b = ix._bounds(e, c, m_min, m_max)
+                rows += b - a
+        return ExportPlan(entities, codes, labels, lo, hi, layout, rows, ix=ix)
+    rows = ds.db.count(entities, codes, lo, hi)
+    return ExportPlan(entities, codes, labels, lo, hi, layout, rows, db=ds.db)
+
+def iter_chunks(df: pd.DataFrame, rows: int = 100_000):
+    for a in range(0, len(df), rows):
+        yield df.iloc[a:a + rows]
+
+def _tempfile():
+    """
+    Archivo temporal sin buffer y de lectura/escritura, que se borra solo al
+    cerrarse. Siempre un FileIO: es lo que st.download_button acepta tal
+    cual, y en Windows tempfile.TemporaryFile devuelve un envoltorio que no.
+    """
+    fd, path = tempfile.mkstemp(prefix="bcra_")
+    if os.name == "nt":
+        # abierto no se puede borrar: O_TEMPORARY lo borra al cerrarlo
+        os.close(fd)
+        fd = os.open(path, os.O_RDWR | os.O_BINARY | os.O_TEMPORARY)
+    else:
+        os.unlink(path)
+    return open(fd, "w+b", buffering=0)
+
+def csv_tempfile(chunks):
+    """
+    Escribe los DataFrames de `chunks` como un solo CSV (';', utf-8-sig, la
+    convención del panel) en un archivo temporal, bloque por bloque, y lo
+    devuelve abierto al inicio. Se borra solo al cerrarse.
+    """
+    f = _tempfile()
+    f.write(codecs.BOM_UTF8)
+    header = True
+    for ch in chunks:
+        f.write(ch.to_csv(index=False, sep=";", header=header).encode("utf-8"))
+        header = False
+    f.seek(0)
+    return f
+
+def parquet_tempfile(chunks):
+    """
+    Como `csv_tempfile` pero en Parquet: un row group por bloque, con el
+    esquema del primero.
+    """
+    f = _tempfile()
+    writer = None
+    for ch in chunks:
+        t = pa.Table.from_pandas(ch, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(f, t.schema)
+        writer.write_table(t.cast(writer.schema))
+    if writer is not None:
+        writer.close()
+    f.seek(0)
+    return f